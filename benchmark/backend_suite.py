@@ -0,0 +1,327 @@
+"""
+Benchmark suite of the ALCom backend.
+Usage: `python benchmark/backend_suite.py [--families ghz,qft] [--qubits 4,8,12]
+[--depths 2,4] [--json out.json] [--csv out.csv] [--baseline old.json]`
+Every case builds a seeded circuit of one family, assembles it and runs it
+through `ALComProvider().get_backend('qasm_simulator')` with profiling on, in
+a fresh process so that its peak RSS is its own. The records hold the wall
+time (median and minimum over `--repeat` runs), the peak RSS, the engine and
+the per-phase breakdown of the fastest run. With `--baseline` the cases are
+compared with an earlier `--json` file and the exit status is 1 when one got
+slower or bigger than `--tolerance` allows.
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent import futures
+import multiprocessing
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=wrong-import-position
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider import ALComProvider
+
+# a regression must also be slower by this many seconds, below it is noise
+MIN_SECONDS = 0.01
+
+
+def ghz(num_qubits, depth, rng):
+    """GHZ preparation."""
+    circuit = QuantumCircuit(num_qubits)
+    circuit.h(0)
+    for q in range(num_qubits - 1):
+        circuit.cx(q, q + 1)
+    return circuit
+
+
+def qft(num_qubits, depth, rng):
+    """QFT of a random basis state, ``cu1`` angles down to ``pi / 2^(n-1)``."""
+    circuit = QuantumCircuit(num_qubits)
+    for q in range(num_qubits):
+        if rng.randint(2):
+            circuit.x(q)
+    for target in reversed(range(num_qubits)):
+        circuit.h(target)
+        for control in reversed(range(target)):
+            circuit.cu1(math.pi / (1 << (target - control)), control, target)
+    for q in range(num_qubits // 2):
+        circuit.swap(q, num_qubits - 1 - q)
+    return circuit
+
+
+def grover(num_qubits, depth, rng):
+    """``depth`` Grover iterations searching a random marked state."""
+    circuit = QuantumCircuit(num_qubits)
+    marked = [q for q in range(num_qubits) if rng.randint(2)]
+    controls, target = list(range(num_qubits - 1)), num_qubits - 1
+    circuit.h(range(num_qubits))
+    for _ in range(depth):
+        # oracle: phase flip of the marked state
+        if marked:
+            circuit.x(marked)
+        circuit.h(target)
+        circuit.mcx(controls, target)
+        circuit.h(target)
+        if marked:
+            circuit.x(marked)
+        # diffusion
+        circuit.h(range(num_qubits))
+        circuit.x(range(num_qubits))
+        circuit.h(target)
+        circuit.mcx(controls, target)
+        circuit.h(target)
+        circuit.x(range(num_qubits))
+        circuit.h(range(num_qubits))
+    return circuit
+
+
+def clifford_t(num_qubits, depth, rng):
+    """``depth`` layers of random ``h``, ``s``, ``t`` and CX between random pairs."""
+    circuit = QuantumCircuit(num_qubits)
+    for _ in range(depth):
+        for q in range(num_qubits):
+            getattr(circuit, rng.choice(['h', 's', 't']))(q)
+        pairs = rng.permutation(num_qubits)
+        for a, b in zip(pairs[::2], pairs[1::2]):
+            circuit.cx(int(a), int(b))
+    return circuit
+
+
+def qaoa_maxcut(num_qubits, depth, rng):
+    """``depth`` QAOA layers for MaxCut on a ring with random chords, random angles."""
+    edges = {(min(q, (q + 1) % num_qubits), max(q, (q + 1) % num_qubits))
+             for q in range(num_qubits)}
+    for _ in range(num_qubits // 2):
+        a, b = rng.choice(num_qubits, 2, replace=False)
+        edges.add((int(min(a, b)), int(max(a, b))))
+    circuit = QuantumCircuit(num_qubits)
+    circuit.h(range(num_qubits))
+    for _ in range(depth):
+        gamma, beta = rng.uniform(0, math.pi, 2)
+        for a, b in sorted(edges):
+            # exp(-i gamma Z_a Z_b / 2) up to a global phase
+            circuit.cx(a, b)
+            circuit.u1(gamma, b)
+            circuit.cx(a, b)
+        for q in range(num_qubits):
+            circuit.u3(2 * beta, -math.pi / 2, math.pi / 2, q)
+    return circuit
+
+
+def supremacy(num_qubits, depth, rng):
+    """
+    ``depth`` cycles of a supremacy-style random circuit on a grid: CZ in one
+    of four coupling patterns, then a random ``sqrt(X)``, ``sqrt(Y)`` or ``t``
+    on every qubit, never the same one twice in a row.
+    """
+    cols = int(math.ceil(math.sqrt(num_qubits)))
+    circuit = QuantumCircuit(num_qubits)
+    circuit.h(range(num_qubits))
+    last = [None] * num_qubits
+    for cycle in range(depth):
+        pattern = cycle % 4
+        for q in range(num_qubits):
+            row, col = divmod(q, cols)
+            if pattern < 2:
+                other = q + 1 if col + 1 < cols and (col + row + pattern) % 2 == 0 else None
+            else:
+                other = q + cols if (row + col + pattern) % 2 == 0 else None
+            if other is not None and other < num_qubits:
+                circuit.cz(q, other)
+        for q in range(num_qubits):
+            gate = rng.choice([g for g in ('sqrt_x', 'sqrt_y', 't') if g != last[q]])
+            last[q] = gate
+            if gate == 'sqrt_x':
+                circuit.u3(math.pi / 2, -math.pi / 2, math.pi / 2, q)
+            elif gate == 'sqrt_y':
+                circuit.u3(math.pi / 2, 0, 0, q)
+            else:
+                circuit.t(q)
+    return circuit
+
+
+# family -> (builder, whether it takes a depth)
+FAMILIES = {
+    'ghz': (ghz, False),
+    'qft': (qft, False),
+    'grover': (grover, True),
+    'clifford_t': (clifford_t, True),
+    'qaoa_maxcut': (qaoa_maxcut, True),
+    'supremacy': (supremacy, True),
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def run_case(family, num_qubits, depth, shots, repeat, seed, backend_options):
+    """Build and run one case ``repeat`` times, return its record."""
+    build, _ = FAMILIES[family]
+    circuit = build(num_qubits, depth, np.random.RandomState(seed))
+    circuit.measure_all()
+    qobj = assemble(circuit, shots=shots, seed_simulator=seed)
+    backend = ALComProvider().get_backend('qasm_simulator')
+    options = dict(backend_options, profile=True)
+    times = []
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = backend.run(qobj, backend_options=options).result()
+        times.append(time.perf_counter() - start)
+        if best is None or times[-1] <= min(times):
+            best = result
+    experiment = best.results[0]
+    record = {'family': family, 'num_qubits': num_qubits, 'depth': depth,
+              'gates': circuit.size(), 'shots': shots,
+              'seconds': float(np.median(times)), 'seconds_min': min(times),
+              'peak_rss_mb': peak_rss_mb(), 'engine': experiment.get('engine')}
+    if 'bdd_stats' in experiment:
+        record['bdd_peak_nodes'] = experiment['bdd_stats']['peak_nodes']
+    record['phases'] = {name: total['seconds']
+                        for name, total in best.get_profile().summary().items()}
+    return record
+
+
+def cases(families, qubits, depths):
+    """``(family, num_qubits, depth)`` of the sweep, depth None where unused."""
+    for family in families:
+        _, takes_depth = FAMILIES[family]
+        for num_qubits in qubits:
+            for depth in (depths if takes_depth else [None]):
+                yield family, num_qubits, depth
+
+
+def case_key(record):
+    return record['family'], record['num_qubits'], record['depth']
+
+
+def compare(records, baseline, tolerance):
+    """
+    Compare the records with the ones of a baseline run.
+    Returns:
+        list: ``(record, base, time_ratio, rss_ratio, regressed)`` of the
+        cases present in both.
+    """
+    base = {case_key(record): record for record in baseline}
+    rows = []
+    for record in records:
+        old = base.get(case_key(record))
+        if old is None:
+            continue
+        time_ratio = record['seconds'] / max(old['seconds'], 1e-9)
+        rss_ratio = record['peak_rss_mb'] / max(old['peak_rss_mb'], 1e-9)
+        regressed = ((time_ratio > 1 + tolerance
+                      and record['seconds'] - old['seconds'] > MIN_SECONDS)
+                     or rss_ratio > 1 + tolerance)
+        rows.append((record, old, time_ratio, rss_ratio, regressed))
+    return rows
+
+
+def write_csv(path, records):
+    """One row per case, the phases as ``phase_<name>`` columns."""
+    phases = sorted({name for record in records for name in record['phases']})
+    fields = []
+    for record in records:
+        fields += [key for key in record if key not in fields and key != 'phases']
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(fields + ['phase_' + name for name in phases])
+        for record in records:
+            writer.writerow([record.get(key) for key in fields]
+                            + [record['phases'].get(name) for name in phases])
+
+
+def metadata(args):
+    """Machine and run settings stored with the results."""
+    return {'date': datetime.datetime.now().isoformat(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'shots': args.shots, 'repeat': args.repeat,
+            'seed': args.seed, 'backend_options': args.options}
+
+
+def _ints(text):
+    return [int(item) for item in text.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--families', default=','.join(FAMILIES),
+                        help='comma separated, from ' + ', '.join(FAMILIES))
+    parser.add_argument('--qubits', type=_ints, default=[4, 8, 12, 16])
+    parser.add_argument('--depths', type=_ints, default=[2, 8])
+    parser.add_argument('--shots', type=int, default=1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--options', type=json.loads, default={},
+                        help='backend_options as JSON, e.g. \'{"engine": "bdd"}\'')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--csv', help='write the results to this file')
+    parser.add_argument('--baseline', help='results of an earlier --json run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative growth of time and peak RSS')
+    parser.add_argument('--inline', action='store_true',
+                        help='run the cases in this process, the peak RSS is then cumulative')
+    args = parser.parse_args(argv)
+    families = [family for family in args.families.split(',') if family]
+    unknown = set(families) - set(FAMILIES)
+    if unknown:
+        parser.error('unknown families: ' + ', '.join(sorted(unknown)))
+
+    print('{:<12}{:>4}{:>6}{:>8}  {:<8}{:>10}{:>10}{:>10}'.format(
+        'family', 'n', 'depth', 'gates', 'engine', 'time [s]', 'min [s]', 'rss [MB]'))
+    records = []
+    for family, num_qubits, depth in cases(families, args.qubits, args.depths):
+        job = (family, num_qubits, depth, args.shots, args.repeat, args.seed, args.options)
+        if args.inline:
+            record = run_case(*job)
+        else:
+            # a fresh process per case, its ru_maxrss is the case's own peak
+            with futures.ProcessPoolExecutor(
+                    1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                record = pool.submit(run_case, *job).result()
+        records.append(record)
+        print('{:<12}{:>4}{:>6}{:>8}  {:<8}{:>10.4f}{:>10.4f}{:>10.1f}'.format(
+            family, num_qubits, '-' if depth is None else depth, record['gates'],
+            record['engine'] or '-', record['seconds'], record['seconds_min'],
+            record['peak_rss_mb']), flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'metadata': metadata(args), 'results': records}, handle, indent=1)
+    if args.csv:
+        write_csv(args.csv, records)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)['results']
+        rows = compare(records, baseline, args.tolerance)
+        print('\n{:<12}{:>4}{:>6}{:>12}{:>10}{:>10}  {}'.format(
+            'family', 'n', 'depth', 'base [s]', 'time', 'rss', 'status'))
+        for record, old, time_ratio, rss_ratio, regressed in rows:
+            print('{:<12}{:>4}{:>6}{:>12.4f}{:>9.2f}x{:>9.2f}x  {}'.format(
+                record['family'], record['num_qubits'],
+                '-' if record['depth'] is None else record['depth'], old['seconds'],
+                time_ratio, rss_ratio, 'REGRESSION' if regressed else 'ok'))
+        regressions = sum(row[-1] for row in rows)
+        print('{} of {} cases regressed'.format(regressions, len(rows)))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark the qubit order of the BDD engine.
+Usage: `python benchmark/bdd_order.py [max_qubits] [sift_threshold]`
+Every family runs with the index order, the interaction-graph order
+(`interaction_order`) and the index order with sifting; the table shows
+the time and the peak and final node counts.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=wrong-import-position
+from qiskit_alcom_provider.bdd_engine import BDDManager, BDDSimulator, interaction_order
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+
+
+def far_pairs(num_qubits):
+    """Bell pairs ``(q, q + n/2)``: linear in a paired order, exponential in index order."""
+    half = num_qubits // 2
+    ops = [('h', [q]) for q in range(half)]
+    ops += [('cx', [q, q + half]) for q in range(half)]
+    ops += [('t', [q]) for q in range(0, num_qubits, 3)]
+    return ops
+
+
+def far_ladder(num_qubits):
+    """Far pairs followed by a ladder inside each half."""
+    half = num_qubits // 2
+    ops = far_pairs(num_qubits)
+    ops += [('cx', [q, q + 1]) for q in range(half - 1)]
+    ops += [('h', [q]) for q in range(half, num_qubits, 2)]
+    return ops
+
+
+def ghz(num_qubits):
+    """GHZ preparation, already in its best order."""
+    return [('h', [0])] + [('cx', [q, q + 1]) for q in range(num_qubits - 1)]
+
+
+def strided_clifford_t(num_qubits, depth=4, seed=7):
+    """Random Clifford+T layers with CX between qubits ``n/2`` apart, seeded."""
+    rng = np.random.RandomState(seed)
+    half = num_qubits // 2
+    ops = []
+    for _ in range(depth):
+        for q in range(num_qubits):
+            ops.append((rng.choice(['h', 's', 't']), [q]))
+        for q in range(half):
+            ops.append(('cx', [q, q + half]))
+    return ops
+
+
+def run(num_qubits, ops, order=None, sift_threshold=None):
+    """Time the gate list, return the seconds and the manager."""
+    mgr = BDDManager(order=order, sift_threshold=sift_threshold)
+    start = time.time()
+    sim = BDDSimulator(num_qubits, mgr)
+    for name, qubits in ops:
+        sim.apply(name, qubits)
+    mgr.collect_garbage(sim.roots())
+    return time.time() - start, mgr
+
+
+def main(max_qubits=24, sift_threshold=1 << 10):
+    families = [('far_pairs', far_pairs), ('far_ladder', far_ladder), ('ghz', ghz),
+                ('strided_ct', strided_clifford_t)]
+    print('{:<12}{:>4}  {:<12}{:>10}{:>12}{:>10}'.format(
+        'family', 'n', 'order', 'time [s]', 'peak nodes', 'nodes'))
+    for family, build in families:
+        num_qubits = 8
+        while num_qubits <= max_qubits:
+            ops = build(num_qubits)
+            circuit = CircuitIR.from_ops(num_qubits, [['c', num_qubits]],
+                                         [(name, qubits, [], -1) for name, qubits in ops])
+            for label, order, threshold in (
+                    ('index', None, None),
+                    ('interaction', interaction_order(circuit), None),
+                    ('sifting', None, sift_threshold)):
+                seconds, mgr = run(num_qubits, ops, order, threshold)
+                stats = mgr.stats()
+                print('{:<12}{:>4}  {:<12}{:>10.4f}{:>12}{:>10}'.format(
+                    family, num_qubits, label, seconds, stats['peak_nodes'], stats['nodes']),
+                      flush=True)
+            num_qubits += 4
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,106 @@
+"""
+Benchmark the bit-sliced BDD engine against a dense NumPy reference.
+Usage: `python benchmark/bdd_vs_dense.py [max_dense_qubits] [max_bdd_qubits]`
+For widths the dense reference can hold, the final states are compared.
+"""
+
+import os
+import sys
+import time
+import math
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from qiskit_alcom_provider.bdd_engine import BDDSimulator  # pylint: disable=wrong-import-position
+
+_H = np.array([[1, 1], [1, -1]], dtype=complex) / math.sqrt(2)
+_X = np.array([[0, 1], [1, 0]], dtype=complex)
+_S = np.diag([1, 1j])
+_T = np.diag([1, np.exp(0.25j * math.pi)])
+_MATRICES = {'h': _H, 'x': _X, 's': _S, 't': _T}
+
+
+def dense_run(num_qubits, ops):
+    """Dense reference: apply every gate as a tensor contraction."""
+    psi = np.zeros([2] * num_qubits, dtype=complex)
+    psi[(0,) * num_qubits] = 1
+    for name, qubits in ops:
+        # numpy axis 0 is the most significant qubit
+        axes = [num_qubits - 1 - q for q in qubits]
+        if name == 'cx':
+            ctrl, targ = axes
+            index = [slice(None)] * num_qubits
+            index[ctrl] = 1
+            sub = psi[tuple(index)]
+            sub_targ = targ if targ < ctrl else targ - 1
+            psi[tuple(index)] = np.flip(sub, axis=sub_targ)
+        else:
+            psi = np.moveaxis(np.tensordot(_MATRICES[name], psi, axes=([1], axes)),
+                              0, axes[0])
+    return psi.reshape(-1)
+
+
+def bdd_run(num_qubits, ops):
+    """Run the same gate list with the BDD engine."""
+    sim = BDDSimulator(num_qubits)
+    for name, qubits in ops:
+        sim.apply(name, qubits)
+    return sim
+
+
+def ghz(num_qubits):
+    """GHZ preparation."""
+    return [('h', [0])] + [('cx', [q, q + 1]) for q in range(num_qubits - 1)]
+
+
+def clifford_t(num_qubits, depth=10, seed=7):
+    """Random Clifford+T layers, seeded."""
+    rng = np.random.RandomState(seed)
+    ops = []
+    for _ in range(depth):
+        for q in range(num_qubits):
+            ops.append((rng.choice(['h', 's', 't', 'x']), [q]))
+        for q in range(rng.randint(2), num_qubits - 1, 2):
+            ops.append(('cx', [q, q + 1]))
+    return ops
+
+
+def basis_hadamard_ladder(num_qubits):
+    """Hadamards on every other qubit followed by a CX ladder."""
+    ops = [('x', [q]) for q in range(0, num_qubits, 3)]
+    ops += [('h', [q]) for q in range(0, num_qubits, 2)]
+    ops += [('cx', [q, q + 1]) for q in range(0, num_qubits - 1, 2)]
+    return ops
+
+
+def main(max_dense=20, max_bdd=64):
+    # random Clifford+T layers are the BDD worst case, keep them narrow
+    families = [('ghz', ghz, max_bdd),
+                ('hadamard_ladder', basis_hadamard_ladder, max_bdd),
+                ('clifford_t', clifford_t, min(max_bdd, 24))]
+    print('{:<16}{:>6}{:>12}{:>12}{:>10}{:>8}'.format(
+        'family', 'n', 'bdd [s]', 'dense [s]', 'nodes', 'match'))
+    for family, build, max_width in families:
+        num_qubits = 4
+        while num_qubits <= max_width:
+            ops = build(num_qubits)
+            start = time.time()
+            sim = bdd_run(num_qubits, ops)
+            sim.mgr.collect_garbage(sim.roots())
+            bdd_time = time.time() - start
+            dense_time = float('nan')
+            match = '-'
+            if num_qubits <= max_dense:
+                start = time.time()
+                psi = dense_run(num_qubits, ops)
+                dense_time = time.time() - start
+                match = str(np.allclose(sim.statevector(), psi))
+            print('{:<16}{:>6}{:>12.4f}{:>12.4f}{:>10}{:>8}'.format(
+                family, num_qubits, bdd_time, dense_time, sim.mgr.num_nodes, match), flush=True)
+            num_qubits += 4 if num_qubits < 16 else num_qubits // 2
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,104 @@
+"""
+Cold-start time of the ALCom provider.
+Usage: `python benchmark/import_time.py [--repeat 10] [--path old_checkout]
+[--importtime 15] [--json out.json]`
+Every stage runs in a fresh interpreter, `--repeat` times, and prints the
+median wall time measured inside it:
+`import qiskit_alcom_provider`, `from qiskit_alcom_provider import
+ALComProvider`, `ALComProvider()`, the first
+`get_backend('qasm_simulator')` and a second provider and backend in the
+same process. Each `--path` (a checkout, e.g. a `git worktree` of an older
+commit) is measured the same way, so the numbers compare side by side.
+`--importtime N` prints the N slowest modules of the full start-up from
+`python -X importtime`.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# stage name -> statements run after the timer starts, each stage includes the ones before
+STAGES = {
+    'import': 'import qiskit_alcom_provider',
+    'provider_class': 'from qiskit_alcom_provider import ALComProvider',
+    'provider': 'from qiskit_alcom_provider import ALComProvider\n'
+                'provider = ALComProvider()',
+    'backend': 'from qiskit_alcom_provider import ALComProvider\n'
+               'backend = ALComProvider().get_backend("qasm_simulator")',
+    'second_backend': 'from qiskit_alcom_provider import ALComProvider\n'
+                      'ALComProvider().get_backend("qasm_simulator")\n'
+                      '_start = time.perf_counter()\n'
+                      'ALComProvider().get_backend("qasm_simulator")',
+}
+
+_TEMPLATE = '''import sys, time
+sys.path.insert(0, {path!r})
+_start = time.perf_counter()
+{body}
+print(time.perf_counter() - _start)
+'''
+
+
+def time_stage(path, stage, repeat):
+    """Seconds of ``repeat`` fresh interpreters running one stage."""
+    script = _TEMPLATE.format(path=path, body=STAGES[stage])
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', script], check=True,
+                             capture_output=True, text=True, cwd=path)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def slowest_imports(path, count):
+    """The ``count`` slowest modules (cumulative microseconds) of ``python -X importtime``."""
+    script = _TEMPLATE.format(path=path, body=STAGES['backend'])
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], check=True,
+                         capture_output=True, text=True, cwd=path)
+    modules = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--path', action='append', default=[],
+                        help='other checkouts to measure, may be given more than once')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N')
+    parser.add_argument('--json', help='write the records to this file')
+    args = parser.parse_args(argv)
+
+    paths = [os.path.abspath(ROOT)] + [os.path.abspath(path) for path in args.path]
+    records = []
+    print('{:<16}'.format('stage') + ''.join('{:>14}'.format('checkout %d' % i)
+                                              for i in range(len(paths))))
+    for stage in STAGES:
+        row = []
+        for path in paths:
+            times = time_stage(path, stage, args.repeat)
+            records.append({'path': path, 'stage': stage, 'median_seconds': statistics.median(times),
+                            'min_seconds': min(times)})
+            row.append(statistics.median(times))
+        print('{:<16}'.format(stage) + ''.join('{:>12.1f}ms'.format(t * 1e3) for t in row))
+    for i, path in enumerate(paths):
+        print('checkout {}: {}'.format(i, path))
+        for cumulative, name in slowest_imports(path, args.importtime):
+            print('    {:>10.1f}ms  {}'.format(cumulative * 1e-3, name))
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'python': sys.version, 'repeat': args.repeat, 'records': records},
+                      handle, indent=1)
+
+
+if __name__ == '__main__':
+    main()
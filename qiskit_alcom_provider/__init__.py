@@ -1,4 +1,31 @@
-from .alcom_provider import ALComProvider
-from .bdd_backend import BDDBackend
-from .alcom_job import ALComJob
-from .qasm_simulator_alcom import QasmSimulator
\ No newline at end of file
+"""
+The submodules are imported on first use of their names, so importing the
+package does not load qiskit, NumPy or the engines.
+"""
+
+import importlib
+
+# public name -> submodule defining it
+_EXPORTS = {
+    'ALComProvider': '.alcom_provider',
+    'BDDBackend': '.bdd_backend',
+    'ALComJob': '.alcom_job',
+    'ALComExecutor': '.alcom_job',
+    'ResultCache': '.result_cache',
+    'QasmSimulator': '.qasm_simulator_alcom',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -29,3 +29,7 @@ class ALComError(QiskitError):
     def __str__(self):
         """Return the message."""
         return repr(self.message)
+
+
+class ALComResourceError(ALComError):
+    """Raised when a simulation outgrows its node or memory budget."""
@@ -17,15 +17,227 @@ This module implements the job class used for BDDBackend objects.
 The majority of the code is identicle to aer's.
 """
 
+import asyncio
+import collections
 from concurrent import futures
 import logging
 import functools
+import threading
 
 from qiskit.providers import BaseJob, JobStatus, JobError
 
 logger = logging.getLogger(__name__)
 
 
+class ALComExecutor():
+    """
+    Executor shared by the jobs of a backend or provider.
+    Args:
+        kind (str): ``'thread'``, ``'process'`` or ``'inline'`` (run on submit).
+        max_workers (int): number of jobs simulated at once.
+        max_queue (int or None): jobs allowed to wait on top of the running ones,
+                                 ``submit`` blocks while the queue is full,
+                                 ``submit_async`` awaits a free slot.
+                                 ``None`` means unbounded.
+    """
+
+    KINDS = ('thread', 'process', 'inline')
+
+    def __init__(self, kind='thread', max_workers=1, max_queue=None):
+        if kind not in self.KINDS:
+            raise JobError("unknown executor kind {}, use one of {}".format(kind, self.KINDS))
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        if kind == 'thread':
+            self._pool = futures.ThreadPoolExecutor(max_workers=max_workers)
+        elif kind == 'process':
+            self._pool = futures.ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._pool = None
+        self._slots = None
+        if max_queue is not None:
+            self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._live = set()
+        self._lock = threading.Lock()
+        # (loop, future) of the coroutines waiting in submit_async for a slot
+        self._waiters = collections.deque()
+
+    @property
+    def shares_memory(self):
+        """Whether jobs run in this process and can see a cancel event."""
+        return self.kind != 'process'
+
+    @property
+    def pending_jobs(self):
+        """Number of submitted jobs that did not start yet."""
+        with self._lock:
+            return sum(1 for future in self._live if not future.running())
+
+    def submit(self, fn, *args, timeout=None, **kwargs):
+        """
+        Schedule ``fn(*args, **kwargs)``.
+        Raises:
+            JobError: if the queue stayed full for ``timeout`` seconds.
+        """
+        if self._slots is not None and not self._slots.acquire(timeout=timeout):
+            raise JobError("the job queue is full ({} running, {} queued)".format(
+                self.max_workers, self.max_queue))
+        return self._submit(fn, args, kwargs)
+
+    async def submit_async(self, fn, *args, timeout=None, **kwargs):
+        """
+        ``submit`` for coroutines: a full queue is awaited without blocking
+        the event loop or holding a thread, the slot freed by a finished job
+        wakes one waiting coroutine.
+        Raises:
+            JobError: if the queue stayed full for ``timeout`` seconds.
+        """
+        if self._slots is not None:
+            loop = asyncio.get_running_loop()
+            deadline = None if timeout is None else loop.time() + timeout
+            while True:
+                with self._lock:
+                    # under the lock _done cannot release a slot between the try and the wait
+                    if self._slots.acquire(blocking=False):
+                        break
+                    waiter = loop.create_future()
+                    self._waiters.append((loop, waiter))
+                try:
+                    await asyncio.wait_for(
+                        waiter, None if deadline is None else max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    raise JobError("the job queue is full ({} running, {} queued)".format(
+                        self.max_workers, self.max_queue)) from None
+                except asyncio.CancelledError:
+                    if waiter.done() and not waiter.cancelled():
+                        # woken for a slot it will not take, the next waiter gets it
+                        self._wake()
+                    raise
+        return self._submit(fn, args, kwargs)
+
+    def _submit(self, fn, args, kwargs):
+        if self._pool is None:
+            future = futures.Future()
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as err:  # pylint: disable=broad-except
+                future.set_exception(err)
+        else:
+            try:
+                future = self._pool.submit(fn, *args, **kwargs)
+            except BaseException:
+                # the pool is shut down or broken, the job never took its slot
+                self._release_slot()
+                raise
+        with self._lock:
+            self._live.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._live.discard(future)
+        self._release_slot()
+
+    def _release_slot(self):
+        if self._slots is not None:
+            self._slots.release()
+            self._wake()
+
+    def _wake(self):
+        """Wake the coroutine waiting longest in ``submit_async``."""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    return
+                loop, waiter = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._set_waiter, waiter)
+                return
+            except RuntimeError:
+                # its event loop is closed
+                continue
+
+    def _set_waiter(self, waiter):
+        if waiter.done():
+            # its coroutine gave up waiting, the slot goes to the next one
+            self._wake()
+        else:
+            waiter.set_result(None)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and release the workers."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+
+class JobStream():
+    """
+    Latest update of every experiment of a running job, read by ``ALComJob.stream``.
+    An update replaces the previous one of its experiment, so a slow reader
+    skips intermediate counts instead of queueing them and the memory held
+    stays bounded by the number of experiments.
+    """
+
+    def __init__(self):
+        # experiment index -> (version, update)
+        self._updates = {}
+        self._version = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def update(index, name, counts, shots, total_shots, result=None):
+        """
+        One item of ``ALComJob.stream``.
+        Args:
+            index (int): the experiment, in qobj order.
+            name (str): its name.
+            counts (dict): counts of the shots sampled so far.
+            shots (int): shots sampled so far.
+            total_shots (int): shots of the experiment.
+            result (dict): the result entry of a finished experiment.
+        """
+        return {"experiment": index, "name": name, "counts": counts, "shots": shots,
+                "total_shots": total_shots, "done": result is not None, "result": result}
+
+    def publish(self, index, *args, **kwargs):
+        """Replace the update of experiment ``index``, see ``update`` for the arguments."""
+        update = self.update(index, *args, **kwargs)
+        with self._cond:
+            self._version += 1
+            self._updates[index] = (self._version, update)
+            self._cond.notify_all()
+
+    def close(self):
+        """No more updates will come, the readers stop once they have the last ones."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def wait(self, version=0, timeout=None):
+        """
+        Updates newer than ``version``, waiting for one.
+        Returns:
+            tuple: the version read up to and the updates in publication order,
+            no updates once the stream is closed and read to the end.
+        Raises:
+            concurrent.futures.TimeoutError: if nothing came for ``timeout`` seconds.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or self._version > version, timeout):
+                raise futures.TimeoutError()
+            updates = sorted(item for item in self._updates.values() if item[0] > version)
+            return self._version, [update for _, update in updates]
+
+
+def _set_done(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
 def requires_submit(func):
     """
     Decorator to ensure that a submit has been performed before
@@ -46,17 +258,21 @@ def requires_submit(func):
 class ALComJob(BaseJob):
     """ALcomJob class.
     Attributes:
-        _executor (futures.Executor): executor to handle asynchronous jobs
+        _executor (ALComExecutor): default executor to handle asynchronous jobs
     """
 
-    _executor = futures.ThreadPoolExecutor(max_workers=1)
+    _executor = ALComExecutor('thread', max_workers=1)
 
-    def __init__(self, backend, job_id, fn, qobj, *args):
+    def __init__(self, backend, job_id, fn, qobj, *args, executor=None):
         super().__init__(backend, job_id)
         self._fn = fn
         self._qobj = qobj
         self._args = args
         self._future = None
+        if executor is not None:
+            self._executor = executor
+        self._cancel_event = threading.Event()
+        self._stream = JobStream()
 
     def submit(self):
         """Submit the job to the backend for execution.
@@ -67,9 +283,32 @@ class ALComJob(BaseJob):
         """
         if self._future is not None:
             raise JobError("We have already submitted the job!")
+        self._submitted(self._executor.submit(self._fn, self._job_id, self._qobj, *self._args,
+                                              **self._shared_state()))
+
+    async def submit_async(self):
+        """``submit`` for coroutines, a full executor queue is awaited.
+        Raises:
+            JobError: if trying to re-submit the job.
+        """
+        if self._future is not None:
+            raise JobError("We have already submitted the job!")
+        self._submitted(await self._executor.submit_async(
+            self._fn, self._job_id, self._qobj, *self._args, **self._shared_state()))
 
-        self._future = self._executor.submit(self._fn, self._job_id, self._qobj,
-                                             *self._args)
+    def _shared_state(self):
+        # a running job polls the event and publishes its updates, processes cannot share them
+        shared = self._executor.shares_memory
+        return {"cancel_event": self._cancel_event if shared else None,
+                "stream": self._stream if shared else None}
+
+    def _submitted(self, future):
+        if self._future is not None:
+            # another submit won while this one waited for a slot
+            future.cancel()
+            raise JobError("We have already submitted the job!")
+        self._future = future
+        self._future.add_done_callback(lambda _: self._stream.close())
 
     @requires_submit
     def result(self, timeout=None):
@@ -87,9 +326,115 @@ class ALComJob(BaseJob):
         """
         return self._future.result(timeout=timeout)
 
+    @requires_submit
+    async def result_async(self, timeout=None):
+        """``result`` for coroutines, awaited without a thread per waiter.
+        Cancelling the awaiting task cancels the job, a running one stops at
+        the next gate; a timeout leaves it running.
+        Args:
+            timeout (float): number of seconds to wait for results.
+        Returns:
+            TrimResult: Result object
+        Raises:
+            asyncio.TimeoutError: if timeout occurred.
+            concurrent.futures.CancelledError: if job cancelled before completed.
+        """
+        try:
+            return await self._wait_async(timeout)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+
+    async def _wait_async(self, timeout=None):
+        # the loop is woken when the job ends, the job's own outcome is returned or raised
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+
+        def wake(_):
+            try:
+                loop.call_soon_threadsafe(_set_done, waiter)
+            except RuntimeError:
+                # the event loop is closed
+                pass
+
+        self._future.add_done_callback(wake)
+        await asyncio.wait_for(waiter, timeout)
+        return self._future.result()
+
+    @requires_submit
+    def stream(self, timeout=None):
+        """Iterate over the results of the job as they come in.
+        Every item is a dict (see ``JobStream.update``) with the ``counts`` of
+        the ``shots`` of experiment ``experiment`` sampled so far; once it is
+        ``done`` its result entry comes as ``result``. Experiments come as
+        they finish; with ``backend_options["stream_shots"]`` their counts
+        also come after every batch of that many shots. Updates not read yet
+        are replaced by newer ones of the same experiment. To stop early,
+        leave the loop and ``cancel()`` the job, which then stops at the next
+        batch. On a ``'process'`` executor everything comes at the end.
+        Args:
+            timeout (float): number of seconds to wait for each update.
+        Yields:
+            dict: the updates in the order they were published.
+        Raises:
+            concurrent.futures.TimeoutError: if timeout occurred.
+            concurrent.futures.CancelledError: if job cancelled before completed.
+        """
+        if not self._executor.shares_memory:
+            yield from self._final_updates(self.result(timeout=timeout))
+            return
+        version = 0
+        while True:
+            version, updates = self._stream.wait(version, timeout)
+            if not updates:
+                break
+            yield from updates
+        # the error of a failed or cancelled job
+        self._future.result()
+
+    @requires_submit
+    async def aiter(self, timeout=None):
+        """``stream`` for ``async for``, the waits run in the default executor of the loop.
+        Args:
+            timeout (float): number of seconds to wait for each update.
+        """
+        if not self._executor.shares_memory:
+            for update in self._final_updates(await self._wait_async(timeout)):
+                yield update
+            return
+        loop = asyncio.get_running_loop()
+        version = 0
+        while True:
+            version, updates = await loop.run_in_executor(None, self._stream.wait,
+                                                          version, timeout)
+            if not updates:
+                break
+            for update in updates:
+                yield update
+        await self._wait_async()
+
+    @staticmethod
+    def _final_updates(result):
+        return [JobStream.update(index, entry.get("name"), entry.get("counts"), entry.get("shots"),
+                                 entry.get("shots"), result=entry)
+                for index, entry in enumerate(result.results)]
+
     @requires_submit
     def cancel(self):
-        return self._future.cancel()
+        """Cancel the job, also when it is already running.
+        A running job stops at the next gate of an experiment run in its
+        own process, otherwise at the next experiment boundary (or shot
+        batch of ``stream_shots``); on a ``'process'`` executor only queued
+        jobs can be cancelled.
+        Returns:
+            bool: whether the job will not complete.
+        """
+        if self._future.cancel():
+            return True
+        if self._future.done() or not self._executor.shares_memory:
+            return False
+        self._cancel_event.set()
+        return True
 
     @requires_submit
     def status(self):
@@ -105,6 +450,9 @@ class ALComJob(BaseJob):
             _status = JobStatus.RUNNING
         elif self._future.cancelled():
             _status = JobStatus.CANCELLED
+        elif self._future.done() and isinstance(self._future.exception(), futures.CancelledError):
+            # cancelled while running, see cancel()
+            _status = JobStatus.CANCELLED
         elif self._future.done():
             _status = JobStatus.DONE if self._future.exception() is None else JobStatus.ERROR
         else:
@@ -15,25 +15,56 @@ import logging
 from typing import Dict, List, Tuple, Union, Any
 
 from qiskit.providers import BaseProvider
-from .qasm_simulator_alcom import QasmSimulator
 
 logger = logging.getLogger(__name__)
 
 
+def _qasm_simulator(provider, **kwargs):
+    # the backend stack (NumPy, the engines) is imported with the first backend
+    from .qasm_simulator_alcom import QasmSimulator
+    return QasmSimulator(provider=provider, **kwargs)
+
+
 class ALComProvider(BaseProvider):
     """
     Provider for the ALcom BBD backend.
     Writthen at 2020 NTU=IMBQ Q-Camp.
     The original paper is at `https://arxiv.org/abs/2007.09304`.
+    Backends are built on their first ``get_backend``.
     """
 
-    def __init__(self, *args, **kwargs):
+    # backend name -> factory(provider, executor=..., result_cache=...)
+    BACKENDS = {'qasm_simulator': _qasm_simulator}
+
+    def __init__(self, *args, executor: 'ALComExecutor' = None,
+                 result_cache: 'ResultCache' = None, **kwargs):
+        """
+        Args:
+            executor (ALComExecutor): executor shared by the jobs of every
+                                      backend of this provider, e.g.
+                                      ``ALComExecutor('thread', max_workers=8, max_queue=64)``.
+                                      The process wide default runs one job at a time.
+            result_cache (ResultCache): cache of experiment results shared by
+                                        the backends, e.g. ``ResultCache(max_bytes=1 << 30)``.
+                                        Nothing is cached if None.
+        """
         super().__init__(args, kwargs)
-        # Populate the list of local ALcom backends.
-        self.backends_list = {'qasm_simulator': QasmSimulator(provider=self)}
+        self._backend_options = {'executor': executor, 'result_cache': result_cache}
+        # the local ALcom backends built so far
+        self._backends = {}
+
+    @property
+    def backends_list(self):
+        """Every local ALcom backend by name, built on first access."""
+        return {name: self.get_backend(name) for name in self.BACKENDS}
 
     def get_backend(self, name: str, **kwargs):
-        return self.backends_list[name]
+        backend = self._backends.get(name)
+        if backend is None:
+            if name not in self.BACKENDS:
+                raise KeyError(name)
+            backend = self._backends[name] = self.BACKENDS[name](self, **self._backend_options)
+        return backend
 
     def available_backends(self, filters=None):
         # pylint: disable=arguments-differ
@@ -50,4 +81,4 @@ class ALComProvider(BaseProvider):
         return list(self.backends_list.values())
 
     def __str__(self):
-        return 'ALcomProvider'
\ No newline at end of file
+        return 'ALcomProvider'
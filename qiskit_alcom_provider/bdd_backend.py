@@ -20,9 +20,13 @@ This is a wrapper for executives from c++ files.
 import json
 import logging
 import datetime
+import functools
 import os
+import tempfile
 import time
 import uuid
+from concurrent import futures
+import numpy as np
 from numpy import ndarray
 
 from typing import Union, Dict, Any, List, Tuple, Iterable
@@ -32,19 +36,131 @@ from qiskit.providers.models import BackendStatus, BackendConfiguration
 from qiskit.qobj import QasmQobjConfig, validate_qobj_against_schema
 #from qiskit.result import Result, after hackathon todo
 from qiskit.util import local_hardware_info # for how many quibit can be simulated
-# to get quantm circuit
-from qiskit.assembler import disassemble
 
 # Local Import 
-from .alcom_job import ALComJob
-from .alcom_error import ALComError
+from .alcom_job import ALComJob, ALComExecutor
+from .alcom_error import ALComError, ALComResourceError
+from .circuit_ir import CircuitIR
+from .circuit_opt import optimize_circuit
+from .engine_select import available_memory, choose_engine
+from .noise import TrajectoryNoise
+from .profiling import NULL_PROFILER, Profiler, get_profiler
+from .result_cache import ResultCache
+from .sampling import memory_dtype, observable_terms
 from .trimmed_result import TrimResult as Result
+from .validation import CircuitValidator
 
 # Import Pybind
 
 # Logger
 logger = logging.getLogger(__name__)
 
+# result arrays a controller may return
+_ARRAY_FIELDS = ("statevector", "memory", "sparse_indices", "sparse_amplitudes")
+_STATEVECTOR_FIELDS = ("statevector", "sparse_indices", "sparse_amplitudes")
+
+
+def _run_controller(controller, options, circuit, seed, shots=None, spill_bytes=None,
+                    fallback=None, profile=None, cancel_event=None):
+    """
+    Run one experiment, module level so that process pools can pickle it.
+    ``shots`` overrides the shots of ``options`` (one chunk of an experiment).
+    In a worker process, arrays of at least ``spill_bytes`` are written to a
+    temporary ``.npy`` file and sent back as a ``_SpilledArray`` handle.
+    ``fallback`` is ``(engine, controller, options)`` to run the experiment
+    again when it outgrows its budget, the output then records it as ``fallback``.
+    ``profile`` is ``(max_events, gates)`` to trace the experiment, the
+    events go back as ``profile`` in the output, see ``profiling``.
+    ``cancel_event`` is handed to the controller, which checks it before
+    every gate; only experiments run in the process of the job get one.
+    """
+    profiler = NULL_PROFILER
+    if profile is not None:
+        profiler = Profiler(*profile)
+        if profiler.gates:
+            options = dict(options, profiler=profiler)
+    if cancel_event is not None:
+        options = dict(options, cancel_event=cancel_event)
+    try:
+        with profiler.span("experiment", "experiment", circuit=circuit.name):
+            output = controller(circuit, seed=seed, **_shot_options(options, shots))
+    except ALComResourceError as err:
+        if fallback is None:
+            raise
+        engine, controller, options = fallback
+        logger.warning("%s, running %s on the %s engine", err.message, circuit.name, engine)
+        if profiler.gates:
+            options = dict(options, profiler=profiler)
+        if cancel_event is not None:
+            options = dict(options, cancel_event=cancel_event)
+        with profiler.span("experiment", "experiment", circuit=circuit.name, fallback=engine):
+            output = controller(circuit, seed=seed, **_shot_options(options, shots))
+        if isinstance(output, dict):
+            output["fallback"] = {"engine": engine, "reason": err.message}
+    if profiler.enabled and isinstance(output, dict):
+        if "bdd_stats" in output:
+            profiler.counter("bdd_stats", nodes=output["bdd_stats"]["nodes"],
+                             peak_nodes=output["bdd_stats"]["peak_nodes"])
+        output["profile"] = profiler.events
+    if spill_bytes is not None and isinstance(output, dict):
+        for key in _ARRAY_FIELDS:
+            value = output.get(key)
+            if (isinstance(value, ndarray) and value.dtype != object
+                    and value.nbytes >= spill_bytes):
+                output[key] = _SpilledArray.dump(value)
+    return output
+
+
+def _shot_options(options, shots):
+    return options if shots is None else dict(options, shots=shots)
+
+
+def _merge_shot_chunks(outputs, shots):
+    """One output from the unpacked outputs of the shot chunks of an experiment."""
+    merged = dict(outputs[0])
+    counts = {}
+    for output in outputs:
+        for key, hits in output["counts"].items():
+            counts[key] = counts.get(key, 0) + hits
+    merged["counts"] = counts
+    for output in outputs:
+        if "fallback" in output:
+            merged["fallback"] = output["fallback"]
+    if "fidelity" in merged:
+        merged["fidelity"] = min(output["fidelity"] for output in outputs)
+    if merged.get("memory") is not None:
+        merged["memory"] = np.concatenate([output["memory"] for output in outputs])
+    if merged.get("expectation_values") is not None:
+        merged["expectation_values"] = np.average(
+            [output["expectation_values"] for output in outputs], axis=0, weights=shots)
+    return merged
+
+
+class _SpilledArray():
+    """Array left by a worker process in a temporary file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def dump(cls, array):
+        fd, path = tempfile.mkstemp(prefix="alcom-", suffix=".npy")
+        with os.fdopen(fd, "wb") as handle:
+            np.save(handle, array)
+        return cls(path)
+
+    def load(self):
+        """Map the file read-only and remove it, the mapping keeps the data alive."""
+        array = np.load(self.path, mmap_mode="r")
+        try:
+            os.unlink(self.path)
+        except OSError:
+            # mapped files cannot be removed on every platform
+            array = np.array(array)
+            os.unlink(self.path)
+        return array
+
+
 class AerJSONEncoder(json.JSONEncoder):
     """
     JSON encoder for NumPy arrays and complex numbers.
@@ -75,15 +191,31 @@ class BDDBackend(BaseBackend):
     def __init__(self,
                  controller,
                  configuration: BackendConfiguration,
-                 provider: BaseProvider=None
+                 provider: BaseProvider=None,
+                 engines: Dict[str, Any]=None,
+                 executor: ALComExecutor=None,
+                 result_cache: ResultCache=None
                 ):
         """
         This method should initialize the module and its configuration, and
         raise an exception if a component of the module is
         not available.
         Args:
+            controller (callable): default engine, called as
+                                   ``controller(circuit, use_statevector, shots)``
+                                   with a ``CircuitIR``, returns a dict of
+                                   ``counts`` and NumPy arrays; the jobs run
+                                   in this process also pass ``cancel_event``
+                                   to check between gates
             configuration (BackendConfiguration): backend configuration
             provider (BaseProvider): provider responsible for this backend
+            engines (dict): extra controllers with the same contract, selected
+                            by ``backend_options["engine"]``
+            executor (ALComExecutor): executor for the jobs of this backend,
+                                      the process wide default if None
+            result_cache (ResultCache): cache of experiment results, the
+                                        controllers must then take ``state``
+                                        and ``keep_state``; no cache if None
         Raises:
             FileNotFoundError if backend executable is not available.
             BDDError: if there is no name in the configuration
@@ -91,6 +223,12 @@ class BDDBackend(BaseBackend):
         super().__init__(configuration=configuration, provider=provider)
         # TODO
         self._controller = controller
+        self._engines = dict(engines or {})
+        self._executor = executor if executor is not None else ALComJob._executor
+        self._result_cache = result_cache
+        self._validator = CircuitValidator()
+        self._process_pool = None
+        self._process_pool_workers = 0
         self._logger = logging.getLogger("BDDBackend")
         self._logger.setLevel(logging.INFO)
 
@@ -103,7 +241,9 @@ class BDDBackend(BaseBackend):
                                             for the execution (default: None).
             noise_model (NoiseModel or None): noise model to use for
                                               simulation (default: None).
-            validate (bool): validate the Qobj before running (default: True).
+            validate (bool or str): validate the Qobj before running (default: True).
+                                    ``"fast"`` skips the schema check and only
+                                    checks the circuits, see ``_validate_job``.
         Returns:
             AerJob: The simulation job.
         Additional Information:
@@ -113,16 +253,34 @@ class BDDBackend(BaseBackend):
             * If present the ``noise_model`` will override any noise model
               specified in the ``backend_options`` or ``Qobj.config``.
         """
-        # Does not support NoiseModel Now 
-        if noise_model is not None:
-            raise NoiseModelNotSupportedError
         # Submit job
         job_id = str(uuid.uuid4())
         alcom_job = ALComJob(self, job_id, self._run_job, qobj,
-                         backend_options, noise_model, validate)
+                         backend_options, noise_model, validate,
+                         executor=self._executor)
         alcom_job.submit()
         return alcom_job
 
+    async def run_async(self, qobj, backend_options=None, noise_model=None, validate=True):
+        """
+        ``run`` for coroutines, on the same executor: a full queue
+        (``ALComExecutor(max_queue=...)``) is awaited instead of blocking the
+        event loop, ``await job.result_async()`` gets the result.
+        Returns:
+            ALComJob: The simulation job.
+        """
+        job_id = str(uuid.uuid4())
+        alcom_job = ALComJob(self, job_id, self._run_job, qobj,
+                             backend_options, noise_model, validate,
+                             executor=self._executor)
+        await alcom_job.submit_async()
+        return alcom_job
+
+    @property
+    def result_cache(self):
+        """The ``ResultCache`` of this backend (hits, misses, stats()), or None."""
+        return self._result_cache
+
     def status(self):
         """Return backend status.
         Returns:
@@ -131,60 +289,511 @@ class BDDBackend(BaseBackend):
         return BackendStatus(backend_name=self.name(),
                              backend_version=self.configuration().backend_version,
                              operational=True,
-                             pending_jobs=0,
+                             pending_jobs=self._executor.pending_jobs,
                              status_msg='')
 
-    def _run_job(self, job_id, qobj, backend_options, noise_model, validate):
-        """Run a qobj job"""
+    def _run_job(self, job_id, qobj, backend_options, noise_model, validate,
+                 cancel_event=None, stream=None):
+        """
+        Run a qobj job, ``cancel_event`` is polled between experiments.
+        With ``backend_options["profile"]`` (or ``ALCOM_PROFILE``) the phases,
+        experiments and, for ``"gates"``, the gates are traced into the
+        ``Profiler`` of the result, see ``profiling``.
+        ``stream`` (a ``JobStream``) gets every experiment as it finishes and,
+        with ``backend_options["stream_shots"]``, its counts after every batch
+        of that many shots, see ``_stream_shots``.
+        """
         start = time.time()
-        if validate:
-            validate_qobj_against_schema(qobj)
-            self._validate(qobj, backend_options, noise_model)
+        job_start = time.perf_counter()
+        backend_options = backend_options or {}
+        profiler = get_profiler(backend_options)
         # convert to  format that can run on our simulator
         # and extract flag from backend_options
-        qasm_str = self._get_qasm_str_from_qobj(qobj)
+        with profiler.span("from_qobj", experiments=len(qobj.experiments)):
+            try:
+                circuits = self._get_circuits_from_qobj(qobj)
+            except Exception:
+                # a malformed qobj is reported by the schema
+                if validate and validate != "fast":
+                    validate_qobj_against_schema(qobj)
+                raise
+        if validate:
+            with profiler.span("validate"):
+                self._validate_job(qobj, circuits, validate, backend_options, noise_model)
+        if noise_model is None:
+            noise_model = backend_options.get("noise_model")
+        if noise_model is not None:
+            # channels go in before fusion, which keeps them as barriers
+            with profiler.span("noise"):
+                noise = TrajectoryNoise.from_noise_model(noise_model)
+                circuits = [noise.apply(circuit) for circuit in circuits]
         # get shots from qobj config
         shots = qobj.config.shots if "shots" in qobj.config.__dir__() else 1
         # get method from backend_options if provided, default is `Counts Mode` where BBDBackend excels
-        if backend_options is None:
-            use_statevector = False
-            self._logger.warning(msg=f"The simulator is using Counts Mode")
-        elif backend_options["method"] == "statevector":
+        method = backend_options.get("method")
+        engine_options = {}
+        coefficients = None
+        if method == "statevector":
             use_statevector = True
             self._logger.warning(msg=f"The simulator is using Statevector Mode")
-        elif backend_options["method"] in ["counts", "count"] or backend_options["method"] is None:
+        elif method == "sparse_statevector":
+            use_statevector = True
+            # only the amplitudes above the threshold in magnitude are returned
+            engine_options["sparse_threshold"] = backend_options.get("sparse_threshold", 0.0)
+            self._logger.warning(msg=f"The simulator is using Sparse Statevector Mode")
+        elif method == "expectation":
+            # exact <P> of every Pauli term on the final state, no shots
+            use_statevector = False
+            if backend_options.get("observables") is None:
+                raise ALComError("the expectation method needs backend_options['observables']")
+            labels, coefficients = observable_terms(backend_options["observables"])
+            engine_options["observables"] = labels
+            self._logger.warning(msg=f"The simulator is using Expectation Mode")
+        elif method in ["counts", "count", "automatic"] or method is None:
+            # the engine is picked per circuit unless backend_options["engine"] is set
             use_statevector = False
             self._logger.warning(msg=f"The simulator is using Counts Mode")
         else:
             raise ALComError("the backend method is not supported")
-        # Now the output is of type TrimResult
-        # TODO after hackathon prototype: use QOBJ, Result and ExperimentResult together
-        output = self._controller(qasm_str, use_statevector, shots)
-        #output.replace("'", "\"")
-        import ast
-        output = ast.literal_eval(output)
-        ##########################
-        self._validate_controller_output(output)
+        with profiler.span("select_engines"):
+            engines, selections = self._select_engines(circuits, backend_options)
+        memory = backend_options.get("memory", getattr(qobj.config, "memory", False))
+        # one seed per experiment, derived from seed_simulator as in Aer
+        seed = backend_options.get("seed_simulator", getattr(qobj.config, "seed_simulator", None))
+        seeds = [None if seed is None else seed + i for i in range(len(circuits))]
+        outputs = [None] * len(circuits)
+        removed_gates = [None] * len(circuits)
+        # experiments whose result entry went to the stream
+        streamed = set()
+
+        def publish(i, output, done):
+            if not done:
+                stream.publish(i, circuits[i].name, output["counts"], output["shots"], shots)
+                return
+            self._format_output(output, circuits[i], shots, removed_gates[i], engines[i],
+                                selections[i], coefficients)
+            streamed.add(i)
+            stream.publish(i, circuits[i].name, output["counts"], shots, shots, result=output)
+
+        # one batch per engine, the outputs go back in experiment order
+        for engine in dict.fromkeys(engines):
+            index = [i for i, name in enumerate(engines) if name == engine]
+            engine_backend_options = dict(backend_options, engine=engine)
+            controller, engine_kwargs = self._get_controller(engine_backend_options)
+            with profiler.span("optimize", engine=engine):
+                group, removed = self._optimize_circuits([circuits[i] for i in index],
+                                                         engine_backend_options)
+            for i, count in zip(index, removed):
+                removed_gates[i] = count
+            group_publish = None
+            if stream is not None:
+                group_publish = functools.partial(self._publish_group, publish, index)
+            # Now the output is of type TrimResult
+            # TODO after hackathon prototype: use QOBJ, Result and ExperimentResult together
+            options = dict(use_statevector=use_statevector, shots=shots, memory=memory,
+                           **engine_options, **engine_kwargs)
+            fallback = self._get_fallback(engine, engine_options, options, backend_options)
+            if self._result_cache is not None and backend_options.get("result_cache", True):
+                key_options = dict(engine_options, **engine_kwargs, engine=engine,
+                                   method=method or "counts")
+                if "stream_shots" in backend_options:
+                    # the batches draw other shots than one sampling
+                    key_options["stream_shots"] = backend_options["stream_shots"]
+                ran = self._run_cached(controller, options, key_options, group,
+                                       [seeds[i] for i in index], backend_options, cancel_event,
+                                       fallback, profiler, group_publish)
+            else:
+                ran = self._simulate(controller, options, group, [seeds[i] for i in index],
+                                     backend_options, cancel_event, fallback, profiler,
+                                     group_publish)
+            for i, output in zip(index, ran):
+                outputs[i] = output
+        with profiler.span("format_results"):
+            for i, output in enumerate(outputs):
+                if i not in streamed:
+                    self._format_output(output, circuits[i], shots, removed_gates[i], engines[i],
+                                        selections[i], coefficients)
+            results = outputs
         end = time.time()
-        return self._format_results(job_id, output, end - start)
+        profiler.complete("job", job_start, time.perf_counter(), job_id=job_id)
+        return self._format_results(job_id, {"results": results}, end - start,
+                                    profiler if profiler.enabled else None)
+
+    @staticmethod
+    def _format_output(output, circuit, shots, removed, engine, selection, coefficients):
+        """Complete the result entry of one experiment."""
+        output["name"] = circuit.name
+        output["shots"] = shots
+        output["fusion"] = {"enabled": removed is not None,
+                            "gates_removed": removed or 0}
+        output["creg_sizes"] = circuit.creg_sizes
+        output["num_qubits"] = circuit.num_qubits
+        output["engine"] = output["fallback"]["engine"] if "fallback" in output else engine
+        if selection is not None:
+            output["engine_selection"] = selection
+        if coefficients is not None:
+            output["expectation_coefficients"] = coefficients
 
-    def _get_qasm_str_from_qobj(self, qobj):
+    @staticmethod
+    def _publish_group(publish, index, k, output, done):
+        # experiment k of an engine group is experiment index[k] of the job
+        publish(index[k], output, done)
+
+    def _simulate(self, controller, options, circuits, seeds, backend_options,
+                  cancel_event=None, fallback=None, profiler=NULL_PROFILER, publish=None):
         """
-        convert to format(QASM) that can run on our simulator,
-        we now assume that there is only one experiment(QC) (2020/9/9, YT Lin),
-        can do multi-circuit easily by list comprehension 
+        Run the experiments and unpack their outputs, see ``_run_controller``
+        for ``fallback``; the events the experiments traced go to ``profiler``.
+        With ``max_parallel_shots`` other than 1 (0 means one chunk per worker)
+        the shots of dynamic circuits (noise, mid-circuit measurements) are
+        split into chunks run as separate tasks of the process pool, each
+        with its own trajectories and seed, and merged back per experiment.
+        With ``stream_shots`` the shots of the other circuits are sampled
+        that many at a time, see ``_stream_shots``. ``publish(k, output, done)``
+        gets every output as it comes in, unless the caller keeps the final
+        states, and the counts after every batch.
+        Returns:
+            list: unpacked controller outputs in experiment order.
         """
-        original_config = qobj.config
-        assert len(disassemble(qobj)[0]) == 1, "we now assume that there is only one experiment(QC) (2020/9/9, YT Lin)"
-        qc = disassemble(qobj)[0][0]
-        qasm_str = qc.qasm()
-        # print(qasm_str)
-        return qasm_str
+        profile = (profiler.max_events, profiler.gates) if profiler.enabled else None
+        run_experiment = functools.partial(_run_controller, controller, options,
+                                           fallback=fallback, profile=profile)
+        shots = options["shots"]
+        max_threads = backend_options.get("max_parallel_threads", 0) or os.cpu_count() or 1
+        chunks = min(backend_options.get("max_parallel_shots", 1) or max_threads, shots)
+        if chunks <= 1 or not any(circuit.is_dynamic for circuit in circuits):
+            on_output = first_shots = None
+            batch = backend_options.get("stream_shots")
+            if not batch or batch >= shots:
+                batch = None
+            else:
+                # the first batch keeps its final state to sample the others from
+                first_shots = [batch] * len(circuits)
+                first_fallback = fallback
+                if fallback is not None:
+                    first_fallback = fallback[:2] + (dict(fallback[2], keep_state=True),)
+                run_experiment = functools.partial(
+                    _run_controller, controller, dict(options, keep_state=True),
+                    fallback=first_fallback, profile=profile)
+            if publish is not None or batch is not None:
+                on_output = functools.partial(
+                    self._finish_experiment, controller, options, fallback, circuits, seeds,
+                    shots, batch, cancel_event, publish, profiler)
+            with profiler.span("simulate", experiments=len(circuits)):
+                outputs = self._run_experiments(run_experiment, circuits, seeds,
+                                                backend_options, cancel_event, first_shots,
+                                                on_output)
+            with profiler.span("unpack"):
+                return [self._unpack_controller_output(output, circuit, profiler)
+                        for circuit, output in zip(circuits, outputs)]
+        # (experiment, seed, shots) of every task
+        tasks = []
+        for i, (circuit, seed) in enumerate(zip(circuits, seeds)):
+            if not circuit.is_dynamic:
+                tasks.append((i, seed, shots))
+                continue
+            chunk_seeds = [None] * chunks if seed is None else \
+                np.random.SeedSequence(seed).generate_state(chunks).tolist()
+            tasks.extend((i, chunk_seed, shots // chunks + (j < shots % chunks))
+                         for j, chunk_seed in enumerate(chunk_seeds))
+        with profiler.span("simulate", experiments=len(circuits), tasks=len(tasks)):
+            outputs = self._run_experiments(run_experiment,
+                                            [circuits[i] for i, _, _ in tasks],
+                                            [seed for _, seed, _ in tasks],
+                                            dict(backend_options, max_parallel_experiments=0),
+                                            cancel_event, [n for _, _, n in tasks])
+        with profiler.span("unpack"):
+            parts = [[] for _ in circuits]
+            for (i, _, n), output in zip(tasks, outputs):
+                parts[i].append((n, self._unpack_controller_output(output, circuits[i],
+                                                                   profiler)))
+            outputs = [_merge_shot_chunks([output for _, output in chunk], [n for n, _ in chunk])
+                       for chunk in parts]
+        if publish is not None and not options.get("keep_state"):
+            for k, output in enumerate(outputs):
+                publish(k, output, True)
+        return outputs
 
-    def _format_results(self, job_id, output, time_taken):
+    def _finish_experiment(self, controller, options, fallback, circuits, seeds, shots, batch,
+                           cancel_event, publish, profiler, k, output):
+        """
+        Unpack the output of experiment ``k`` as it comes in, sample its
+        other shot batches if its first ``batch`` shots ran alone and
+        publish it, see ``_simulate``.
+        """
+        output = self._unpack_controller_output(output, circuits[k], profiler)
+        if batch is not None:
+            # the other batches run on the engine that ran the first one
+            engine_controller, engine_options = (fallback[1:] if "fallback" in output
+                                                 else (controller, options))
+            output = self._stream_shots(engine_controller, engine_options, circuits[k], seeds[k],
+                                        shots, batch, output, cancel_event,
+                                        publish and functools.partial(publish, k), profiler)
+        if publish is not None and not options.get("keep_state"):
+            publish(k, output, True)
+        return output
+
+    def _stream_shots(self, controller, options, circuit, seed, shots, batch, output,
+                      cancel_event=None, publish=None, profiler=NULL_PROFILER):
+        """
+        Sample the rest of the ``shots`` of an experiment whose first
+        ``batch`` shots gave ``output``, ``batch`` at a time, and publish the
+        counts so far after each batch with ``publish(output, False)`` if given.
+        Static circuits re-sample the final state the first run kept, dynamic
+        ones run again. The batches after the first get the seeds
+        ``SeedSequence(seed)`` generates, as the chunks of ``max_parallel_shots``.
+        Returns:
+            dict: the output of all the shots, with the final state only if
+            ``options`` keep it.
+        Raises:
+            concurrent.futures.CancelledError: if ``cancel_event`` got set.
+        """
+        state = output.pop("state", None)
+        if options.get("keep_state"):
+            output["state"] = state
+        if output.get("expectation_values") is not None:
+            # exact values, there are no shots to sample
+            return output
+        rest = shots - batch
+        sizes = [batch] * (rest // batch) + ([rest % batch] if rest % batch else [])
+        seeds = [None] * len(sizes) if seed is None else \
+            np.random.SeedSequence(seed).generate_state(len(sizes)).tolist()
+        counts = output["counts"]
+        memory = [output["memory"]] if output.get("memory") is not None else None
+        done = batch
+        if publish is not None:
+            publish({"counts": dict(counts), "shots": done}, False)
+        batch_options = dict(options, use_statevector=False, keep_state=False)
+        for size, batch_seed in zip(sizes, seeds):
+            if cancel_event is not None and cancel_event.is_set():
+                raise futures.CancelledError()
+            with profiler.span("stream_batch", "experiment", circuit=circuit.name, shots=size):
+                part = controller(circuit, seed=batch_seed, state=state,
+                                  **dict(batch_options, shots=size))
+                part = self._unpack_controller_output(part, circuit, profiler)
+            for key, hits in part["counts"].items():
+                counts[key] = counts.get(key, 0) + hits
+            if memory is not None:
+                memory.append(part["memory"])
+            if "fidelity" in part:
+                output["fidelity"] = min(output.get("fidelity", 1.0), part["fidelity"])
+            done += size
+            if publish is not None:
+                publish({"counts": dict(counts), "shots": done}, False)
+        if memory is not None:
+            output["memory"] = np.concatenate(memory)
+        return output
+
+    def _run_experiments(self, run_experiment, circuits, seeds, backend_options,
+                         cancel_event=None, shots=None, on_output=None):
+        """
+        Run every experiment, in a process pool when there are several.
+        ``max_parallel_threads`` caps the number of workers (0 means every core),
+        ``max_parallel_experiments`` caps how many experiments run at once
+        (0 means as many as the workers, 1 means serial) as in Aer.
+        Workers hand arrays of ``result_mmap_bytes`` or more back through a
+        memory-mapped file instead of the pool pipe. ``shots`` gives the shots
+        of every task when they differ from the job's. ``on_output(k, output)``
+        sees every output as it comes in and returns the one to keep.
+        Returns:
+            list: controller outputs in experiment order.
+        Raises:
+            concurrent.futures.CancelledError: if ``cancel_event`` got set.
+        """
+        max_threads = backend_options.get("max_parallel_threads", 0) or os.cpu_count() or 1
+        max_experiments = backend_options.get("max_parallel_experiments", 1)
+        workers = min(len(circuits), max_experiments or max_threads, max_threads)
+        args = (circuits, seeds) if shots is None else (circuits, seeds, shots)
+        if workers <= 1:
+            # experiments in this process stop at the next gate once cancelled
+            outputs = map(functools.partial(run_experiment, cancel_event=cancel_event), *args)
+        else:
+            pool = self._get_process_pool(workers)
+            # big chunks amortize the pickling of thousands of small circuits
+            chunksize = max(1, len(circuits) // (4 * workers))
+            run_experiment = functools.partial(
+                run_experiment, spill_bytes=backend_options.get("result_mmap_bytes", 1 << 24))
+            outputs = pool.map(run_experiment, *args, chunksize=chunksize)
+        results = []
+        for output in outputs:
+            if cancel_event is not None and cancel_event.is_set():
+                # dropping the pool iterator cancels the experiments not started yet
+                raise futures.CancelledError()
+            if on_output is not None:
+                output = on_output(len(results), output)
+            results.append(output)
+        return results
+
+    def _run_cached(self, controller, options, key_options, circuits, seeds,
+                    backend_options, cancel_event=None, fallback=None,
+                    profiler=NULL_PROFILER, publish=None):
+        """
+        Run the experiments through the result cache.
+        A hit with a fixed seed and the same shots and memory flag returns the
+        stored output; any other hit only re-samples the shots from the stored
+        final state. Misses are simulated, in a process pool if allowed, and
+        stored with their final state. Every output goes to ``publish``, see
+        ``_simulate``.
+        Returns:
+            list: unpacked controller outputs in experiment order.
+        """
+        cache = self._result_cache
+        with profiler.span("fingerprint"):
+            keys = [circuit.fingerprint(seed=seed, **key_options)
+                    for circuit, seed in zip(circuits, seeds)]
+        outputs = [None] * len(circuits)
+        missing = []
+        for i, (circuit, seed, key) in enumerate(zip(circuits, seeds, keys)):
+            entry = cache.get(key)
+            if entry is None:
+                missing.append(i)
+            elif (seed is not None and entry["shots"] == options["shots"]
+                  and entry["memory"] == options["memory"]):
+                outputs[i] = dict(entry["output"])
+            elif entry["state"] is None:
+                # dynamic circuits keep no final state, they are simulated again
+                missing.append(i)
+            else:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise futures.CancelledError()
+                # the statevector fields are reused, only the shots are drawn again
+                with profiler.span("resample", "experiment", circuit=circuit.name):
+                    output = controller(circuit, seed=seed, state=entry["state"],
+                                        **dict(options, use_statevector=False))
+                output = self._unpack_controller_output(output, circuit)
+                for field in _STATEVECTOR_FIELDS:
+                    if field in entry["output"]:
+                        output[field] = entry["output"][field]
+                outputs[i] = output
+            if outputs[i] is not None and publish is not None:
+                publish(i, outputs[i], True)
+        if missing:
+            if fallback is not None:
+                fallback = fallback[:2] + (dict(fallback[2], keep_state=True),)
+            missing_publish = None
+            if publish is not None:
+                missing_publish = functools.partial(self._publish_group, publish, missing)
+            ran = self._simulate(controller, dict(options, keep_state=True),
+                                 [circuits[i] for i in missing], [seeds[i] for i in missing],
+                                 backend_options, cancel_event, fallback, profiler,
+                                 missing_publish)
+            for i, output in zip(missing, ran):
+                state = output.pop("state", None)
+                if "fallback" in output:
+                    # the state of another engine cannot be read out by this one
+                    state = None
+                cache.put(keys[i], {"output": dict(output), "state": state,
+                                    "shots": options["shots"], "memory": options["memory"]})
+                outputs[i] = output
+                if publish is not None:
+                    publish(i, output, True)
+        return outputs
+
+    def _get_process_pool(self, workers):
+        """Process pool shared by the jobs of this backend, resized on demand."""
+        if self._process_pool is None or self._process_pool_workers != workers:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False)
+            self._process_pool = futures.ProcessPoolExecutor(max_workers=workers)
+            self._process_pool_workers = workers
+        return self._process_pool
+
+    def _optimize_circuits(self, circuits, backend_options):
+        """
+        Gate cancellation and fusion before simulation, see ``circuit_opt``.
+        ``fusion_enable`` (default True) switches it off, ``fusion_max_qubits``
+        (default 2) bounds the fused blocks; the BDD engine only gets rewrites
+        that keep its angles exact.
+        Returns:
+            tuple: the circuits and the number of operations removed from each,
+            None when the pass is off.
+        """
+        if not backend_options.get("fusion_enable", True):
+            return circuits, [None] * len(circuits)
+        exact = backend_options.get("engine", "bdd") == "bdd"
+        max_qubits = backend_options.get("fusion_max_qubits", 2)
+        optimized = [optimize_circuit(circuit, max_qubits, exact) for circuit in circuits]
+        removed = [count for _, count in optimized]
+        self._logger.info("gate fusion removed %d operations", sum(removed))
+        return [circuit for circuit, _ in optimized], removed
+
+    def _select_engines(self, circuits, backend_options):
+        """
+        Engine of every circuit. ``backend_options["engine"]`` applies to all
+        of them; ``"automatic"`` (the default when a dense engine is
+        registered) weighs the dense state against the physical memory, or
+        ``max_memory_mb``, and the BDD growth risk, see ``engine_select``.
+        Returns:
+            tuple: the engine names and the decision records, None for the
+            circuits whose engine was given.
+        """
+        engine = backend_options.get("engine")
+        if engine is None:
+            engine = "automatic" if "dense" in self._engines else "bdd"
+        if engine != "automatic":
+            return [engine] * len(circuits), [None] * len(circuits)
+        if "max_memory_mb" in backend_options:
+            max_memory = backend_options["max_memory_mb"] << 20
+        else:
+            max_memory = available_memory()
+        precision = backend_options.get("precision", "double")
+        engines, selections = [], []
+        for circuit in circuits:
+            choice, selection = choose_engine(circuit, precision, max_memory)
+            self._logger.info("circuit %s runs on the %s engine: %s", circuit.name, choice,
+                              selection["reason"])
+            engines.append(choice)
+            selections.append(selection)
+        return engines, selections
+
+    def _get_controller(self, backend_options):
+        """
+        Pick the engine from ``backend_options["engine"]``,
+        the default controller is used when it is missing or ``"bdd"``.
+        Returns:
+            tuple: the controller and the extra keyword arguments it takes.
+        """
+        engine = backend_options.get("engine")
+        if engine is None or engine == "bdd":
+            # budgets and variable order of the BDD manager
+            return self._controller, {key: backend_options[key]
+                                      for key in ("max_nodes", "max_memory_mb", "qubit_order",
+                                                  "sift_threshold", "approximation_fidelity",
+                                                  "approximation_threshold")
+                                      if key in backend_options}
+        if engine not in self._engines:
+            raise ALComError("the backend engine {} is not supported".format(engine))
+        engine_kwargs = {}
+        if "precision" in backend_options:
+            engine_kwargs["precision"] = backend_options["precision"]
+        return self._engines[engine], engine_kwargs
+
+    def _get_fallback(self, engine, engine_options, options, backend_options):
+        """
+        ``(engine, controller, options)`` of ``backend_options["fallback_engine"]``
+        for the BDD experiments that outgrow ``max_nodes`` or ``max_memory_mb``,
+        None to raise ``ALComResourceError`` instead.
+        """
+        fallback = backend_options.get("fallback_engine")
+        if engine != "bdd" or fallback is None or fallback == "bdd":
+            return None
+        controller, engine_kwargs = self._get_controller(dict(backend_options, engine=fallback))
+        base = {key: options[key] for key in ("use_statevector", "shots", "memory")}
+        return fallback, controller, dict(base, **engine_options, **engine_kwargs)
+
+    def _get_circuits_from_qobj(self, qobj):
+        """
+        convert to format(CircuitIR) that can run on our simulator,
+        the instructions are packed directly, no QuantumCircuit or QASM on the way.
+        one CircuitIR per experiment, in qobj order
+        """
+        return [CircuitIR.from_experiment(experiment, qobj.config)
+                for experiment in qobj.experiments]
+
+    def _format_results(self, job_id, output, time_taken, profiler=None):
         """
         Construct Result object from simulator output.
-        And add extra information.
+        And add extra information, the ``Profiler`` of the job if profiled.
         """
         # Add result metadata
         output["job_id"] = job_id
@@ -192,8 +801,40 @@ class BDDBackend(BaseBackend):
         output["backend_name"] = self.name()
         output["backend_version"] = self.configuration().backend_version
         output["time_taken"] = time_taken
+        if profiler is not None:
+            output["profile"] = profiler
         return Result.from_dict(output) # is TrimResult
 
+    def _unpack_controller_output(self, output, circuit, profiler=NULL_PROFILER):
+        """
+        Turn a controller output into a result entry.
+        Controllers return a small dict with NumPy arrays, which is kept as is;
+        a JSON string with ``[real, imag]`` lists is still accepted from
+        external (C++) controllers and converted once, in bulk.
+        The trace events of ``_run_controller`` move to ``profiler``.
+        """
+        if isinstance(output, (str, bytes)):
+            try:
+                output = json.loads(output)
+            except ValueError:
+                output = None
+        self._validate_controller_output(output)
+        profiler.extend(output.pop("profile", ()))
+        for key in _ARRAY_FIELDS:
+            if isinstance(output.get(key), _SpilledArray):
+                output[key] = output[key].load()
+        statevector = output.get("statevector")
+        if isinstance(statevector, list):
+            real, imag = statevector
+            statevector = np.asarray(real, dtype=float) + 1j * np.asarray(imag, dtype=float)
+            output["statevector"] = statevector
+        if isinstance(output.get("expectation_values"), list):
+            output["expectation_values"] = np.asarray(output["expectation_values"], dtype=float)
+        if "memory" in output and not isinstance(output["memory"], ndarray):
+            output["memory"] = np.asarray(output["memory"],
+                                          dtype=memory_dtype(circuit.num_clbits))
+        return output
+
     def _validate_controller_output(self, output):
         """Validate output from the controller wrapper."""
         if not isinstance(output, dict):
@@ -202,10 +843,47 @@ class BDDBackend(BaseBackend):
                 logger.error('Output: %s', output)
             raise ALComError("simulation terminated without returning valid output.")
 
-    def _validate(self, qobj, backend_options, noise_model):
-        """Validate the qobj, backend_options, noise_model for the backend"""
+    def _validate_job(self, qobj, circuits, validate, backend_options, noise_model):
+        """
+        Validate a job: the qobj schema (skipped when ``validate`` is
+        ``"fast"``), once per distinct qobj, and the packed circuits, once
+        per circuit structure (basis gates, width against ``n_qubits``,
+        operands, memory slots), see ``validation``; then ``_validate``.
+        """
+        if validate != "fast":
+            self._validator.validate_schema(qobj, circuits, validate_qobj_against_schema)
+        configuration = self.configuration()
+        scans = self._validator.validate(circuits, getattr(configuration, "basis_gates", None),
+                                         getattr(configuration, "n_qubits", None))
+        self._validate(qobj, circuits, scans, backend_options, noise_model)
+
+    @property
+    def validator(self):
+        """The ``CircuitValidator`` of this backend (hits, misses, stats())."""
+        return self._validator
+
+    def _validate(self, qobj, circuits, scans, backend_options, noise_model):
+        """
+        Validate the qobj, backend_options, noise_model for the backend,
+        ``scans`` are the ``validation.scan_circuit`` records of ``circuits``.
+        """
         pass
 
+    def __getstate__(self):
+        # pools cannot be pickled, a copy sent to a worker process gets its own;
+        # the provider holds the executor and its other backends, the copy has none
+        state = self.__dict__.copy()
+        state["_process_pool"] = None
+        state["_process_pool_workers"] = 0
+        state["_executor"] = None
+        state["_result_cache"] = None
+        state["_provider"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._executor = ALComJob._executor
+
     def __repr__(self):
         """Official string representation of an ALComBackend."""
         display = "{}('{}')".format(self.__class__.__name__, self.name())
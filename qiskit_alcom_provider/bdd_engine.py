@@ -0,0 +1,1351 @@
+"""
+Bit-sliced BDD simulation engine.
+Implementation of the representation described in
+`Bit-Slicing the Hilbert Space: Scaling Up Accurate Quantum Circuit Simulation
+to a New Level` (https://arxiv.org/abs/2007.09304).
+
+Every amplitude is kept exactly in the algebraic form
+
+    alpha(x) = scalar * (1/sqrt(2))^k * (a(x) + b(x) w + c(x) w^2 + d(x) w^3)
+
+with ``w = exp(i pi / 4)`` and integer coefficients ``a, b, c, d`` stored in
+two's complement. Each bit of each coefficient is a Boolean function of the
+qubit values and is kept as a BDD in a shared ``BDDManager``.
+Gates become Boolean operations on those slices, so Clifford+T circuits are
+simulated without any floating point error.
+"""
+
+import sys
+import math
+import cmath
+import logging
+from concurrent import futures
+
+from .alcom_error import ALComError, ALComResourceError
+from .branching import branch_read_out
+from .circuit_ir import CircuitIR
+from .profiling import NULL_PROFILER
+from .sampling import memory_dtype, read_out
+
+logger = logging.getLogger(__name__)
+
+# edges are ``node_id << 1 | complement``, node 0 is the constant-one terminal
+ONE = 0
+ZERO = 1
+_TERMINAL_VAR = 1 << 30
+
+_SQRT1_2 = 1 / math.sqrt(2)
+_ANGLE_TOL = 1e-9
+# rough CPython sizes of a node slot (three list cells and their ints)
+# and of a table entry (key tuple, value and hash slot)
+_SLOT_BYTES = 3 * (8 + 28)
+_ENTRY_BYTES = 64 + 28 + 3 * 8
+# distinct (node, history) pairs sampled by binomial draws before going per shot
+_MAX_SHOT_GROUPS = 1 << 10
+# default size target of the approximate mode
+_APPROXIMATION_NODES = 1 << 16
+
+
+class BDDManager():
+    """
+    Shared BDD store with complement edges.
+    All diagrams built by one manager share the unique table, so equal
+    sub-functions are stored exactly once, and every recursive operation is
+    memoized in a computed table.
+    Creating a node past ``max_nodes`` (live nodes and the garbage not yet
+    collected) or past what fits in ``max_memory_mb`` next to a full
+    computed table raises ``ALComResourceError``.
+    Variables are levels, ``order[level]`` is the qubit at a level and
+    ``levels[qubit]`` its level; ``sift`` changes them in place, every state
+    on the manager follows.
+    With ``approximation_fidelity`` set, the states prune their lightest
+    branches once the manager holds more than ``approximation_threshold``
+    nodes (see ``BDDSimulator.approximate``); ``fidelity`` is the lower
+    bound that holds for every state of the manager.
+    """
+
+    def __init__(self, cache_size=1 << 18, max_nodes=None, max_memory_mb=None, order=None,
+                 sift_threshold=None, approximation_fidelity=None, approximation_threshold=None):
+        self._var = [_TERMINAL_VAR]
+        self._lo = [ONE]
+        self._hi = [ONE]
+        self._unique = {}
+        self._free = []
+        self._computed = {}
+        self._cache_size = cache_size
+        # roots of states kept aside, e.g. a shared prefix, survive collections
+        self._pinned = []
+        self.max_nodes = max_nodes or sys.maxsize
+        if max_memory_mb is not None:
+            node_bytes = _SLOT_BYTES + _ENTRY_BYTES
+            self.max_nodes = min(self.max_nodes, max(
+                0, ((max_memory_mb << 20) - cache_size * _ENTRY_BYTES) // node_bytes))
+        self._hits = 0
+        self._misses = 0
+        self._peak_nodes = 0
+        self._peak_bytes = 0
+        self.order = None
+        self.levels = None
+        if order is not None:
+            self.set_order(order)
+        self.sift_threshold = sift_threshold
+        self._sift_runs = 0
+        self._sift_removed = 0
+        if approximation_fidelity is not None and not 0 < approximation_fidelity <= 1:
+            raise ALComError('approximation_fidelity must be in (0, 1]')
+        self.approximation_fidelity = approximation_fidelity
+        self.approximation_threshold = approximation_threshold or _APPROXIMATION_NODES
+        # Bures angle spent by the pruning rounds so far
+        self._angle = 0.0
+        self._prunings = 0
+
+    @property
+    def num_nodes(self):
+        """Number of live internal nodes."""
+        return len(self._unique)
+
+    @property
+    def nbytes(self):
+        """Estimate of the bytes held by the node arrays and the tables."""
+        return (len(self._var) * _SLOT_BYTES
+                + (len(self._unique) + len(self._computed)) * _ENTRY_BYTES)
+
+    def set_order(self, order):
+        """Put qubit ``order[level]`` at every level, before any diagram is built."""
+        self.order = list(order)
+        self.levels = [0] * len(self.order)
+        for level, qubit in enumerate(self.order):
+            self.levels[qubit] = level
+
+    @property
+    def fidelity(self):
+        """Lower bound of the fidelity of the states to their exact counterparts."""
+        # the Bures angles of the rounds add up at most (triangle inequality)
+        return math.cos(min(self._angle, math.pi / 2)) ** 2
+
+    def record_peak(self):
+        """Fold the current size into the peak counters."""
+        self._peak_nodes = max(self._peak_nodes, len(self._unique))
+        self._peak_bytes = max(self._peak_bytes, self.nbytes)
+
+    def stats(self):
+        """
+        Live counters of the manager.
+        Returns:
+            dict: ``nodes``, ``peak_nodes``, ``unique_load`` (nodes over the
+            allocated node slots, the rest wait on the free list),
+            ``computed_entries``, ``computed_hit_rate``, ``bytes`` and
+            ``peak_bytes`` (the peaks are sampled after every gate),
+            ``sift_runs`` and ``sift_removed`` (nodes saved by sifting),
+            ``prunings`` (approximation rounds).
+        """
+        self.record_peak()
+        lookups = self._hits + self._misses
+        return {'nodes': len(self._unique), 'peak_nodes': self._peak_nodes,
+                'unique_load': len(self._unique) / max(len(self._var) - 1, 1),
+                'computed_entries': len(self._computed),
+                'computed_hit_rate': self._hits / lookups if lookups else 0.0,
+                'bytes': self.nbytes, 'peak_bytes': self._peak_bytes,
+                'sift_runs': self._sift_runs, 'sift_removed': self._sift_removed,
+                'prunings': self._prunings}
+
+    def top(self, f):
+        """Variable index at the root of ``f`` (terminal sorts last)."""
+        return self._var[f >> 1]
+
+    def var(self, v):
+        """Edge of the projection function ``x_v``."""
+        return self.make(v, ZERO, ONE)
+
+    def make(self, v, lo, hi):
+        """Find or create the node ``(v, lo, hi)`` keeping the then-edge regular."""
+        if lo == hi:
+            return lo
+        comp = hi & 1
+        if comp:
+            lo ^= 1
+            hi ^= 1
+        key = (v, lo, hi)
+        node = self._unique.get(key)
+        if node is None:
+            if len(self._unique) >= self.max_nodes:
+                raise ALComResourceError('the BDD outgrew its budget of {} nodes '
+                                         '(max_nodes, max_memory_mb)'.format(self.max_nodes))
+            if self._free:
+                node = self._free.pop()
+                self._var[node] = v
+                self._lo[node] = lo
+                self._hi[node] = hi
+            else:
+                node = len(self._var)
+                self._var.append(v)
+                self._lo.append(lo)
+                self._hi.append(hi)
+            self._unique[key] = node
+        return (node << 1) | comp
+
+    def cofactors(self, f, v):
+        """Return ``(f|x_v=0, f|x_v=1)`` for ``v`` not below the root of ``f``."""
+        node = f >> 1
+        if self._var[node] != v:
+            return f, f
+        comp = f & 1
+        return self._lo[node] ^ comp, self._hi[node] ^ comp
+
+    def ite(self, f, g, h):
+        """If-then-else, the universal BDD operation."""
+        if f == ONE:
+            return g
+        if f == ZERO:
+            return h
+        if g == h:
+            return g
+        if g == ONE and h == ZERO:
+            return f
+        if g == ZERO and h == ONE:
+            return f ^ 1
+        if f & 1:
+            f ^= 1
+            g, h = h, g
+        comp = g & 1
+        if comp:
+            g ^= 1
+            h ^= 1
+        key = (f, g, h)
+        res = self._computed.get(key)
+        if res is not None:
+            self._hits += 1
+            return res ^ comp
+        self._misses += 1
+        v = min(self._var[f >> 1], self._var[g >> 1], self._var[h >> 1])
+        f0, f1 = self.cofactors(f, v)
+        g0, g1 = self.cofactors(g, v)
+        h0, h1 = self.cofactors(h, v)
+        res = self.make(v, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        if len(self._computed) >= self._cache_size:
+            self._computed.clear()
+        self._computed[key] = res
+        return res ^ comp
+
+    def apply_and(self, f, g):
+        """Conjunction."""
+        return self.ite(f, g, ZERO)
+
+    def apply_or(self, f, g):
+        """Disjunction."""
+        return self.ite(f, ONE, g)
+
+    def apply_xor(self, f, g):
+        """Exclusive or."""
+        return self.ite(f, g ^ 1, g)
+
+    def restrict(self, f, v, value):
+        """Cofactor of ``f`` with respect to ``x_v = value``."""
+        if self._var[f >> 1] > v:
+            return f
+        comp = f & 1
+        f ^= comp
+        key = ('restrict', f, v, value)
+        res = self._computed.get(key)
+        if res is None:
+            self._misses += 1
+            node = f >> 1
+            if self._var[node] == v:
+                res = self._hi[node] if value else self._lo[node]
+            else:
+                res = self.make(self._var[node],
+                                self.restrict(self._lo[node], v, value),
+                                self.restrict(self._hi[node], v, value))
+            if len(self._computed) >= self._cache_size:
+                self._computed.clear()
+            self._computed[key] = res
+        else:
+            self._hits += 1
+        return res ^ comp
+
+    def pin(self, roots):
+        """Keep the nodes below ``roots`` alive through ``collect_garbage``."""
+        self._pinned.extend(roots)
+
+    def unpin(self, roots):
+        """Undo ``pin``."""
+        for root in roots:
+            self._pinned.remove(root)
+
+    def size(self, roots):
+        """Number of internal nodes reachable from ``roots``."""
+        marked = {0}
+        stack = [r >> 1 for r in roots]
+        while stack:
+            node = stack.pop()
+            if node in marked:
+                continue
+            marked.add(node)
+            stack.append(self._lo[node] >> 1)
+            stack.append(self._hi[node] >> 1)
+        return len(marked) - 1
+
+    def collect_garbage(self, roots):
+        """Free every node that is not reachable from ``roots`` or a pinned root."""
+        marked = {0}
+        stack = [r >> 1 for r in roots] + [r >> 1 for r in self._pinned]
+        while stack:
+            node = stack.pop()
+            if node in marked:
+                continue
+            marked.add(node)
+            stack.append(self._lo[node] >> 1)
+            stack.append(self._hi[node] >> 1)
+        for key, node in list(self._unique.items()):
+            if node not in marked:
+                del self._unique[key]
+                self._free.append(node)
+        self._computed.clear()
+
+    # --- variable reordering ----------------------------------------------
+
+    def sift(self, roots, max_growth=1.2):
+        """
+        Rudell's sifting: each qubit, the most populated level first, is
+        moved through every level by adjacent swaps and left where the
+        diagrams were smallest; a direction is abandoned once they grow past
+        ``max_growth`` times their size at the start of the move.
+        Node ids keep their functions, so the edges held by the states and the
+        pinned roots stay valid.
+        Returns:
+            int: number of live nodes after sifting.
+        """
+        self.collect_garbage(roots)
+        before = len(self._unique)
+        refs = {}
+        by_level = [set() for _ in self.order]
+        for node in self._unique.values():
+            by_level[self._var[node]].add(node)
+            for child in (self._lo[node] >> 1, self._hi[node] >> 1):
+                refs[child] = refs.get(child, 0) + 1
+        for root in list(roots) + self._pinned:
+            refs[root >> 1] = refs.get(root >> 1, 0) + 1
+        last = len(self.order) - 1
+        for qubit in sorted(self.order, key=lambda q: -len(by_level[self.levels[q]])):
+            start = len(self._unique)
+            level = self.levels[qubit]
+            best = (start, level)
+            # the nearer end first
+            ends = (last, 0) if level > last // 2 else (0, last)
+            for end in ends:
+                step = 1 if end > level else -1
+                while level != end and len(self._unique) <= max_growth * start:
+                    self._swap_levels(min(level, level + step), refs, by_level)
+                    level += step
+                    best = min(best, (len(self._unique), level))
+            while level != best[1]:
+                step = 1 if best[1] > level else -1
+                self._swap_levels(min(level, level + step), refs, by_level)
+                level += step
+        self._computed.clear()
+        self._sift_runs += 1
+        self._sift_removed += before - len(self._unique)
+        return len(self._unique)
+
+    def _swap_levels(self, i, refs, by_level):
+        """Exchange the qubits at levels ``i`` and ``i + 1``, see ``sift``."""
+        var, lo, hi, unique = self._var, self._lo, self._hi, self._unique
+        upper, lower = by_level[i], by_level[i + 1]
+        kept = []
+        moved = []
+        for node in upper:
+            f0, f1 = lo[node], hi[node]
+            if var[f0 >> 1] != i + 1 and var[f1 >> 1] != i + 1:
+                kept.append(node)
+            else:
+                moved.append((node, f0, f1) + self.cofactors(f0, i + 1)
+                             + self.cofactors(f1, i + 1))
+            del unique[i, f0, f1]
+        for node in lower:
+            del unique[i + 1, lo[node], hi[node]]
+            var[node] = i
+            unique[i, lo[node], hi[node]] = node
+        for node in kept:
+            var[node] = i + 1
+            unique[i + 1, lo[node], hi[node]] = node
+        by_level[i], by_level[i + 1] = lower, set(kept)
+        for node, f0, f1, f00, f01, f10, f11 in moved:
+            g0 = self._swap_make(i + 1, f00, f10, refs, by_level)
+            g1 = self._swap_make(i + 1, f01, f11, refs, by_level)
+            var[node], lo[node], hi[node] = i, g0, g1
+            unique[i, g0, g1] = node
+            lower.add(node)
+            self._release(f0, refs, by_level)
+            self._release(f1, refs, by_level)
+        order = self.order
+        order[i], order[i + 1] = order[i + 1], order[i]
+        self.levels[order[i]] = i
+        self.levels[order[i + 1]] = i + 1
+
+    def _swap_make(self, v, lo, hi, refs, by_level):
+        """``make`` that keeps the reference counts of ``sift``, one more on the result."""
+        if lo == hi:
+            refs[lo >> 1] = refs.get(lo >> 1, 0) + 1
+            return lo
+        comp = hi & 1
+        if comp:
+            lo ^= 1
+            hi ^= 1
+        node = self._unique.get((v, lo, hi))
+        if node is None:
+            if self._free:
+                node = self._free.pop()
+                self._var[node], self._lo[node], self._hi[node] = v, lo, hi
+            else:
+                node = len(self._var)
+                self._var.append(v)
+                self._lo.append(lo)
+                self._hi.append(hi)
+            self._unique[v, lo, hi] = node
+            by_level[v].add(node)
+            refs[node] = 0
+            refs[lo >> 1] = refs.get(lo >> 1, 0) + 1
+            refs[hi >> 1] = refs.get(hi >> 1, 0) + 1
+        refs[node] += 1
+        return (node << 1) | comp
+
+    def _release(self, edge, refs, by_level):
+        """Drop one reference, freeing the nodes no longer used."""
+        stack = [edge >> 1]
+        while stack:
+            node = stack.pop()
+            if not node:
+                continue
+            refs[node] -= 1
+            if refs[node]:
+                continue
+            del refs[node]
+            del self._unique[self._var[node], self._lo[node], self._hi[node]]
+            by_level[self._var[node]].discard(node)
+            self._free.append(node)
+            stack.append(self._lo[node] >> 1)
+            stack.append(self._hi[node] >> 1)
+
+
+class BDDSimulator():
+    """
+    Bit-sliced state of ``n`` qubits, see the module docstring.
+    Qubit ``q`` is the BDD variable ``mgr.levels[q]``, the methods take
+    qubits and the primitive gates below ``apply`` work on levels.
+    With a ``profiler`` (see ``profiling``) every gate is traced with the
+    node count after it. Once its ``cancel_event`` is set the next gate
+    raises ``CancelledError``.
+    """
+
+    profiler = None
+    cancel_event = None
+
+    def __init__(self, num_qubits, manager=None):
+        self.num_qubits = num_qubits
+        self.mgr = manager if manager is not None else BDDManager()
+        if self.mgr.order is None:
+            self.mgr.set_order(range(num_qubits))
+        self.k = 0
+        self.scalar = 1 + 0j
+        mgr = self.mgr
+        basis = ONE
+        for q in reversed(range(num_qubits)):
+            basis = mgr.make(q, basis, ZERO)
+        # coefficient slices, least significant bit first, two bits wide
+        self.slices = [[basis, ZERO], [ZERO, ZERO], [ZERO, ZERO], [ZERO, ZERO]]
+        self._gc_threshold = 1 << 16
+        self._mass_memo = {}
+
+    @property
+    def nbytes(self):
+        """Estimate of the bytes held by the diagrams and the sampling memo."""
+        return self.mgr.nbytes + len(self._mass_memo) * _ENTRY_BYTES
+
+    def __getstate__(self):
+        # the profiler and the cancel event belong to the job that ran the state
+        state = dict(self.__dict__)
+        state.pop('profiler', None)
+        state.pop('cancel_event', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def copy(self):
+        """Copy of the state on the same manager, both share every node."""
+        other = BDDSimulator.__new__(BDDSimulator)
+        other.num_qubits = self.num_qubits
+        other.mgr = self.mgr
+        other.k = self.k
+        other.scalar = self.scalar
+        other.slices = [list(vec) for vec in self.slices]
+        other._gc_threshold = self._gc_threshold
+        other._mass_memo = {}
+        other.profiler = self.profiler
+        other.cancel_event = self.cancel_event
+        return other
+
+    # --- integer vector helpers -------------------------------------------
+
+    @property
+    def width(self):
+        """Bit width ``r`` of each coefficient."""
+        return len(self.slices[0])
+
+    def _extend(self):
+        for vec in self.slices:
+            vec.append(vec[-1])
+
+    def _add(self, xs, ys, carry=ZERO):
+        mgr = self.mgr
+        out = []
+        for x, y in zip(xs, ys):
+            out.append(mgr.apply_xor(mgr.apply_xor(x, y), carry))
+            carry = mgr.ite(x, mgr.apply_or(y, carry), mgr.apply_and(y, carry))
+        return out
+
+    def _sub(self, xs, ys):
+        return self._add(xs, [y ^ 1 for y in ys], ONE)
+
+    def _neg(self, xs):
+        return self._add([x ^ 1 for x in xs], [ZERO] * len(xs), ONE)
+
+    def _select(self, cond, then_vec, else_vec):
+        ite = self.mgr.ite
+        return [ite(cond, t, e) for t, e in zip(then_vec, else_vec)]
+
+    def _normalize(self):
+        """Drop redundant sign bits and common factors of two."""
+        slices = self.slices
+        while len(slices[0]) > 2 and all(vec[-1] == vec[-2] for vec in slices):
+            for vec in slices:
+                vec.pop()
+        while self.k >= 2 and all(vec[0] == ZERO for vec in slices):
+            for vec in slices:
+                del vec[0]
+                vec.append(vec[-1])
+            self.k -= 2
+        self._mass_memo = {}
+
+    def roots(self):
+        """All slice edges, i.e. the roots to keep alive."""
+        return [f for vec in self.slices for f in vec]
+
+    def _cube(self, qubits):
+        mgr = self.mgr
+        cube = ONE
+        for q in sorted(qubits, reverse=True):
+            cube = mgr.make(q, ZERO, cube)
+        return cube
+
+    # --- primitive gates --------------------------------------------------
+
+    def phase(self, cube, m):
+        """Multiply every amplitude inside ``cube`` by ``w^m``."""
+        m %= 8
+        if m == 0 or cube == ZERO:
+            return
+        self._extend()
+        a, b, c, d = self.slices
+        rotated = [a, b, c, d]
+        for _ in range(m):
+            # (a + b w + c w^2 + d w^3) * w = -d + a w + b w^2 + c w^3
+            rotated = [self._neg(rotated[3]), rotated[0], rotated[1], rotated[2]]
+        self.slices = [self._select(cube, new, old)
+                       for new, old in zip(rotated, self.slices)]
+        self._normalize()
+
+    def flip(self, target, cube=ONE):
+        """Pauli-X on ``target`` inside ``cube``."""
+        mgr = self.mgr
+        xt = mgr.var(target)
+        new_slices = []
+        for vec in self.slices:
+            new = []
+            for f in vec:
+                f0 = mgr.restrict(f, target, 0)
+                f1 = mgr.restrict(f, target, 1)
+                new.append(mgr.ite(cube, mgr.ite(xt, f0, f1), f))
+            new_slices.append(new)
+        self.slices = new_slices
+        self._normalize()
+
+    def swap(self, q0, q1, cube=ONE):
+        """Exchange ``q0`` and ``q1`` inside ``cube``."""
+        mgr = self.mgr
+        x0 = mgr.var(q0)
+        x1 = mgr.var(q1)
+        restrict = mgr.restrict
+        new_slices = []
+        for vec in self.slices:
+            new = []
+            for f in vec:
+                f_0, f_1 = restrict(f, q0, 0), restrict(f, q0, 1)
+                f00, f01 = restrict(f_0, q1, 0), restrict(f_0, q1, 1)
+                f10, f11 = restrict(f_1, q1, 0), restrict(f_1, q1, 1)
+                swapped = mgr.ite(x0, mgr.ite(x1, f11, f01), mgr.ite(x1, f10, f00))
+                new.append(mgr.ite(cube, swapped, f))
+            new_slices.append(new)
+        self.slices = new_slices
+        self._normalize()
+
+    def hadamard(self, target):
+        """Hadamard on ``target``: ``k`` grows by one, slices get added."""
+        mgr = self.mgr
+        self._extend()
+        xt = mgr.var(target)
+        new_slices = []
+        for vec in self.slices:
+            v0 = [mgr.restrict(f, target, 0) for f in vec]
+            v1 = [mgr.restrict(f, target, 1) for f in vec]
+            new_slices.append(self._select(xt, self._sub(v0, v1), self._add(v0, v1)))
+        self.slices = new_slices
+        self.k += 1
+        self._normalize()
+
+    # --- gate set ---------------------------------------------------------
+
+    def apply(self, name, qubits, params=(), rng=None):
+        """Apply the named gate of the backend basis, every gate is deterministic."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise futures.CancelledError()
+        if self.profiler is None:
+            self._apply(name, qubits, params)
+            return
+        with self.profiler.span(name, 'gate', qubits=list(qubits)):
+            self._apply(name, qubits, params)
+        self.profiler.counter('bdd', nodes=self.mgr.num_nodes, bytes=self.mgr.nbytes)
+
+    def _apply(self, name, qubits, params):
+        method = getattr(self, '_gate_' + name, None)
+        if method is None:
+            raise ALComError('gate "{}" is not supported by the BDD engine'.format(name))
+        mgr = self.mgr
+        levels = mgr.levels
+        method([levels[q] for q in qubits], params)
+        mgr.record_peak()
+        if logger.isEnabledFor(logging.DEBUG):
+            stats = mgr.stats()
+            logger.debug('%s %s: %d nodes (load %.2f), computed hit rate %.2f, %d bytes',
+                         name, list(qubits), stats['nodes'], stats['unique_load'],
+                         stats['computed_hit_rate'], stats['bytes'])
+        # garbage counts against the node budget, so it goes early near the limit
+        if mgr.num_nodes > min(self._gc_threshold, mgr.max_nodes // 2):
+            mgr.collect_garbage(self.roots())
+            self._gc_threshold = max(self._gc_threshold, 2 * mgr.num_nodes)
+        if mgr.sift_threshold is not None and mgr.num_nodes > mgr.sift_threshold:
+            size = mgr.sift(self.roots())
+            logger.debug('sifting after %s %s: %d nodes, order %s', name, list(qubits), size,
+                         mgr.order)
+            # sift again once the diagrams doubled
+            mgr.sift_threshold = max(mgr.sift_threshold, 2 * size)
+            self._mass_memo = {}
+        if mgr.approximation_fidelity is not None and mgr.num_nodes > mgr.approximation_threshold:
+            self.approximate()
+
+    @staticmethod
+    def _eighths(angle):
+        """Return ``m`` with ``angle = m * pi / 4`` or raise."""
+        m = angle / (math.pi / 4)
+        rounded = round(m)
+        if abs(m - rounded) > _ANGLE_TOL:
+            raise ALComError('angle {} is not a multiple of pi/4 and cannot be '
+                             'represented exactly by the BDD engine'.format(angle))
+        return int(rounded)
+
+    def _gate_id(self, qubits, params):
+        pass
+
+    def _gate_x(self, qubits, params):
+        self.flip(qubits[0])
+
+    def _gate_y(self, qubits, params):
+        # Y = i X Z
+        self._gate_z(qubits, params)
+        self.flip(qubits[0])
+        self.scalar *= 1j
+
+    def _gate_z(self, qubits, params):
+        self.phase(self._cube(qubits), 4)
+
+    def _gate_h(self, qubits, params):
+        self.hadamard(qubits[0])
+
+    def _gate_s(self, qubits, params):
+        self.phase(self._cube(qubits), 2)
+
+    def _gate_sdg(self, qubits, params):
+        self.phase(self._cube(qubits), 6)
+
+    def _gate_t(self, qubits, params):
+        self.phase(self._cube(qubits), 1)
+
+    def _gate_tdg(self, qubits, params):
+        self.phase(self._cube(qubits), 7)
+
+    def _gate_u1(self, qubits, params):
+        self.phase(self._cube(qubits), self._eighths(params[0]))
+
+    def _gate_u2(self, qubits, params):
+        self._gate_u3(qubits, [math.pi / 2, params[0], params[1]])
+
+    def _gate_u3(self, qubits, params):
+        # u3(theta, phi, lam) = u1(phi) S H u1(theta) H Sdg u1(lam) * exp(-i theta / 2)
+        theta, phi, lam = params
+        m_theta = self._eighths(theta)
+        m_phi = self._eighths(phi)
+        m_lam = self._eighths(lam)
+        cube = self._cube(qubits)
+        self.phase(cube, m_lam - 2)
+        self.hadamard(qubits[0])
+        self.phase(cube, m_theta)
+        self.hadamard(qubits[0])
+        self.phase(cube, m_phi + 2)
+        self.scalar *= cmath.exp(-0.5j * theta)
+
+    def _gate_cx(self, qubits, params):
+        self.flip(qubits[-1], self._cube(qubits[:-1]))
+
+    _gate_ccx = _gate_cx
+    _gate_mcx = _gate_cx
+
+    def _gate_cz(self, qubits, params):
+        self.phase(self._cube(qubits), 4)
+
+    _gate_mcz = _gate_cz
+
+    def _gate_mcy(self, qubits, params):
+        controls = self._cube(qubits[:-1])
+        self.phase(self._cube(qubits), 4)
+        self.flip(qubits[-1], controls)
+        self.phase(controls, 2)
+
+    def _gate_cu1(self, qubits, params):
+        self.phase(self._cube(qubits), self._eighths(params[0]))
+
+    _gate_mcu1 = _gate_cu1
+
+    def _gate_swap(self, qubits, params):
+        self.swap(qubits[-2], qubits[-1])
+
+    def _gate_cswap(self, qubits, params):
+        self.swap(qubits[-2], qubits[-1], self._cube(qubits[:-2]))
+
+    _gate_mcswap = _gate_cswap
+
+    # --- approximation ----------------------------------------------------
+
+    def approximate(self):
+        """
+        One round of the approximate mode. Unitary gates keep the Bures angle
+        ``arccos(sqrt(F))`` to the exact state, so the angles of the rounds
+        add up at most: each round prunes with half of the angle left below
+        ``approximation_fidelity``, which keeps the bound above it. Zeroing a
+        branch can split nodes the slices share with the branches kept, a
+        round that does not shrink the diagrams is undone and costs nothing.
+        The next round waits until the diagrams are twice their size.
+        """
+        mgr = self.mgr
+        # the size target is about live nodes, not the garbage of the last gates
+        mgr.collect_garbage(self.roots())
+        if mgr.num_nodes <= mgr.approximation_threshold:
+            return
+        budget = math.acos(math.sqrt(mgr.approximation_fidelity)) - mgr._angle
+        if budget > 0:
+            before = mgr.size(self.roots())
+            saved = ([list(vec) for vec in self.slices], self.k, self.scalar)
+            fidelity = self.prune(math.cos(budget / 2) ** 2)
+            after = mgr.size(self.roots())
+            if after < before:
+                mgr._angle += math.acos(min(math.sqrt(fidelity), 1.0))
+                mgr._prunings += 1
+                logger.debug('pruned %d nodes to %d, fidelity %.6f (bound %.6f)', before,
+                             after, fidelity, mgr.fidelity)
+            else:
+                self.slices, self.k, self.scalar = saved
+                self._mass_memo = {}
+            mgr.collect_garbage(self.roots())
+        mgr.approximation_threshold = max(mgr.approximation_threshold, 2 * mgr.num_nodes)
+
+    def prune(self, min_fidelity):
+        """
+        Zero the lightest sub-states and renormalize.
+        The sub-states are the tuples of slice edges met by the amplitude
+        traversal; the weight of one is its squared norm times the number of
+        paths reaching it. They go lightest for the nodes they may hold
+        first (weight over ``2^(levels below)``), as long as the weights add
+        up to at most ``1 - min_fidelity``; the fidelity of the result to
+        the state before is exactly the weight kept.
+        Returns:
+            float: the fidelity of the pruned state to the state before.
+        """
+        mgr = self.mgr
+        n = self.num_qubits
+        top = mgr.top
+
+        def level(edges):
+            return min(min(top(f) for f in edges), n)
+
+        root = self.probability_tree_root()
+        # paths from the root to every sub-state, parents before children
+        reach = {root: 1 << level(root)}
+        stack = [root]
+        found = []
+        while stack:
+            edges = stack.pop()
+            found.append(edges)
+            if level(edges) < n:
+                _, lo, hi = self._split(edges)
+                for child in (lo, hi):
+                    if child not in reach:
+                        reach[child] = 0
+                        stack.append(child)
+        found.sort(key=level)
+        for edges in found:
+            depth = level(edges)
+            if depth < n:
+                _, lo, hi = self._split(edges)
+                for child in (lo, hi):
+                    reach[child] += reach[edges] << (level(child) - depth - 1)
+        total = self._level_mass(0, root)
+        budget = (1 - min_fidelity) * total
+        pruned = set()
+        removed = 0.0
+        candidates = sorted((reach[edges] * self._mass(edges) / 2.0 ** (n - level(edges)),
+                             reach[edges] * self._mass(edges), edges)
+                            for edges in found if edges != root)
+        for _, weight, edges in candidates:
+            if removed + weight > budget:
+                continue
+            if weight > 0:
+                pruned.add(edges)
+                removed += weight
+        if not pruned:
+            return 1.0
+        zero = (ZERO,) * len(root)
+        memo = {}
+
+        def rebuild(edges):
+            if edges in pruned:
+                return zero
+            if level(edges) == n:
+                return edges
+            res = memo.get(edges)
+            if res is None:
+                var, lo, hi = self._split(edges)
+                res = memo[edges] = tuple(mgr.make(var, f0, f1)
+                                          for f0, f1 in zip(rebuild(lo), rebuild(hi)))
+            return res
+
+        new_root = rebuild(root)
+        width = self.width
+        self.slices = [list(new_root[i * width:(i + 1) * width]) for i in range(4)]
+        self._mass_memo = {}
+        kept = self._level_mass(0, new_root)
+        # pruning is a projection, the overlap with the old state is the kept weight
+        fidelity = kept / total
+        self.scalar /= math.sqrt(fidelity)
+        self._normalize()
+        return fidelity
+
+    # --- read out ---------------------------------------------------------
+
+    def _leaf_amplitude(self, edges):
+        """Amplitude of a tuple of terminal edges (one per slice)."""
+        width = self.width
+        coeffs = []
+        for i in range(4):
+            value = 0
+            for j, f in enumerate(edges[i * width:(i + 1) * width]):
+                if f == ONE:
+                    value |= 1 << j
+            if value >> (width - 1):
+                value -= 1 << width
+            coeffs.append(value)
+        a, b, c, d = coeffs
+        real = a + (b - d) * _SQRT1_2
+        imag = c + (b + d) * _SQRT1_2
+        return self.scalar * complex(real, imag) * _SQRT1_2 ** self.k
+
+    def _split(self, edges):
+        """Return ``(top_var, lo_edges, hi_edges)`` of a tuple of slices."""
+        mgr = self.mgr
+        top = min(mgr.top(f) for f in edges)
+        lo = []
+        hi = []
+        for f in edges:
+            f0, f1 = mgr.cofactors(f, top)
+            lo.append(f0)
+            hi.append(f1)
+        return top, tuple(lo), tuple(hi)
+
+    def _mass(self, edges):
+        """Squared norm of the sub-state below ``edges`` from its top variable on."""
+        memo = self._mass_memo
+        res = memo.get(edges)
+        if res is not None:
+            return res
+        if min(self.mgr.top(f) for f in edges) == _TERMINAL_VAR:
+            res = abs(self._leaf_amplitude(edges)) ** 2
+        else:
+            top, lo, hi = self._split(edges)
+            res = self._level_mass(top + 1, lo) + self._level_mass(top + 1, hi)
+        memo[edges] = res
+        return res
+
+    def _level_mass(self, level, edges):
+        top = min(self.mgr.top(f) for f in edges)
+        top = min(top, self.num_qubits)
+        return self._mass(edges) * (1 << (top - level))
+
+    def probability_tree_root(self):
+        """Tuple of all slice edges, the root of the amplitude traversal."""
+        return tuple(self.roots())
+
+    def _branch(self, edges, level, measured):
+        """
+        Return ``(lo, hi, p_one)`` for the shots sitting on ``edges`` at ``level``,
+        or None if the qubit is neither measured nor read by the state.
+        """
+        if min(self.mgr.top(f) for f in edges) == level:
+            _, lo, hi = self._split(edges)
+            m0 = self._level_mass(level + 1, lo)
+            m1 = self._level_mass(level + 1, hi)
+            return lo, hi, m1 / (m0 + m1)
+        if measured:
+            return edges, edges, 0.5
+        return None
+
+    def sample_memory(self, shots, rng, qubit_clbits, num_clbits):
+        """
+        Draw all shots in one batch by walking the diagram once per level,
+        each bit drawn from the branch weights of the node the shot sits on.
+        Shots with the same node and history are moved as one binomial draw;
+        once histories diverge too much they are carried as arrays.
+        Args:
+            shots (int): number of shots.
+            rng (numpy.random.Generator): random source.
+            qubit_clbits (dict): qubit -> memory slots it is measured into.
+            num_clbits (int): number of memory slots.
+        Returns:
+            ndarray: one memory value per shot in random order, see ``sampling``.
+        """
+        import numpy as np
+        dtype = memory_dtype(num_clbits)
+        if shots == 0:
+            return np.zeros(0, dtype=dtype)
+        masks = [sum(1 << c for c in qubit_clbits.get(q, ())) for q in self.mgr.order]
+        # (node, memory value so far) -> number of shots
+        counted = {(self.probability_tree_root(), 0): shots}
+        level = 0
+        while level < self.num_qubits and len(counted) <= _MAX_SHOT_GROUPS:
+            mask = masks[level]
+            next_counted = {}
+            for (edges, value), count in counted.items():
+                branch = self._branch(edges, level, mask)
+                if branch is None:
+                    next_counted[edges, value] = next_counted.get((edges, value), 0) + count
+                    continue
+                lo, hi, p_one = branch
+                ones = int(rng.binomial(count, p_one))
+                if ones:
+                    key = (hi, value | mask)
+                    next_counted[key] = next_counted.get(key, 0) + ones
+                if count - ones:
+                    key = (lo, value)
+                    next_counted[key] = next_counted.get(key, 0) + count - ones
+            counted = next_counted
+            level += 1
+        # node -> memory values of the shots sitting on it
+        groups = {}
+        for (edges, value), count in counted.items():
+            groups.setdefault(edges, []).append(np.full(count, value, dtype=dtype))
+        groups = {edges: np.concatenate(parts) for edges, parts in groups.items()}
+        for level in range(level, self.num_qubits):
+            mask = masks[level]
+            bit = np.array(mask, dtype=dtype)
+            next_groups = {}
+            for edges, values in groups.items():
+                branch = self._branch(edges, level, mask)
+                if branch is None:
+                    next_groups.setdefault(edges, []).append(values)
+                    continue
+                lo, hi, p_one = branch
+                ones = rng.random(len(values)) < p_one
+                next_groups.setdefault(hi, []).append(values[ones] | bit)
+                next_groups.setdefault(lo, []).append(values[~ones])
+            groups = {edges: parts[0] if len(parts) == 1 else np.concatenate(parts)
+                      for edges, parts in next_groups.items()}
+        memory = np.concatenate(list(groups.values()))
+        rng.shuffle(memory)
+        return memory
+
+    def probability(self, qubit):
+        """Probability of reading one on ``qubit``."""
+        restrict = self.mgr.restrict
+        qubit = self.mgr.levels[qubit]
+        root = self.probability_tree_root()
+        zeros = self._level_mass(0, tuple(restrict(f, qubit, 0) for f in root))
+        ones = self._level_mass(0, tuple(restrict(f, qubit, 1) for f in root))
+        return ones / (zeros + ones)
+
+    def collapse(self, qubit, outcome, p_one=None):
+        """
+        Project ``qubit`` on ``outcome``: the slices are cut by the literal,
+        the renormalization goes into the float ``scalar``.
+        """
+        mgr = self.mgr
+        prob = self.probability(qubit) if p_one is None else p_one
+        prob = prob if outcome else 1 - prob
+        literal = mgr.var(mgr.levels[qubit]) ^ (0 if outcome else 1)
+        self.slices = [[mgr.apply_and(f, literal) for f in vec] for vec in self.slices]
+        self.scalar /= math.sqrt(prob)
+        self._normalize()
+
+    def kraus_probabilities(self, mats, qubits):
+        raise ALComError('Kraus channels (e.g. amplitude damping) need the dense engine, '
+                         'the BDD engine runs Pauli and readout errors')
+
+    def pin(self):
+        """Keep the diagrams of this state alive while other states run on the manager."""
+        self.mgr.pin(self.roots())
+
+    def unpin(self):
+        self.mgr.unpin(self.roots())
+
+    def _cofactors_at(self, edges, level):
+        cofactors = self.mgr.cofactors
+        lo = []
+        hi = []
+        for f in edges:
+            f0, f1 = cofactors(f, level)
+            lo.append(f0)
+            hi.append(f1)
+        return tuple(lo), tuple(hi)
+
+    def pauli_expectation(self, x_mask, z_mask):
+        """
+        ``<psi| X^x Z^z |psi>`` as an inner product of the diagram with its
+        X-flipped copy, traversed jointly level by level and memoized on
+        ``(level, bra, ket)``, the state is never expanded.
+        """
+        n = self.num_qubits
+        top = self.mgr.top
+        memo = {}
+        x_mask = self._level_mask(x_mask)
+        z_mask = self._level_mask(z_mask)
+
+        def inner(level, bra, ket):
+            if level == n:
+                return self._leaf_amplitude(bra).conjugate() * self._leaf_amplitude(ket)
+            key = (level, bra, ket)
+            res = memo.get(key)
+            if res is not None:
+                return res
+            z_bit = (z_mask >> level) & 1
+            if min(top(f) for f in bra + ket) > level:
+                # both halves are equal, Z makes them cancel
+                res = 0j if z_bit else 2 * inner(level + 1, bra, ket)
+            else:
+                bra_lo, bra_hi = self._cofactors_at(bra, level)
+                ket_lo, ket_hi = self._cofactors_at(ket, level)
+                if (x_mask >> level) & 1:
+                    bra_lo, bra_hi = bra_hi, bra_lo
+                res = inner(level + 1, bra_lo, ket_lo)
+                if z_bit:
+                    res -= inner(level + 1, bra_hi, ket_hi)
+                else:
+                    res += inner(level + 1, bra_hi, ket_hi)
+            memo[key] = res
+            return res
+
+        root = self.probability_tree_root()
+        return inner(0, root, root)
+
+    def _level_mask(self, mask):
+        """Qubit bit mask -> level bit mask."""
+        out = 0
+        for level, qubit in enumerate(self.mgr.order):
+            out |= ((mask >> qubit) & 1) << level
+        return out
+
+    def pauli_expectations(self, masks):
+        """``pauli_expectation`` of every ``(x, z)`` bit-mask pair."""
+        return [self.pauli_expectation(x_mask, z_mask) for x_mask, z_mask in masks]
+
+    def sparse_statevector(self, threshold=0.0):
+        """
+        Amplitudes larger than ``threshold`` in magnitude, without expanding
+        the state: branches whose squared norm is at most ``threshold^2``
+        cannot hold such an amplitude and are not visited.
+        Returns:
+            tuple: basis indices (ascending) and their complex amplitudes.
+        """
+        import numpy as np
+        n = self.num_qubits
+        order = self.mgr.order
+        cutoff = threshold * threshold
+        indices = []
+        amplitudes = []
+        stack = [(0, 0, self.probability_tree_root())]
+        while stack:
+            level, index, edges = stack.pop()
+            if level == n:
+                amplitude = self._leaf_amplitude(edges)
+                if abs(amplitude) > threshold:
+                    indices.append(index)
+                    amplitudes.append(amplitude)
+                continue
+            if min(self.mgr.top(f) for f in edges) == level:
+                _, lo, hi = self._split(edges)
+            else:
+                lo = hi = edges
+            for bit, child in ((0, lo), (1, hi)):
+                if self._level_mass(level + 1, child) > cutoff:
+                    stack.append((level + 1, index | (bit << order[level]), child))
+        order = sorted(range(len(indices)), key=indices.__getitem__)
+        return (np.array([indices[i] for i in order], dtype=memory_dtype(n)),
+                np.array([amplitudes[i] for i in order], dtype=complex))
+
+    def statevector(self):
+        """Dense amplitudes, qubit 0 is the least significant index bit."""
+        import numpy as np
+        n = self.num_qubits
+        memo = {}
+
+        def expand(level, edges):
+            key = (level, edges)
+            if key in memo:
+                return memo[key]
+            if level == n:
+                vec = np.array([self._leaf_amplitude(edges)], dtype=complex)
+            else:
+                top = min(self.mgr.top(f) for f in edges)
+                if top == level:
+                    _, lo, hi = self._split(edges)
+                else:
+                    lo = hi = edges
+                sub0 = expand(level + 1, lo)
+                sub1 = sub0 if hi == lo else expand(level + 1, hi)
+                vec = np.empty(2 * len(sub0), dtype=complex)
+                vec[0::2] = sub0
+                vec[1::2] = sub1
+            memo[key] = vec
+            return vec
+
+        vec = expand(0, self.probability_tree_root())
+        order = self.mgr.order
+        if order != sorted(order):
+            # index bit ``level`` holds qubit ``order[level]``, axis 0 is the top bit
+            levels = self.mgr.levels
+            vec = vec.reshape([2] * n).transpose(
+                [n - 1 - levels[n - 1 - axis] for axis in range(n)]).reshape(-1)
+        return vec
+
+
+def bdd_controller(circuit, use_statevector, shots, seed=None, memory=False,
+                   sparse_threshold=None, state=None, keep_state=False, observables=None,
+                   max_nodes=None, max_memory_mb=None, qubit_order='interaction',
+                   sift_threshold=None, approximation_fidelity=None,
+                   approximation_threshold=None, profiler=None, cancel_event=None):
+    """
+    Simulate a circuit with the bit-sliced BDD engine.
+    Args:
+        circuit (CircuitIR or str): circuit IR, OpenQASM 2.0 text for debugging.
+        use_statevector (bool): also return the final statevector.
+        shots (int): number of shots to sample.
+        seed (int): seed of the shot sampling.
+        memory (bool): also return the per-shot memory values.
+        sparse_threshold (float): return the statevector as ``sparse_indices``
+                                  and ``sparse_amplitudes`` of the amplitudes
+                                  above this magnitude instead of a dense vector.
+                                  Circuits with mid-circuit measurements, resets
+                                  or conditions run branch by branch, see ``branching``.
+        state (BDDSimulator): final state of an earlier run of the same circuit,
+                              only the read out is done.
+        keep_state (bool): return the final state as ``state`` for later read outs.
+        observables (list): Pauli labels (qubit 0 rightmost); their exact
+                            expectation values are returned as
+                            ``expectation_values`` instead of shots.
+        max_nodes (int): node budget of the manager, see ``BDDManager``.
+        max_memory_mb (int): memory budget of the manager.
+        qubit_order (str or list): BDD level of every qubit, ``'interaction'``
+                                   (see ``interaction_order``), ``'index'``
+                                   or the qubits top level first.
+        sift_threshold (int): sift the order (``BDDManager.sift``) once the
+                              diagrams pass this many nodes, again at twice
+                              the size after each sifting; None never sifts.
+        approximation_fidelity (float): approximate mode, the lowest fidelity
+                                        to the exact final state allowed;
+                                        None simulates exactly.
+        approximation_threshold (int): node count that triggers a pruning
+                                       round, see ``BDDSimulator.approximate``.
+        profiler (Profiler): traces every gate and the read out.
+        cancel_event (threading.Event): checked before every gate.
+    Returns:
+        dict: ``counts``, ``bdd_stats`` (``BDDManager.stats``) and, when asked
+        for, ``statevector`` (complex ndarray) and ``memory`` (ndarray, one
+        value per shot), see ``bdd_backend``. The approximate mode adds
+        ``fidelity``, the lower bound reached.
+    Raises:
+        ALComError: if the circuit uses an unsupported gate or angle.
+        ALComResourceError: if the diagrams outgrow the budget.
+        concurrent.futures.CancelledError: if ``cancel_event`` got set.
+    """
+    import numpy as np
+    if isinstance(circuit, str):
+        circuit = CircuitIR.from_qasm(circuit)
+    if state is None:
+        manager = _manager(circuit, max_nodes, max_memory_mb, qubit_order, sift_threshold,
+                           approximation_fidelity, approximation_threshold)
+    if state is None and circuit.is_dynamic:
+        # shots take different paths, there is no single final state to keep
+        sim = BDDSimulator(circuit.num_qubits, manager)
+        sim.profiler = profiler
+        sim.cancel_event = cancel_event
+        output = branch_read_out(sim, circuit, use_statevector, shots,
+                                 np.random.default_rng(seed), memory, sparse_threshold,
+                                 observables)
+        output['bdd_stats'] = manager.stats()
+        if approximation_fidelity is not None:
+            output['fidelity'] = manager.fidelity
+        if keep_state:
+            output['state'] = None
+        return output
+    sim = state if state is not None else _simulate(circuit, manager, profiler, cancel_event)
+    with (profiler or NULL_PROFILER).span('read_out'):
+        output = read_out(sim, circuit, use_statevector, shots, np.random.default_rng(seed),
+                          memory, sparse_threshold, observables)
+    output['bdd_stats'] = sim.mgr.stats()
+    if sim.mgr.approximation_fidelity is not None:
+        output['fidelity'] = sim.mgr.fidelity
+    if keep_state:
+        sim.mgr.collect_garbage(sim.roots())
+        output['state'] = sim
+    return output
+
+
+def bdd_batch_controller(circuit, slots, values, use_statevector, shots, seed=None,
+                         memory=False, sparse_threshold=None, observables=None,
+                         max_nodes=None, max_memory_mb=None, qubit_order='interaction',
+                         sift_threshold=None):
+    """
+    Simulate one circuit for many parameter bindings.
+    The gates before the first parameterized one are simulated once; every
+    binding continues from a copy of that prefix on the same manager, so
+    the diagrams and the computed table are shared between bindings.
+    Args:
+        circuit (CircuitIR): circuit with placeholder parameters.
+        slots (ndarray): positions in ``circuit.params`` of the parameters.
+        values (ndarray): one row of slot values per binding.
+        seed (int): seed of binding 0, binding ``i`` uses ``seed + i``.
+        use_statevector, shots, memory, sparse_threshold, observables,
+        max_nodes, max_memory_mb, qubit_order, sift_threshold: see ``bdd_controller``.
+    Returns:
+        list: one output dict per binding.
+    """
+    import numpy as np
+    slots = np.asarray(slots, dtype=np.int64)
+    if circuit.is_dynamic:
+        outputs = []
+        for i, row in enumerate(np.atleast_2d(values)):
+            params = circuit.params.copy()
+            params[slots] = row
+            outputs.append(bdd_controller(circuit.with_params(params), use_statevector, shots,
+                                          None if seed is None else seed + i, memory,
+                                          sparse_threshold, observables=observables,
+                                          max_nodes=max_nodes, max_memory_mb=max_memory_mb,
+                                          qubit_order=qubit_order,
+                                          sift_threshold=sift_threshold))
+        return outputs
+    ops = list(circuit.ops())
+    first = len(ops)
+    if len(slots):
+        first = int(np.searchsorted(circuit.param_offsets, slots, side='right').min()) - 1
+    prefix = BDDSimulator(circuit.num_qubits, _manager(circuit, max_nodes, max_memory_mb,
+                                                       qubit_order, sift_threshold))
+    measured = set()
+    _run_ops(prefix, ops[:first], measured)
+    prefix.mgr.pin(prefix.roots())
+    outputs = []
+    try:
+        for i, row in enumerate(np.atleast_2d(values)):
+            params = circuit.params.copy()
+            params[slots] = row
+            bound = circuit.with_params(params)
+            sim = prefix.copy()
+            _run_ops(sim, list(bound.ops())[first:], set(measured))
+            output = read_out(sim, bound, use_statevector, shots,
+                              np.random.default_rng(None if seed is None else seed + i),
+                              memory, sparse_threshold, observables)
+            # the manager is shared, the counters add up over the bindings so far
+            output['bdd_stats'] = sim.mgr.stats()
+            outputs.append(output)
+    finally:
+        prefix.mgr.unpin(prefix.roots())
+    return outputs
+
+
+def interaction_order(circuit):
+    """
+    Static qubit order from the interaction graph of ``circuit``: a greedy
+    chain from qubit 0 that appends the free qubit sharing the most
+    multi-qubit operations with the last placed one, then with all placed
+    ones, then the lowest index. Qubits entangled with each other end up on
+    neighbouring levels even when their indices are far apart.
+    Returns:
+        list: the qubit at every level, top level first.
+    """
+    n = circuit.num_qubits
+    weights = [{} for _ in range(n)]
+    for _, qubits, _, _ in circuit.ops():
+        for a in qubits:
+            for b in qubits:
+                if a != b:
+                    weights[a][b] = weights[a].get(b, 0) + 1
+    order = [0] if n else []
+    free = set(range(1, n))
+    coupled = dict(weights[0]) if n else {}
+    while free:
+        last = weights[order[-1]]
+        qubit = max(free, key=lambda q: (last.get(q, 0), coupled.get(q, 0), -q))
+        order.append(qubit)
+        free.discard(qubit)
+        for other, weight in weights[qubit].items():
+            coupled[other] = coupled.get(other, 0) + weight
+    return order
+
+
+def _manager(circuit, max_nodes, max_memory_mb, qubit_order, sift_threshold,
+             approximation_fidelity=None, approximation_threshold=None):
+    if qubit_order == 'interaction':
+        qubit_order = interaction_order(circuit)
+    elif qubit_order == 'index' or qubit_order is None:
+        qubit_order = range(circuit.num_qubits)
+    elif sorted(qubit_order) != list(range(circuit.num_qubits)):
+        raise ALComError('qubit_order must be "interaction", "index" or a permutation '
+                         'of the qubits')
+    return BDDManager(max_nodes=max_nodes, max_memory_mb=max_memory_mb, order=qubit_order,
+                      sift_threshold=sift_threshold,
+                      approximation_fidelity=approximation_fidelity,
+                      approximation_threshold=approximation_threshold)
+
+
+def _simulate(circuit, manager=None, profiler=None, cancel_event=None):
+    """Final state of ``circuit``, measurements must be terminal."""
+    sim = BDDSimulator(circuit.num_qubits, manager)
+    sim.profiler = profiler
+    sim.cancel_event = cancel_event
+    _run_ops(sim, circuit.ops(), set())
+    return sim
+
+
+def _run_ops(sim, ops, measured):
+    """Apply ``ops`` on ``sim``, ``measured`` collects the measured qubits."""
+    for name, qubits, params, _ in ops:
+        if name == 'measure':
+            measured.add(qubits[0])
+            continue
+        if measured and measured.intersection(qubits):
+            raise ALComError('the BDD engine only supports terminal measurements')
+        sim.apply(name, qubits, params)
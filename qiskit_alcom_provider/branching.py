@@ -0,0 +1,258 @@
+"""
+Branch-aware execution of dynamic circuits: mid-circuit measurements,
+resets, classically conditioned operations (``c_if``) and noise channels.
+All shots start on one engine state. A measurement or reset that the rest
+of the circuit depends on splits the shots sitting on a state with one
+binomial draw, and each outcome continues on its own collapsed copy, so the
+shots with the same outcome history are simulated once, together; noise
+channels (see ``noise``) split them the same way with one multinomial draw
+over their error circuits or Kraus operators.
+Measurements nothing depends on anymore are sampled per branch at the end,
+in one batch like terminal measurements, readout errors are then applied
+to the sampled bits.
+"""
+
+import operator
+import logging
+
+import numpy as np
+
+from .alcom_error import ALComError
+from .sampling import (clbit_bit, clbit_map, counts_from_memory, expectation_values,
+                       memory_dtype, statevector_output)
+
+logger = logging.getLogger(__name__)
+
+_RELATIONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+              '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+def deferred_measurements(ops, conditions):
+    """
+    Find the measurements that can wait for the end of the circuit: no
+    later operation acts on the qubit and no later ``bfunc`` reads the slot.
+    Args:
+        ops (list): ``(name, qubits, params, clbit)`` tuples.
+        conditions (dict): operation index -> register, see ``CircuitIR``.
+    Returns:
+        tuple: the indices of the deferred measurements and ``{clbit: qubit}``
+        of those whose slot is not written again later.
+    """
+    touched = set()
+    read = 0
+    written = set()
+    deferred = set()
+    final = {}
+    for index in reversed(range(len(ops))):
+        name, qubits, params, clbit = ops[index]
+        if name == 'bfunc':
+            read |= params[0]
+        elif name == 'roerror':
+            # belongs to the measurement before it
+            continue
+        elif name == 'measure':
+            if qubits[0] not in touched and not (read >> clbit) & 1 and index not in conditions:
+                deferred.add(index)
+                if clbit not in written:
+                    final[clbit] = qubits[0]
+            else:
+                touched.add(qubits[0])
+            written.add(clbit)
+        else:
+            touched.update(qubits)
+    return deferred, final
+
+
+def run_branches(sim, circuit, shots, rng, visit, op_rng=None):
+    """
+    Run ``circuit`` from ``sim`` for ``shots`` shots, depth first over the
+    outcome histories, so only one pending state per split is alive.
+    Args:
+        sim: engine state with ``apply``, ``probability``, ``collapse`` and
+             ``copy``; BDD states also ``pin``/``unpin`` the pending branches.
+        circuit (CircuitIR): the dynamic circuit.
+        shots (int): number of shots.
+        rng (numpy.random.Generator): random source of the outcomes.
+        visit (callable): called as ``visit(state, shots, value)`` for every
+                          final branch, ``value`` holds the memory slots set
+                          by the measurements on the way.
+        op_rng (numpy.random.Generator): random source of stochastic gates.
+    """
+    ops = list(circuit.ops())
+    conditions = circuit.conditions
+    deferred, _ = deferred_measurements(ops, conditions)
+    # (first operation, state, shots, memory value, registers)
+    pending = [(0, sim, shots, 0, {})]
+    while pending:
+        start, sim, count, value, registers = pending.pop()
+        if start:
+            _release(sim)
+        for index in range(start, len(ops)):
+            name, qubits, params, clbit = ops[index]
+            register = conditions.get(index)
+            if register is not None and not registers.get(register, False):
+                continue
+            if name == 'bfunc':
+                mask, relation, target = params
+                if relation not in _RELATIONS:
+                    raise ALComError('bfunc relation "{}" is not supported'.format(relation))
+                registers = dict(registers)
+                registers[clbit] = _RELATIONS[relation](value & mask, target)
+                continue
+            if name == 'measure' and index in deferred:
+                continue
+            if name in ('mixture', 'kraus', 'roerror'):
+                if name == 'roerror' and index - 1 in deferred:
+                    continue
+                branches = _channel_branches(sim, name, qubits, params, count, value,
+                                             rng, op_rng)
+                for branch_count, branch in branches[1:]:
+                    other = sim.copy()
+                    other_value = branch(other, value)
+                    _hold(other)
+                    pending.append((index + 1, other, branch_count, other_value, registers))
+                count, branch = branches[0]
+                value = branch(sim, value)
+                continue
+            if name not in ('measure', 'reset'):
+                sim.apply(name, qubits, params, op_rng)
+                continue
+            qubit = qubits[0]
+            p_one = min(max(sim.probability(qubit), 0.0), 1.0)
+            ones = int(rng.binomial(count, p_one))
+            if ones and count - ones:
+                # the ones continue later on their own copy
+                other = sim.copy()
+                other.collapse(qubit, 1, p_one)
+                other_value = value
+                if name == 'reset':
+                    other.apply('x', [qubit], (), op_rng)
+                else:
+                    other_value |= 1 << clbit
+                _hold(other)
+                pending.append((index + 1, other, ones, other_value, registers))
+                outcome, count = 0, count - ones
+            else:
+                outcome = int(ones > 0 if count else p_one > 0.5)
+            sim.collapse(qubit, outcome, p_one)
+            if name == 'reset':
+                if outcome:
+                    sim.apply('x', [qubit], (), op_rng)
+            elif outcome:
+                value |= 1 << clbit
+            else:
+                value &= ~(1 << clbit)
+        visit(sim, count, value)
+
+
+def _channel_branches(sim, name, qubits, params, count, value, rng, op_rng):
+    """
+    ``(shots, action)`` of every outcome of a noise channel drawn by at least
+    one shot (the most likely one when there are no shots), ``action(state,
+    value)`` applies the outcome and returns the new memory value.
+    """
+    if name == 'roerror':
+        assignment, clbits = params
+        bit = 1 << clbits[0]
+        # row of the measured value: probabilities of recording 0 and 1
+        probs = assignment[int(bool(value & bit))]
+        actions = [lambda state, value: value & ~bit, lambda state, value: value | bit]
+    elif name == 'mixture':
+        probs, circuits = params
+
+        def action(circuit):
+            def apply(state, value):
+                for gate, gate_qubits, gate_params in circuit:
+                    state.apply(gate, gate_qubits, gate_params, op_rng)
+                return value
+            return apply
+
+        actions = [action(circuit) for circuit in circuits]
+    else:
+        norms = sim.kraus_probabilities(params, qubits)
+        probs = norms / norms.sum()
+
+        def action(mat, norm):
+            def apply(state, value):
+                state.apply_kraus(mat, qubits, norm)
+                return value
+            return apply
+
+        actions = [action(mat, norm) for mat, norm in zip(params, norms)]
+    if not count:
+        return [(0, actions[int(np.argmax(probs))])]
+    drawn = rng.multinomial(count, probs)
+    return [(int(n), actions[k]) for k, n in enumerate(drawn.tolist()) if n]
+
+
+def _hold(sim):
+    if hasattr(sim, 'pin'):
+        sim.pin()
+
+
+def _release(sim):
+    if hasattr(sim, 'unpin'):
+        sim.unpin()
+
+
+def branch_read_out(sim, circuit, use_statevector, shots, rng, memory=False,
+                    sparse_threshold=None, observables=None, op_rng=None):
+    """
+    Controller output of a dynamic circuit, same contract as ``sampling.read_out``.
+    The statevector is the final state of one shot, drawn with the
+    probability of its branch; expectation values are averaged over the
+    branches weighted by their shots.
+    """
+    dtype = memory_dtype(circuit.num_clbits)
+    ops = list(circuit.ops())
+    deferred, final = deferred_measurements(ops, circuit.conditions)
+    # readout errors of the deferred measurements, applied to the sampled bits
+    readout = {}
+    for index, (name, qubits, params, clbit) in enumerate(ops):
+        if name == 'roerror' and index - 1 in deferred and final.get(clbit) == qubits[0]:
+            readout[clbit] = params[0]
+    qubit_clbits = clbit_map(final)
+    final_mask = sum(1 << clbit for clbit in final)
+    parts = []
+    expectations = []
+    picked = [None, 0]
+
+    def visit(leaf, count, value):
+        if observables is not None:
+            expectations.append((count, expectation_values(leaf, observables)))
+            return
+        if qubit_clbits and count:
+            sampled = leaf.sample_memory(count, rng, qubit_clbits, circuit.num_clbits)
+            base = value & ~final_mask
+            values = sampled | (np.uint64(base) if dtype is np.uint64 else base)
+            for clbit, assignment in readout.items():
+                bit = clbit_bit(clbit, dtype)
+                ones = (values & bit) != 0
+                flips = rng.random(count) < np.where(ones, assignment[1, 0], assignment[0, 1])
+                values[flips] ^= bit
+            parts.append(values)
+        else:
+            parts.append(np.full(count, value, dtype=dtype))
+        if use_statevector:
+            # one branch with probability count / shots, kept without storing the others
+            picked[1] += count
+            if picked[0] is None or rng.random() * picked[1] < count:
+                picked[0] = statevector_output(leaf, circuit, sparse_threshold)
+
+    run_branches(sim, circuit, shots if observables is None else max(shots, 1), rng,
+                 visit, op_rng)
+    output = {'counts': {}}
+    if observables is not None:
+        total = sum(count for count, _ in expectations)
+        output['expectation_values'] = sum(count / total * values
+                                           for count, values in expectations)
+        return output
+    if circuit.measured:
+        values = np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+        rng.shuffle(values)
+        output['counts'] = counts_from_memory(values, circuit.creg_sizes)
+        if memory:
+            output['memory'] = values
+    if use_statevector:
+        output.update(picked[0])
+    return output
@@ -0,0 +1,354 @@
+"""
+Compact intermediate representation of one experiment, fed to the engines.
+It is built in a single pass over ``qobj.experiments[i].instructions``:
+gate names become integer opcodes, qubits and float parameters are packed in
+flat arrays with offsets, so no QASM text is printed or parsed on the way.
+QASM stays available through ``from_qasm`` / ``to_qasm`` for debugging.
+"""
+
+import hashlib
+import math
+import logging
+
+import numpy as np
+
+from .alcom_error import ALComError
+
+logger = logging.getLogger(__name__)
+
+OPCODE_NAMES = (
+    'id', 'u1', 'u2', 'u3', 'cx', 'cz', 'x', 'y', 'z', 'h', 's', 'sdg',
+    't', 'tdg', 'swap', 'ccx', 'unitary', 'initialize', 'cu1', 'cu2',
+    'cu3', 'cswap', 'mcx', 'mcy', 'mcz', 'mcu1', 'mcu2', 'mcu3',
+    'mcswap', 'multiplexer', 'kraus', 'roerror', 'measure', 'reset',
+    'bfunc', 'mixture',
+)
+OPCODES = {name: code for code, name in enumerate(OPCODE_NAMES)}
+
+# instructions whose params are matrices or vectors rather than angles,
+# ``bfunc`` keeps ``(mask, relation, value)`` with integer mask and value,
+# ``mixture`` and ``roerror`` hold noise channels (see ``noise``)
+_MATRIX_PARAMS = ('unitary', 'initialize', 'multiplexer', 'kraus', 'roerror', 'bfunc',
+                  'mixture')
+# instructions after which shots take different paths
+_STOCHASTIC = ('reset', 'bfunc', 'kraus', 'mixture', 'roerror')
+# instructions that do not act on the state
+_IGNORED = ('barrier', 'snapshot')
+
+
+class CircuitIR():
+    """
+    One experiment as flat arrays.
+    Attributes:
+        num_qubits (int): width of the circuit.
+        creg_sizes (list): ``[name, size]`` pairs of the classical registers.
+        opcodes (ndarray): opcode per operation (see ``OPCODE_NAMES``).
+        qubits (ndarray): all qubit operands, operation ``i`` owns
+                          ``qubits[qubit_offsets[i]:qubit_offsets[i + 1]]``.
+        params (ndarray): all float parameters, sliced by ``param_offsets``.
+        clbits (ndarray): memory slot per operation, ``-1`` if none.
+        extras (dict): operation index -> matrix/vector parameters.
+        global_phase (float): phase the engines put on the final state,
+                              left by rewrites such as gate fusion.
+        conditions (dict): operation index -> register it is conditioned on,
+                           the register is set by a ``bfunc`` (``c_if``).
+    """
+
+    def __init__(self, num_qubits, creg_sizes, opcodes, qubits, qubit_offsets,
+                 params, param_offsets, clbits, extras=None, name=None, global_phase=0.0,
+                 conditions=None):
+        self.num_qubits = num_qubits
+        self.creg_sizes = creg_sizes
+        self.opcodes = np.asarray(opcodes, dtype=np.int16)
+        self.qubits = np.asarray(qubits, dtype=np.int32)
+        self.qubit_offsets = np.asarray(qubit_offsets, dtype=np.int32)
+        self.params = np.asarray(params, dtype=np.float64)
+        self.param_offsets = np.asarray(param_offsets, dtype=np.int32)
+        self.clbits = np.asarray(clbits, dtype=np.int32)
+        self.extras = extras or {}
+        self.name = name
+        self.global_phase = global_phase
+        self.conditions = conditions or {}
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    @property
+    def num_clbits(self):
+        """Total number of memory slots."""
+        return sum(size for _, size in self.creg_sizes)
+
+    @property
+    def measured(self):
+        """Memory slot -> qubit of every ``measure``."""
+        mask = self.opcodes == OPCODES['measure']
+        return dict(zip(self.clbits[mask].tolist(),
+                        self.qubits[self.qubit_offsets[:-1][mask]].tolist()))
+
+    @property
+    def is_dynamic(self):
+        """
+        True if shots can take different paths through the circuit: it has a
+        reset, a classical condition, a noise channel or a measurement
+        followed by an operation on the measured qubit.
+        """
+        if self.conditions or np.isin(self.opcodes, [OPCODES[name] for name in _STOCHASTIC]).any():
+            return True
+        measured = set()
+        for name, qubits, _, _ in self.ops():
+            if name == 'measure':
+                measured.add(qubits[0])
+            elif measured.intersection(qubits):
+                return True
+        return False
+
+    def with_params(self, params):
+        """Same circuit with another float parameter array, the other arrays are shared."""
+        return CircuitIR(self.num_qubits, self.creg_sizes, self.opcodes, self.qubits,
+                         self.qubit_offsets, params, self.param_offsets, self.clbits,
+                         self.extras, self.name, self.global_phase, self.conditions)
+
+    def fingerprint(self, **options):
+        """
+        Canonical hash of the instruction stream and its parameters.
+        Args:
+            options: run options that change the result (method, seed, ...),
+                     mixed into the hash.
+        Returns:
+            str: hex digest, equal for equal circuits and options.
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((self.num_qubits, self.creg_sizes, self.global_phase,
+                            sorted(self.conditions.items()),
+                            sorted(options.items()))).encode())
+        for array in (self.opcodes, self.qubits, self.qubit_offsets,
+                      self.params, self.param_offsets, self.clbits):
+            digest.update(array.tobytes())
+            digest.update(b'|')
+        for index in sorted(self.extras):
+            digest.update(str(index).encode())
+            _hash_param(digest, self.extras[index])
+        return digest.hexdigest()
+
+    def structure_hash(self):
+        """
+        Hash of the instruction stream without its parameters: width,
+        registers, opcodes, operands, memory slots and conditions. Equal
+        for the bindings of a parameterized circuit; computed once.
+        """
+        digest = self.__dict__.get('_structure_hash')
+        if digest is None:
+            digest = hashlib.sha256(repr((self.num_qubits, self.creg_sizes,
+                                          sorted(self.conditions.items()))).encode())
+            for array in (self.opcodes, self.qubits, self.qubit_offsets, self.clbits):
+                digest.update(array.tobytes())
+                digest.update(b'|')
+            digest = self._structure_hash = digest.hexdigest()
+        return digest
+
+    def ops(self):
+        """
+        Iterate over ``(name, qubits, params, clbit)``.
+        Matrix parameters are returned in place of ``params``.
+        """
+        qubits = self.qubits.tolist()
+        q_off = self.qubit_offsets.tolist()
+        params = self.params.tolist()
+        p_off = self.param_offsets.tolist()
+        clbits = self.clbits.tolist()
+        extras = self.extras
+        for i, code in enumerate(self.opcodes.tolist()):
+            yield (OPCODE_NAMES[code], qubits[q_off[i]:q_off[i + 1]],
+                   extras[i] if i in extras else params[p_off[i]:p_off[i + 1]],
+                   clbits[i])
+
+    @classmethod
+    def from_ops(cls, num_qubits, creg_sizes, ops, name=None, global_phase=0.0):
+        """
+        Pack ``(name, qubits, params, clbit)`` tuples, a fifth item is the
+        register a conditioned operation depends on (None or -1 if none).
+        """
+        opcodes = []
+        qubits = []
+        qubit_offsets = [0]
+        params = []
+        param_offsets = [0]
+        clbits = []
+        extras = {}
+        conditions = {}
+        for op in ops:
+            op_name, op_qubits, op_params, clbit = op[:4]
+            if op_name in _IGNORED:
+                continue
+            if len(op) > 4 and op[4] is not None and op[4] >= 0:
+                conditions[len(opcodes)] = op[4]
+            code = OPCODES.get(op_name)
+            if code is None:
+                raise ALComError('instruction "{}" is not supported'.format(op_name))
+            if op_name in _MATRIX_PARAMS:
+                extras[len(opcodes)] = op_params
+            else:
+                params.extend(op_params)
+            opcodes.append(code)
+            qubits.extend(op_qubits)
+            qubit_offsets.append(len(qubits))
+            param_offsets.append(len(params))
+            clbits.append(clbit)
+        return cls(num_qubits, creg_sizes, opcodes, qubits, qubit_offsets,
+                   params, param_offsets, clbits, extras, name, global_phase, conditions)
+
+    @classmethod
+    def from_experiment(cls, experiment, qobj_config=None):
+        """
+        Build the IR straight from a ``QasmQobjExperiment``.
+        Args:
+            experiment (QasmQobjExperiment): one experiment of a qobj.
+            qobj_config (QasmQobjConfig): fallback for the circuit width.
+        Returns:
+            CircuitIR: the packed experiment.
+        """
+        header = experiment.header
+        num_qubits = getattr(experiment.config, 'n_qubits', None)
+        if num_qubits is None:
+            num_qubits = getattr(header, 'n_qubits', None)
+        if num_qubits is None:
+            num_qubits = qobj_config.n_qubits
+        creg_sizes = [list(reg) for reg in getattr(header, 'creg_sizes', [])]
+        ops = (_instruction_op(inst) for inst in experiment.instructions)
+        return cls.from_ops(num_qubits, creg_sizes, ops, getattr(header, 'name', None))
+
+    @classmethod
+    def from_qasm(cls, qasm_str):
+        """Debug path: build the IR from OpenQASM 2.0 text."""
+        num_qubits, creg_sizes, ops = parse_qasm(qasm_str)
+        return cls.from_ops(num_qubits, creg_sizes, ops)
+
+    def to_qasm(self):
+        """Export path: print the IR as flat OpenQASM 2.0 (``q`` and ``c``)."""
+        lines = ['OPENQASM 2.0;', 'include "qelib1.inc";',
+                 'qreg q[{}];'.format(self.num_qubits)]
+        if self.num_clbits:
+            lines.append('creg c[{}];'.format(self.num_clbits))
+        for name, qubits, params, clbit in self.ops():
+            targets = ','.join('q[{}]'.format(q) for q in qubits)
+            if name == 'measure':
+                lines.append('measure {} -> c[{}];'.format(targets, clbit))
+            elif name in _MATRIX_PARAMS:
+                lines.append('// {} {};'.format(name, targets))
+            elif params:
+                lines.append('{}({}) {};'.format(
+                    name, ','.join(repr(p) for p in params), targets))
+            else:
+                lines.append('{} {};'.format(name, targets))
+        return '\n'.join(lines) + '\n'
+
+
+def _instruction_op(inst):
+    """``(name, qubits, params, clbit, condition)`` of a qobj instruction."""
+    if inst.name == 'bfunc':
+        # (memory & mask) <relation> value is stored in ``register``
+        params = (int(inst.mask, 16), inst.relation, int(inst.val, 16))
+        return 'bfunc', [], params, inst.register, None
+    return (inst.name,
+            getattr(inst, 'qubits', []),
+            getattr(inst, 'params', []),
+            getattr(inst, 'memory', [-1])[0],
+            getattr(inst, 'conditional', None))
+
+
+def _hash_param(digest, value):
+    """Feed a matrix/vector parameter, possibly ragged or mixed with names, to ``digest``."""
+    if isinstance(value, (str, int)):
+        digest.update(repr(value).encode())
+    elif isinstance(value, (list, tuple)) and \
+            any(isinstance(item, (list, tuple, np.ndarray, str)) for item in value):
+        digest.update(b'[')
+        for item in value:
+            _hash_param(digest, item)
+        digest.update(b']')
+    else:
+        array = np.asarray(value, dtype=complex)
+        digest.update(repr(array.shape).encode())
+        digest.update(array.tobytes())
+
+
+def parse_qasm(qasm_str):
+    """
+    Parse the OpenQASM 2.0 text produced by ``QuantumCircuit.qasm()``.
+    Returns:
+        tuple: ``(num_qubits, creg_sizes, ops)`` where each op is
+        ``(name, qubits, params, clbit)`` on flattened indices.
+    """
+    qregs = {}
+    cregs = {}
+    creg_sizes = []
+    num_qubits = 0
+    num_clbits = 0
+    ops = []
+
+    def bits(arg, regs):
+        name, _, index = arg.strip().partition('[')
+        offset, size = regs[name]
+        if index:
+            return [offset + int(index.rstrip(']'))]
+        return list(range(offset, offset + size))
+
+    for line in qasm_str.split(';'):
+        line = line.strip()
+        if not line or line.startswith(('OPENQASM', 'include', '//')):
+            continue
+        if line.startswith('qreg') or line.startswith('creg'):
+            name, size = line[4:].strip().rstrip(']').split('[')
+            size = int(size)
+            if line.startswith('qreg'):
+                qregs[name] = (num_qubits, size)
+                num_qubits += size
+            else:
+                cregs[name] = (num_clbits, size)
+                creg_sizes.append([name, size])
+                num_clbits += size
+            continue
+        if line.startswith('measure'):
+            src, dst = line[len('measure'):].split('->')
+            for q, c in zip(bits(src, qregs), bits(dst, cregs)):
+                ops.append(('measure', [q], [], c))
+            continue
+        if '(' in line:
+            name, rest = line.split('(', 1)
+            args, targets = rest.rsplit(')', 1)
+            params = [_eval_param(p) for p in args.split(',')]
+        else:
+            name, targets = line.split(None, 1)
+            params = []
+        name = name.strip()
+        qargs = [bits(arg, qregs) for arg in targets.split(',')]
+        # register-wide arguments broadcast like in OpenQASM
+        width = max(len(arg) for arg in qargs)
+        for i in range(width):
+            ops.append((name, [arg[i] if len(arg) > 1 else arg[0] for arg in qargs],
+                        params, -1))
+    return num_qubits, creg_sizes, ops
+
+
+def _eval_param(expr):
+    """Evaluate a QASM parameter expression such as ``-3*pi/4``."""
+    import ast
+    import operator
+    binary = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+              ast.Div: operator.truediv, ast.Pow: operator.pow}
+    unary = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+    def walk(node):
+        if isinstance(node, ast.Expression):
+            return walk(node.body)
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        if isinstance(node, ast.Name) and node.id == 'pi':
+            return math.pi
+        if isinstance(node, ast.BinOp) and type(node.op) in binary:
+            return binary[type(node.op)](walk(node.left), walk(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in unary:
+            return unary[type(node.op)](walk(node.operand))
+        raise ALComError('cannot evaluate QASM parameter "{}"'.format(expr))
+
+    return walk(ast.parse(expr.strip(), mode='eval'))
@@ -0,0 +1,310 @@
+"""
+Pre-simulation optimization of a ``CircuitIR``.
+Three passes run on the instruction stream before it reaches an engine:
+
+* inverse pairs cancel (``h h``, ``cx cx``, ``swap swap``) and diagonal gates
+  (``z``, ``s``, ``t``, ``u1``, ``cz``, ``cu1``, ...) commute through each other
+  and merge into one phase per set of qubits (``s sdg`` disappears);
+* runs of single-qubit gates are fused into one ``u3`` (or ``u1``), the global
+  phase this drops is kept on the circuit;
+* for engines with dense matrices, blocks of gates on at most
+  ``max_qubits`` qubits are fused into one ``unitary``.
+
+The BDD engine only represents angles that are multiples of pi/4 and has no
+``unitary``, so with ``exact=True`` a fusion is only done when the fused gate
+stays exact and cheaper, and blocks are not fused.
+"""
+
+import cmath
+import math
+import logging
+
+import numpy as np
+
+from .circuit_ir import CircuitIR
+from .dense_engine import DenseSimulator, single_qubit_matrix
+
+logger = logging.getLogger(__name__)
+
+_TWO_PI = 2 * math.pi
+_ANGLE_TOL = 1e-9
+
+# phase put on the all-ones state of the gate's qubits
+_DIAGONAL_PHASES = {'z': math.pi, 's': math.pi / 2, 'sdg': -math.pi / 2,
+                    't': math.pi / 4, 'tdg': -math.pi / 4, 'cz': math.pi, 'mcz': math.pi}
+_DIAGONAL_PARAMETRIC = ('u1', 'cu1', 'mcu1')
+# gates that are their own inverse, controlled ones compare controls as a set
+_SELF_INVERSE_1Q = ('h', 'x', 'y')
+_SELF_INVERSE_CONTROLLED = {'cx': 'x', 'ccx': 'x', 'mcx': 'x', 'mcy': 'y'}
+_SELF_INVERSE_SWAP = ('swap', 'cswap', 'mcswap')
+_SINGLE_QUBIT = ('id', 'x', 'y', 'z', 'h', 's', 'sdg', 't', 'tdg', 'u1', 'u2', 'u3')
+# unitary gates a fused block may hold
+_BLOCK_GATES = _SINGLE_QUBIT + (
+    'cx', 'cz', 'swap', 'ccx', 'unitary', 'cu1', 'cu2', 'cu3', 'cswap',
+    'mcx', 'mcy', 'mcz', 'mcu1', 'mcu2', 'mcu3', 'mcswap')
+# smaller multi-qubit blocks are cheaper to apply gate by gate
+_MIN_BLOCK_GATES = 3
+# relative cost of single-qubit gates on the BDD engine (Hadamard-like steps)
+_BDD_COST = {'h': 1, 'x': 1, 'y': 1, 'u2': 3, 'u3': 3}
+
+
+def optimize_circuit(circuit, max_qubits=2, exact=False):
+    """
+    Run the passes of this module on ``circuit``.
+    Args:
+        circuit (CircuitIR): circuit to optimize, left untouched.
+        max_qubits (int): widest fused block, 1 only fuses single-qubit runs.
+        exact (bool): keep every gate representable by the BDD engine.
+    Returns:
+        tuple: the optimized ``CircuitIR`` and the number of removed operations.
+    """
+    if circuit.conditions:
+        # conditioned operations must keep their place, leave the circuit as is
+        return circuit, 0
+    ops = list(circuit.ops())
+    before = len(ops)
+    ops = cancel_and_merge(ops)
+    ops, phase = fuse_single_qubit(ops, exact)
+    if max_qubits >= 2 and not exact:
+        ops = fuse_blocks(ops, max_qubits)
+    optimized = CircuitIR.from_ops(circuit.num_qubits, circuit.creg_sizes, ops,
+                                   circuit.name, circuit.global_phase + phase)
+    return optimized, before - len(optimized)
+
+
+def _diagonal_phase(name, params):
+    if name in _DIAGONAL_PHASES:
+        return _DIAGONAL_PHASES[name]
+    if name in _DIAGONAL_PARAMETRIC:
+        return params[0]
+    return None
+
+
+def _self_inverse_key(name, qubits):
+    if name in _SELF_INVERSE_1Q:
+        return name, qubits[0]
+    if name in _SELF_INVERSE_CONTROLLED:
+        return _SELF_INVERSE_CONTROLLED[name], frozenset(qubits[:-1]), qubits[-1]
+    if name in _SELF_INVERSE_SWAP:
+        return 'swap', frozenset(qubits[:-2]), frozenset(qubits[-2:])
+    return None
+
+
+def _is_zero_angle(angle):
+    return abs(math.remainder(angle, _TWO_PI)) < _ANGLE_TOL
+
+
+def _is_eighth(angle):
+    m = angle / (math.pi / 4)
+    return abs(m - round(m)) < _ANGLE_TOL
+
+
+def _diagonal_op(qubits, phase):
+    qubits = sorted(qubits)
+    name = ('u1', 'cu1')[len(qubits) - 1] if len(qubits) <= 2 else 'mcu1'
+    return name, qubits, [math.remainder(phase, _TWO_PI)], -1
+
+
+def cancel_and_merge(ops):
+    """
+    Cancel adjacent self-inverse pairs and merge diagonal gates acting on
+    the same qubits, looking through other diagonal gates they commute with.
+    Args:
+        ops (list): ``(name, qubits, params, clbit)`` tuples.
+    Returns:
+        list: the remaining operations, in a valid order.
+    """
+    out = []
+    # per entry of ``out``: (qubit set, phase, merged) of diagonal gates
+    diagonal = []
+    inverse_keys = []
+    # qubit -> indices of ``out`` acting on it, oldest first
+    stacks = {}
+
+    def remove(index):
+        for q in out[index][1]:
+            stacks[q].remove(index)
+        out[index] = None
+
+    for op in ops:
+        name, qubits, params, _ = op
+        if name == 'id':
+            continue
+        phase = _diagonal_phase(name, params)
+        if phase is not None:
+            key = frozenset(qubits)
+            index = _find_diagonal(key, diagonal, stacks)
+            if index is not None:
+                total = diagonal[index][1] + phase
+                if _is_zero_angle(total):
+                    remove(index)
+                else:
+                    diagonal[index] = (key, total, True)
+                continue
+            entry = (key, phase, False)
+            inverse_key = None
+        else:
+            entry = None
+            inverse_key = _self_inverse_key(name, qubits)
+            if inverse_key is not None:
+                tops = {stacks[q][-1] if stacks.get(q) else None for q in qubits}
+                if len(tops) == 1:
+                    top = tops.pop()
+                    if top is not None and inverse_keys[top] == inverse_key:
+                        remove(top)
+                        continue
+        index = len(out)
+        out.append(op)
+        diagonal.append(entry)
+        inverse_keys.append(inverse_key)
+        for q in qubits:
+            stacks.setdefault(q, []).append(index)
+    result = []
+    for op, entry in zip(out, diagonal):
+        if op is None:
+            continue
+        if entry is not None and entry[2]:
+            op = _diagonal_op(entry[0], entry[1])
+        result.append(op)
+    return result
+
+
+def _find_diagonal(key, diagonal, stacks):
+    """Latest diagonal gate on exactly ``key`` reachable through diagonal gates."""
+    first = next(iter(key))
+    for index in reversed(stacks.get(first, ())):
+        entry = diagonal[index]
+        if entry is None:
+            return None
+        if entry[0] != key:
+            continue
+        # every gate after it on the other qubits must be diagonal too
+        if all(diagonal[later] is not None
+               for q in key for later in stacks[q][stacks[q].index(index) + 1:]):
+            return index
+    return None
+
+
+def u3_angles(mat):
+    """
+    Return ``(theta, phi, lam, gamma)`` with
+    ``mat = exp(i gamma) u3(theta, phi, lam)`` for a 2x2 unitary.
+    """
+    m00, m01, m10, m11 = (complex(v) for v in np.asarray(mat).ravel())
+    theta = 2 * math.atan2(abs(m10), abs(m00))
+    if abs(m00) > _ANGLE_TOL:
+        gamma = cmath.phase(m00)
+        if abs(m10) > _ANGLE_TOL:
+            phi = cmath.phase(m10) - gamma
+            lam = cmath.phase(-m01) - gamma
+        else:
+            phi = 0.0
+            lam = cmath.phase(m11) - gamma
+    else:
+        gamma = cmath.phase(m10)
+        phi = 0.0
+        lam = cmath.phase(-m01) - gamma
+    return theta, phi, lam, gamma
+
+
+def fuse_single_qubit(ops, exact=False):
+    """
+    Fuse every run of single-qubit gates on a qubit into one ``u3``
+    (``u1`` when it is diagonal, nothing when it is the identity).
+    Returns:
+        tuple: the operations and the global phase dropped by the fusion.
+    """
+    out = []
+    runs = {}
+    global_phase = 0.0
+
+    def flush(qubit):
+        nonlocal global_phase
+        run = runs.pop(qubit, None)
+        if not run:
+            return
+        if len(run) == 1:
+            out.append(run[0])
+            return
+        mat = np.eye(2, dtype=complex)
+        for name, _, params, _ in run:
+            mat = single_qubit_matrix(name, params) @ mat
+        theta, phi, lam, gamma = u3_angles(mat)
+        if _is_zero_angle(theta):
+            fused = [] if _is_zero_angle(phi + lam) else [('u1', [qubit], [phi + lam], -1)]
+        else:
+            fused = [('u3', [qubit], [theta, phi, lam], -1)]
+        if exact:
+            angles = [angle for op in fused for angle in op[2]]
+            cost = sum(_BDD_COST.get(op[0], 1) for op in fused)
+            if not all(_is_eighth(angle) for angle in angles) or \
+                    cost >= sum(_BDD_COST.get(op[0], 1) for op in run):
+                out.extend(run)
+                return
+        out.extend(fused)
+        global_phase += gamma
+
+    for op in ops:
+        name, qubits = op[0], op[1]
+        if len(qubits) == 1 and name in _SINGLE_QUBIT:
+            runs.setdefault(qubits[0], []).append(op)
+            continue
+        for qubit in qubits:
+            flush(qubit)
+        out.append(op)
+    for qubit in list(runs):
+        flush(qubit)
+    return out, global_phase
+
+
+def fuse_blocks(ops, max_qubits):
+    """
+    Fuse blocks of unitary gates spanning at most ``max_qubits`` qubits into
+    one ``unitary`` each. Open blocks on disjoint qubits commute, so a block
+    is only emitted once a gate that cannot join it touches its qubits.
+    """
+    out = []
+    owner = {}
+
+    def close(block):
+        for qubit in block[0]:
+            del owner[qubit]
+        out.extend(_fused_block(*block))
+
+    for op in ops:
+        name, qubits = op[0], op[1]
+        blocks = list({id(owner[q]): owner[q] for q in qubits if q in owner}.values())
+        if name not in _BLOCK_GATES or len(qubits) > max_qubits:
+            for block in blocks:
+                close(block)
+            out.append(op)
+            continue
+        union = set(qubits).union(*(block[0] for block in blocks))
+        if len(union) <= max_qubits:
+            block = (union, [gate for block in blocks for gate in block[1]] + [op])
+        else:
+            for block in blocks:
+                close(block)
+            block = (set(qubits), [op])
+        for qubit in block[0]:
+            owner[qubit] = block
+    for block in list({id(block): block for block in owner.values()}.values()):
+        close(block)
+    return out
+
+
+def _fused_block(qubits, block_ops):
+    """One ``unitary`` for a block, or its gates when fusing does not pay off."""
+    if len(qubits) == 1 or len(block_ops) < _MIN_BLOCK_GATES:
+        return block_ops
+    qubits = sorted(qubits)
+    local = {q: i for i, q in enumerate(qubits)}
+    sim = DenseSimulator(len(qubits))
+    mat = np.empty((1 << len(qubits), 1 << len(qubits)), dtype=complex)
+    for column in range(len(mat)):
+        sim.state[:] = 0
+        sim.state[column] = 1
+        for name, op_qubits, params, _ in block_ops:
+            sim.apply(name, [local[q] for q in op_qubits], params)
+        mat[:, column] = sim.state
+    return [('unitary', qubits, [mat], -1)]
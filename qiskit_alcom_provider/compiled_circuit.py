@@ -0,0 +1,151 @@
+"""
+Parameterized circuits compiled once and run for many bindings.
+``QasmSimulator.compile`` packs a ``QuantumCircuit`` into a ``CircuitIR``
+whose parameterized angles are slots; binding a parameter matrix only
+fills a float array, there is no ``assemble``, qobj or QASM on the way.
+"""
+
+import time
+import uuid
+import logging
+
+import numpy as np
+
+from qiskit.circuit import Parameter, ParameterExpression
+
+from .alcom_error import ALComError
+from .circuit_ir import CircuitIR
+from .sampling import observable_terms
+
+logger = logging.getLogger(__name__)
+
+
+def pack_circuit(circuit):
+    """
+    Pack a ``QuantumCircuit`` into a ``CircuitIR`` with parameter slots.
+    Returns:
+        tuple: the IR (slots hold 0.0), the flat positions of the slots in
+        ``ir.params`` and the ``ParameterExpression`` of each slot.
+    """
+    qubit_index = {qubit: i for i, qubit in enumerate(circuit.qubits)}
+    clbit_index = {clbit: i for i, clbit in enumerate(circuit.clbits)}
+    ops = []
+    expressions = []
+    # (op index, parameter position) of every slot
+    positions = []
+    for instruction, qargs, cargs in circuit.data:
+        if instruction.name in ('barrier', 'snapshot'):
+            continue
+        if getattr(instruction, 'condition', None) is not None:
+            raise ALComError('classically conditioned gates cannot be compiled')
+        params = []
+        for position, param in enumerate(instruction.params):
+            if isinstance(param, ParameterExpression):
+                expressions.append(param)
+                positions.append((len(ops), position))
+                param = 0.0
+            params.append(param)
+        clbit = clbit_index[cargs[0]] if cargs else -1
+        ops.append((instruction.name, [qubit_index[q] for q in qargs], params, clbit))
+    ir = CircuitIR.from_ops(len(circuit.qubits),
+                            [[reg.name, reg.size] for reg in circuit.cregs],
+                            ops, circuit.name)
+    offsets = ir.param_offsets
+    slots = np.array([offsets[op] + position for op, position in positions], dtype=np.int64)
+    return ir, slots, expressions
+
+
+class CompiledCircuit():
+    """
+    A circuit packed once with parameter slots, see ``QasmSimulator.compile``.
+    Attributes:
+        parameters (list): the circuit parameters, in the column order of
+                           the ``param_matrix`` of ``run_batch``.
+    """
+
+    def __init__(self, backend, circuit, engine, batch_controller):
+        self._backend = backend
+        self._ir, self._slots, self._expressions = pack_circuit(circuit)
+        self.parameters = sorted(circuit.parameters, key=lambda p: p.name)
+        self._columns = {param: i for i, param in enumerate(self.parameters)}
+        self._engine = engine
+        self._batch_controller = batch_controller
+
+    @property
+    def num_parameters(self):
+        return len(self.parameters)
+
+    @property
+    def circuit(self):
+        """The packed ``CircuitIR``, slots hold 0.0."""
+        return self._ir
+
+    def slot_values(self, param_matrix):
+        """Evaluate every slot for every row of ``param_matrix``."""
+        param_matrix = np.atleast_2d(np.asarray(param_matrix, dtype=float))
+        if param_matrix.shape[1] != len(self.parameters):
+            raise ALComError('expected {} parameter columns ({}), got {}'.format(
+                len(self.parameters), ', '.join(p.name for p in self.parameters),
+                param_matrix.shape[1]))
+        values = np.empty((len(param_matrix), len(self._expressions)))
+        for j, expr in enumerate(self._expressions):
+            if isinstance(expr, Parameter):
+                values[:, j] = param_matrix[:, self._columns[expr]]
+                continue
+            columns = [(param, self._columns[param]) for param in expr.parameters]
+            values[:, j] = [float(expr.bind({param: row[column] for param, column in columns}))
+                            for row in param_matrix]
+        return values
+
+    def bind(self, params):
+        """The ``CircuitIR`` for one binding (one row of the parameter matrix)."""
+        values = self.slot_values(params)[0]
+        bound = self._ir.params.copy()
+        bound[self._slots] = values
+        return self._ir.with_params(bound)
+
+    def run_batch(self, param_matrix, shots=1024, method="counts", seed=None,
+                  memory=False, sparse_threshold=0.0, observables=None, **engine_kwargs):
+        """
+        Run every binding of ``param_matrix`` in one call.
+        Args:
+            param_matrix (array): one row per binding, one column per parameter.
+            shots (int): shots per binding.
+            method (str): ``"counts"``, ``"statevector"``, ``"sparse_statevector"``
+                          or ``"expectation"``.
+            seed (int): seed of binding 0, binding ``i`` uses ``seed + i``.
+            memory (bool): also keep the per-shot memory.
+            sparse_threshold (float): see the ``sparse_statevector`` method.
+            observables: Pauli terms of the ``expectation`` method.
+            engine_kwargs: extra controller options (e.g. ``precision``).
+        Returns:
+            TrimResult: one experiment per binding, in row order.
+        """
+        start = time.time()
+        if method not in ("counts", "statevector", "sparse_statevector", "expectation"):
+            raise ALComError("the backend method is not supported")
+        labels = coefficients = None
+        if method == "expectation":
+            if observables is None:
+                raise ALComError("the expectation method needs observables")
+            labels, coefficients = observable_terms(observables)
+        values = self.slot_values(param_matrix)
+        use_statevector = method in ("statevector", "sparse_statevector")
+        outputs = self._batch_controller(
+            self._ir, self._slots, values, use_statevector, shots, seed=seed, memory=memory,
+            sparse_threshold=sparse_threshold if method == "sparse_statevector" else None,
+            observables=labels, **engine_kwargs)
+        results = []
+        for i, output in enumerate(outputs):
+            output["name"] = "{}[{}]".format(self._ir.name, i)
+            output["creg_sizes"] = self._ir.creg_sizes
+            output["num_qubits"] = self._ir.num_qubits
+            if labels is not None:
+                output["expectation_coefficients"] = coefficients
+            results.append(output)
+        return self._backend._format_results(str(uuid.uuid4()), {"results": results},
+                                             time.time() - start)
+
+    def __repr__(self):
+        return "<CompiledCircuit '{}' ({} parameters, {} engine)>".format(
+            self._ir.name, len(self.parameters), self._engine)
@@ -0,0 +1,577 @@
+"""
+Dense statevector engine, the fallback for small but highly entangled circuits
+where the BDD representation blows up.
+The state is one preallocated buffer viewed as a ``[2] * n`` tensor; every gate
+is applied as a contraction on views of that buffer, so no ``2^n x 2^n`` matrix
+is ever built and nothing is reallocated per gate.
+"""
+
+import cmath
+import math
+import logging
+from concurrent import futures
+
+import numpy as np
+
+from .alcom_error import ALComError
+from .branching import branch_read_out
+from .circuit_ir import CircuitIR
+from .profiling import NULL_PROFILER
+from .sampling import sample_indices, memory_from_indices, memory_dtype, parity, read_out
+
+logger = logging.getLogger(__name__)
+
+_PRECISION = {'double': np.complex128, 'single': np.complex64}
+
+
+def _u3(theta, phi, lam):
+    cos = math.cos(theta / 2)
+    sin = math.sin(theta / 2)
+    return np.array([[cos, -cmath.exp(1j * lam) * sin],
+                     [cmath.exp(1j * phi) * sin, cmath.exp(1j * (phi + lam)) * cos]])
+
+
+_FIXED = {
+    'id': np.eye(2),
+    'x': np.array([[0, 1], [1, 0]]),
+    'y': np.array([[0, -1j], [1j, 0]]),
+    'z': np.diag([1, -1]),
+    'h': np.array([[1, 1], [1, -1]]) / math.sqrt(2),
+    's': np.diag([1, 1j]),
+    'sdg': np.diag([1, -1j]),
+    't': np.diag([1, cmath.exp(0.25j * math.pi)]),
+    'tdg': np.diag([1, cmath.exp(-0.25j * math.pi)]),
+}
+
+_PARAMETRIC = {
+    'u1': lambda lam: np.diag([1, cmath.exp(1j * lam)]),
+    'u2': lambda phi, lam: _u3(math.pi / 2, phi, lam),
+    'u3': _u3,
+}
+
+# controlled gate -> single-qubit base gate
+_CONTROLLED = {
+    'cx': 'x', 'ccx': 'x', 'mcx': 'x', 'mcy': 'y', 'cz': 'z', 'mcz': 'z',
+    'cu1': 'u1', 'mcu1': 'u1', 'cu2': 'u2', 'mcu2': 'u2', 'cu3': 'u3', 'mcu3': 'u3',
+}
+
+
+def _u3_batch(theta, phi, lam):
+    """Stack of u3 matrices, ``(batch, 2, 2)``."""
+    theta, phi, lam = np.broadcast_arrays(np.asarray(theta, dtype=float),
+                                          np.asarray(phi, dtype=float),
+                                          np.asarray(lam, dtype=float))
+    cos = np.cos(theta / 2)
+    sin = np.sin(theta / 2)
+    mats = np.empty(theta.shape + (2, 2), dtype=complex)
+    mats[..., 0, 0] = cos
+    mats[..., 0, 1] = -np.exp(1j * lam) * sin
+    mats[..., 1, 0] = np.exp(1j * phi) * sin
+    mats[..., 1, 1] = np.exp(1j * (phi + lam)) * cos
+    return mats
+
+
+_PARAMETRIC_BATCH = {
+    'u1': lambda lam: _u3_batch(0, 0, lam),
+    'u2': lambda phi, lam: _u3_batch(math.pi / 2, phi, lam),
+    'u3': _u3_batch,
+}
+# gates the batched simulator runs, anything else is simulated binding by binding
+BATCH_GATES = frozenset(list(_FIXED) + list(_PARAMETRIC) + list(_CONTROLLED)
+                        + ['swap', 'cswap', 'mcswap', 'unitary', 'measure'])
+
+
+def single_qubit_matrix(name, params=()):
+    """2x2 matrix of a named single-qubit gate."""
+    if name in _FIXED:
+        return _FIXED[name]
+    return _PARAMETRIC[name](*params)
+
+
+class DenseSimulator():
+    """
+    Statevector of ``n`` qubits in a single NumPy buffer.
+    Qubit 0 is the least significant index bit, i.e. tensor axis ``n - 1``.
+    With a ``profiler`` (see ``profiling``) every gate is traced. Once its
+    ``cancel_event`` is set the next gate raises ``CancelledError``.
+    """
+
+    profiler = None
+    cancel_event = None
+
+    def __init__(self, num_qubits, precision='double'):
+        if precision not in _PRECISION:
+            raise ALComError('unknown precision "{}"'.format(precision))
+        self.num_qubits = num_qubits
+        self.dtype = _PRECISION[precision]
+        self.state = np.zeros(1 << num_qubits, dtype=self.dtype)
+        self.state[0] = 1
+        self._scratch = np.empty_like(self.state)
+        self._psi = self.state.reshape([2] * num_qubits)
+        self._tmp = self._scratch.reshape([2] * num_qubits)
+
+    def __getstate__(self):
+        # the scratch buffer and the tensor views are rebuilt on unpickling
+        return {'num_qubits': self.num_qubits, 'dtype': self.dtype, 'state': self.state}
+
+    def __setstate__(self, state):
+        self.num_qubits = state['num_qubits']
+        self.dtype = state['dtype']
+        self.state = state['state']
+        self._scratch = np.empty_like(self.state)
+        self._psi = self.state.reshape([2] * self.num_qubits)
+        self._tmp = self._scratch.reshape([2] * self.num_qubits)
+
+    def copy(self):
+        """Independent copy of the state."""
+        other = DenseSimulator.__new__(DenseSimulator)
+        other.__setstate__(dict(self.__getstate__(), state=self.state.copy()))
+        other.profiler = self.profiler
+        other.cancel_event = self.cancel_event
+        return other
+
+    @property
+    def nbytes(self):
+        """Bytes of the state and scratch buffers."""
+        return self.state.nbytes + self._scratch.nbytes
+
+    def _axis(self, qubit):
+        return self.num_qubits - 1 - qubit
+
+    def _controlled_views(self, controls):
+        """Views of state and scratch with every control axis fixed to one."""
+        index = [slice(None)] * self.num_qubits
+        for qubit in controls:
+            index[self._axis(qubit)] = 1
+        index = tuple(index)
+        return self._psi[index], self._tmp[index]
+
+    def _view_axis(self, qubit, controls):
+        axis = self._axis(qubit)
+        return axis - sum(1 for c in controls if self._axis(c) < axis)
+
+    def apply_1q(self, mat, target, controls=()):
+        """Apply a 2x2 matrix on ``target``, conditioned on ``controls``."""
+        psi, tmp = self._controlled_views(controls)
+        axis = self._view_axis(target, controls)
+        # slices instead of integers keep 1-element halves as views
+        lower = (slice(None),) * axis + (slice(0, 1),)
+        upper = (slice(None),) * axis + (slice(1, 2),)
+        a0, a1 = psi[lower], psi[upper]
+        s0, s1 = tmp[lower], tmp[upper]
+        m00, m01, m10, m11 = (complex(v) for v in np.asarray(mat).ravel())
+        if m01 == 0 and m10 == 0:
+            if m00 != 1:
+                a0 *= m00
+            if m11 != 1:
+                a1 *= m11
+        elif m00 == 0 and m11 == 0:
+            np.copyto(s0, a0)
+            np.multiply(a1, m01, out=a0)
+            np.multiply(s0, m10, out=a1)
+        else:
+            np.multiply(a1, m01, out=s0)
+            np.multiply(a0, m10, out=s1)
+            a0 *= m00
+            a0 += s0
+            a1 *= m11
+            a1 += s1
+
+    def apply_matrix(self, mat, qubits, controls=()):
+        """
+        Apply a ``2^k x 2^k`` matrix on ``qubits`` (``qubits[0]`` is the least
+        significant bit of the matrix index), conditioned on ``controls``.
+        """
+        k = len(qubits)
+        if k == 1:
+            self.apply_1q(mat, qubits[0], controls)
+            return
+        psi, tmp = self._controlled_views(controls)
+        mat = np.asarray(mat, dtype=self.dtype).reshape([2] * (2 * k))
+        letters = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        in_axes = [self._view_axis(q, controls) for q in reversed(qubits)]
+        psi_sub = list(letters[:psi.ndim])
+        out_sub = list(psi_sub)
+        row = letters[psi.ndim:psi.ndim + k]
+        for letter, axis in zip(row, in_axes):
+            out_sub[axis] = letter
+        col = ''.join(psi_sub[axis] for axis in in_axes)
+        np.einsum('{}{},{}->{}'.format(row, col, ''.join(psi_sub), ''.join(out_sub)),
+                  mat, psi, out=tmp)
+        np.copyto(psi, tmp)
+
+    def swap(self, q0, q1, controls=()):
+        """Exchange two qubits as an axis swap on the controlled view."""
+        psi, tmp = self._controlled_views(controls)
+        axis0 = self._view_axis(q0, controls)
+        axis1 = self._view_axis(q1, controls)
+        np.copyto(tmp, np.swapaxes(psi, axis0, axis1))
+        np.copyto(psi, tmp)
+
+    def multiplexer(self, mats, targets, controls):
+        """Apply ``mats[c]`` on ``targets`` when ``controls`` read ``c``."""
+        index = [slice(None)] * self.num_qubits
+        psi_full = self._psi
+        for value, mat in enumerate(mats):
+            for i, qubit in enumerate(controls):
+                index[self._axis(qubit)] = (value >> i) & 1
+            psi = psi_full[tuple(index)]
+            tmp = self._tmp[tuple(index)]
+            keep = [q for q in range(self.num_qubits) if q not in controls]
+            sub = _SubState(psi, tmp, keep, self.dtype)
+            sub.apply_matrix(mat, targets)
+
+    def initialize(self, vector, qubits, rng):
+        """Reset ``qubits`` and prepare them in ``vector``."""
+        for qubit in qubits:
+            self.reset(qubit, rng)
+        # every qubit now reads zero, so the state is ``rest x |0..0>``
+        index = [slice(None)] * self.num_qubits
+        for qubit in qubits:
+            index[self._axis(qubit)] = 0
+        rest = self._psi[tuple(index)].copy()
+        for value, amplitude in enumerate(np.asarray(vector, dtype=self.dtype)):
+            for i, qubit in enumerate(qubits):
+                index[self._axis(qubit)] = (value >> i) & 1
+            self._psi[tuple(index)] = amplitude * rest
+
+    def probability(self, qubit):
+        """Probability of reading one on ``qubit``."""
+        head = (slice(None),) * self._axis(qubit)
+        ones = self._psi[head + (1,)]
+        return float(np.vdot(ones, ones).real)
+
+    def collapse(self, qubit, outcome, p_one=None):
+        """Project ``qubit`` on ``outcome`` and renormalize, ``p_one`` saves a pass."""
+        head = (slice(None),) * self._axis(qubit)
+        prob = self.probability(qubit) if p_one is None else p_one
+        prob = prob if outcome else 1 - prob
+        self._psi[head + (1 - outcome,)] = 0
+        self.state *= 1 / math.sqrt(prob)
+
+    def reset(self, qubit, rng):
+        """Measure ``qubit`` and flip it back to zero."""
+        outcome = int(rng.random() < self.probability(qubit))
+        self.collapse(qubit, outcome)
+        if outcome:
+            self.apply_1q(_FIXED['x'], qubit)
+
+    def kraus(self, mats, qubits, rng):
+        """Apply one Kraus operator drawn with its Born probability."""
+        backup = self.state.copy()
+        draw = rng.random()
+        total = 0.0
+        for mat in mats:
+            np.copyto(self.state, backup)
+            self.apply_matrix(mat, qubits)
+            prob = float(np.vdot(self.state, self.state).real)
+            total += prob
+            if draw < total:
+                self.state *= 1 / math.sqrt(prob)
+                return
+        # rounding left the draw outside the sum, keep the last operator
+        self.state *= 1 / math.sqrt(prob)
+
+    def kraus_probabilities(self, mats, qubits):
+        """Born probability of every Kraus operator on the current state."""
+        backup = self.state.copy()
+        norms = []
+        for mat in mats:
+            self.apply_matrix(mat, qubits)
+            norms.append(float(np.vdot(self.state, self.state).real))
+            np.copyto(self.state, backup)
+        return np.array(norms)
+
+    def apply_kraus(self, mat, qubits, prob):
+        """Apply one Kraus operator and renormalize by its probability."""
+        self.apply_matrix(mat, qubits)
+        self.state *= 1 / math.sqrt(prob)
+
+    def apply(self, name, qubits, params=(), rng=None):
+        """Apply the named gate of the backend basis."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise futures.CancelledError()
+        if self.profiler is None:
+            self._apply(name, qubits, params, rng)
+            return
+        with self.profiler.span(name, 'gate', qubits=list(qubits)):
+            self._apply(name, qubits, params, rng)
+
+    def _apply(self, name, qubits, params, rng):
+        if name in _FIXED or name in _PARAMETRIC:
+            self.apply_1q(single_qubit_matrix(name, params), qubits[0])
+        elif name in _CONTROLLED:
+            self.apply_1q(single_qubit_matrix(_CONTROLLED[name], params),
+                          qubits[-1], qubits[:-1])
+        elif name in ('swap', 'cswap', 'mcswap'):
+            self.swap(qubits[-2], qubits[-1], qubits[:-2])
+        elif name == 'unitary':
+            self.apply_matrix(params[0], qubits)
+        elif name == 'multiplexer':
+            num_targets = int(math.log2(len(params[0])))
+            self.multiplexer(params, qubits[:num_targets], qubits[num_targets:])
+        elif name == 'initialize':
+            self.initialize(params, qubits, rng or np.random.default_rng())
+        elif name == 'kraus':
+            self.kraus(params, qubits, rng or np.random.default_rng())
+        else:
+            raise ALComError('gate "{}" is not supported by the dense engine'.format(name))
+
+    def sample_memory(self, shots, rng, qubit_clbits, num_clbits):
+        """Draw all shots in one batch, see ``BDDSimulator.sample_memory``."""
+        probs = self.state.real ** 2 + self.state.imag ** 2
+        return memory_from_indices(sample_indices(probs, shots, rng), qubit_clbits, num_clbits)
+
+    def pauli_expectations(self, masks, chunk=1 << 20):
+        """
+        ``<psi| X^x Z^z |psi>`` for every ``(x, z)`` bit-mask pair: a parity
+        sum over the index range, in chunks, sharing the bra permutation
+        between the terms with the same ``x``.
+        """
+        state = self.state
+        by_x = {}
+        for i, (x_mask, z_mask) in enumerate(masks):
+            by_x.setdefault(x_mask, []).append((i, z_mask))
+        values = np.zeros(len(masks), dtype=complex)
+        for start in range(0, len(state), chunk):
+            index = np.arange(start, min(start + chunk, len(state)), dtype=np.int64)
+            ket = state[start:start + len(index)]
+            for x_mask, terms in by_x.items():
+                bra = state[index ^ x_mask] if x_mask else ket
+                products = np.conj(bra) * ket
+                for i, z_mask in terms:
+                    if z_mask:
+                        signs = 1 - 2 * parity(index & z_mask)
+                        values[i] += np.dot(products, signs)
+                    else:
+                        values[i] += products.sum()
+        return values
+
+    def sparse_statevector(self, threshold=0.0):
+        """Indices and amplitudes of the entries larger than ``threshold`` in magnitude."""
+        probs = self.state.real ** 2 + self.state.imag ** 2
+        indices = np.flatnonzero(probs > threshold * threshold)
+        return indices.astype(memory_dtype(self.num_qubits)), self.state[indices]
+
+    def statevector(self):
+        """The state buffer itself."""
+        return self.state
+
+
+class _SubState(DenseSimulator):
+    """Dense view on a slice of a larger state, used by ``multiplexer``."""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, psi, tmp, qubits, dtype):
+        self.num_qubits = len(qubits)
+        self.dtype = dtype
+        self._psi = psi
+        self._tmp = tmp
+        self._index = {q: i for i, q in enumerate(qubits)}
+
+    def _axis(self, qubit):
+        return self.num_qubits - 1 - self._index[qubit]
+
+
+class BatchedDenseSimulator(DenseSimulator):
+    """
+    ``batch`` statevectors of ``n`` qubits in one ``(batch, 2^n)`` buffer.
+    Tensor axis 0 is the batch, gate parameters may be arrays with one value
+    per state, so a parameter sweep is one vectorized pass per gate.
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, batch, num_qubits, precision='double'):
+        if precision not in _PRECISION:
+            raise ALComError('unknown precision "{}"'.format(precision))
+        self.num_qubits = num_qubits
+        self.batch = batch
+        self.dtype = _PRECISION[precision]
+        self.state = np.zeros((batch, 1 << num_qubits), dtype=self.dtype)
+        self.state[:, 0] = 1
+        self._scratch = np.empty_like(self.state)
+        self._psi = self.state.reshape([batch] + [2] * num_qubits)
+        self._tmp = self._scratch.reshape([batch] + [2] * num_qubits)
+
+    def _axis(self, qubit):
+        return self.num_qubits - qubit
+
+    def _controlled_views(self, controls):
+        index = [slice(None)] * (self.num_qubits + 1)
+        for qubit in controls:
+            index[self._axis(qubit)] = 1
+        index = tuple(index)
+        return self._psi[index], self._tmp[index]
+
+    def apply_1q(self, mat, target, controls=()):
+        """Apply a 2x2 matrix, or a ``(batch, 2, 2)`` stack with one per state."""
+        mat = np.asarray(mat)
+        if mat.ndim == 2:
+            super().apply_1q(mat, target, controls)
+            return
+        psi, tmp = self._controlled_views(controls)
+        axis = self._view_axis(target, controls)
+        lower = (slice(None),) * axis + (slice(0, 1),)
+        upper = (slice(None),) * axis + (slice(1, 2),)
+        a0, a1 = psi[lower], psi[upper]
+        s0 = tmp[lower]
+        shape = (self.batch,) + (1,) * (psi.ndim - 1)
+        m00, m01, m10, m11 = (mat[:, i, j].reshape(shape) for i in (0, 1) for j in (0, 1))
+        np.multiply(a0, m00, out=s0, casting='same_kind')
+        s0 += a1 * m01
+        a1 *= m11
+        a1 += a0 * m10
+        np.copyto(a0, s0)
+
+    def apply(self, name, qubits, params=(), rng=None):
+        """Apply a gate, array parameters carry one value per state."""
+        if name not in BATCH_GATES or name == 'measure':
+            raise ALComError('gate "{}" is not supported by the batched engine'.format(name))
+        if name == 'unitary' or not any(isinstance(p, np.ndarray) for p in params):
+            super().apply(name, qubits, params)
+            return
+        base = _CONTROLLED.get(name, name)
+        if base not in _PARAMETRIC_BATCH:
+            raise ALComError('gate "{}" cannot take per-state parameters'.format(name))
+        mats = _PARAMETRIC_BATCH[base](*params)
+        controls = qubits[:-1] if name in _CONTROLLED else ()
+        self.apply_1q(mats, qubits[-1], controls)
+
+    def views(self):
+        """One read-only engine view per state, sharing the batch buffer."""
+        return [_StateView(row, self.num_qubits) for row in self.state]
+
+
+class _StateView(DenseSimulator):
+    """Read out access to one state of a batch, see ``sampling.read_out``."""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, state, num_qubits):
+        self.num_qubits = num_qubits
+        self.dtype = state.dtype
+        self.state = state
+
+
+def dense_batch_controller(circuit, slots, values, use_statevector, shots, seed=None,
+                           memory=False, sparse_threshold=None, observables=None,
+                           precision='double', max_batch_bytes=1 << 28):
+    """
+    Simulate one circuit for many parameter bindings, vectorized over the
+    bindings: chunks of states fitting ``max_batch_bytes`` are evolved together
+    and every parameterized gate is applied with one matrix per state.
+    Circuits with gates the batch cannot run are simulated binding by binding.
+    Args:
+        circuit (CircuitIR): circuit with placeholder parameters.
+        slots (ndarray): positions in ``circuit.params`` of the parameters.
+        values (ndarray): one row of slot values per binding.
+        seed (int): seed of binding 0, binding ``i`` uses ``seed + i``.
+        use_statevector, shots, memory, sparse_threshold, observables,
+        precision: see ``dense_controller``.
+    Returns:
+        list: one output dict per binding.
+    """
+    slots = np.asarray(slots, dtype=np.int64)
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    seeds = [None if seed is None else seed + i for i in range(len(values))]
+    ops = list(circuit.ops())
+    if circuit.is_dynamic or any(name not in BATCH_GATES for name, _, _, _ in ops):
+        outputs = []
+        for row, row_seed in zip(values, seeds):
+            params = circuit.params.copy()
+            params[slots] = row
+            outputs.append(dense_controller(circuit.with_params(params), use_statevector, shots,
+                                            row_seed, memory, sparse_threshold,
+                                            observables=observables, precision=precision))
+        return outputs
+    # op index -> [(parameter position, column of ``values``)]
+    owners = np.searchsorted(circuit.param_offsets, slots, side='right') - 1
+    op_slots = {}
+    for column, (owner, slot) in enumerate(zip(owners.tolist(), slots.tolist())):
+        op_slots.setdefault(owner, []).append((slot - int(circuit.param_offsets[owner]), column))
+    state_bytes = 2 * (1 << circuit.num_qubits) * np.dtype(_PRECISION[precision]).itemsize
+    chunk = max(1, max_batch_bytes // state_bytes)
+    outputs = []
+    for start in range(0, len(values), chunk):
+        rows = values[start:start + chunk]
+        sim = BatchedDenseSimulator(len(rows), circuit.num_qubits, precision)
+        measured = set()
+        for i, (name, qubits, params, _) in enumerate(ops):
+            if name == 'measure':
+                measured.add(qubits[0])
+                continue
+            if measured and measured.intersection(qubits):
+                raise ALComError('the dense engine only supports terminal measurements')
+            if i in op_slots:
+                params = list(params)
+                for position, column in op_slots[i]:
+                    params[position] = rows[:, column]
+            sim.apply(name, qubits, params)
+        for view, row_seed in zip(sim.views(), seeds[start:start + chunk]):
+            shot_seed = np.random.SeedSequence(row_seed).spawn(2)[1]
+            outputs.append(read_out(view, circuit, use_statevector, shots,
+                                    np.random.default_rng(shot_seed), memory, sparse_threshold,
+                                    observables))
+    return outputs
+
+
+def dense_controller(circuit, use_statevector, shots, seed=None, memory=False,
+                     sparse_threshold=None, state=None, keep_state=False, observables=None,
+                     precision='double', profiler=None, cancel_event=None):
+    """
+    Simulate a circuit with the dense statevector engine.
+    Same contract as ``bdd_engine.bdd_controller``.
+    Args:
+        circuit (CircuitIR or str): circuit IR, OpenQASM 2.0 text for debugging.
+        use_statevector (bool): also return the final statevector.
+        shots (int): number of shots to sample.
+        seed (int): seed of the shot sampling and of stochastic instructions.
+        memory (bool): also return the per-shot memory values.
+        sparse_threshold (float): return only the amplitudes above this magnitude.
+        state (DenseSimulator): final state of an earlier run with the same seed.
+        keep_state (bool): return the final state as ``state``.
+        observables (list): Pauli labels, return their expectation values.
+        precision (str): ``'double'`` (complex128) or ``'single'`` (complex64).
+        profiler (Profiler): traces every gate and the read out.
+        cancel_event (threading.Event): checked before every gate.
+    Returns:
+        dict: ``counts`` (and ``statevector``, ``memory`` as ndarrays).
+    """
+    if isinstance(circuit, str):
+        circuit = CircuitIR.from_qasm(circuit)
+    # independent streams, so a kept state samples like a fresh run
+    op_seed, shot_seed = np.random.SeedSequence(seed).spawn(2)
+    if state is None and circuit.is_dynamic:
+        sim = DenseSimulator(circuit.num_qubits, precision)
+        sim.profiler = profiler
+        sim.cancel_event = cancel_event
+        output = branch_read_out(sim, circuit, use_statevector, shots,
+                                 np.random.default_rng(shot_seed), memory, sparse_threshold,
+                                 observables, np.random.default_rng(op_seed))
+        if keep_state:
+            output['state'] = None
+        return output
+    sim = state if state is not None else _simulate(circuit, np.random.default_rng(op_seed),
+                                                    precision, profiler, cancel_event)
+    with (profiler or NULL_PROFILER).span('read_out'):
+        output = read_out(sim, circuit, use_statevector, shots, np.random.default_rng(shot_seed),
+                          memory, sparse_threshold, observables,
+                          copy=keep_state or state is not None)
+    if keep_state:
+        output['state'] = sim
+    return output
+
+
+def _simulate(circuit, rng, precision, profiler=None, cancel_event=None):
+    """Final state of ``circuit``, measurements must be terminal."""
+    sim = DenseSimulator(circuit.num_qubits, precision)
+    sim.profiler = profiler
+    sim.cancel_event = cancel_event
+    measured = set()
+    for name, qubits, params, _ in circuit.ops():
+        if name == 'measure':
+            measured.add(qubits[0])
+            continue
+        if measured and measured.intersection(qubits):
+            raise ALComError('the dense engine only supports terminal measurements')
+        sim.apply(name, qubits, params, rng)
+    return sim
@@ -0,0 +1,140 @@
+"""
+Per-circuit engine choice of the ``"automatic"`` engine.
+The dense engine needs two ``2^n`` complex buffers and its cost does not
+depend on what the gates do; the BDD engine is exact only for Clifford+T
+angles and its size depends on the entanglement the circuit builds. The
+static features (entangling gates, non-Clifford gates) only hint at that,
+so the circuits in between get a short probe run on the BDD engine with a
+node cap.
+"""
+
+import os
+import logging
+
+import numpy as np
+from qiskit.util import local_hardware_info
+
+from .alcom_error import ALComError, ALComResourceError
+from .bdd_engine import BDDManager, BDDSimulator, interaction_order
+from .circuit_opt import _is_eighth
+
+logger = logging.getLogger(__name__)
+
+# below this width a dense state is always cheap
+SMALL_QUBITS = 14
+# operations and node cap of the BDD probe run
+PROBE_GATES = 256
+PROBE_NODES = 1 << 16
+# dense amplitudes updated in the time of one BDD node visit
+NODE_COST = 1 << 12
+_ITEMSIZE = {'double': 16, 'single': 8}
+# instructions that do not constrain the engine choice
+_CLASSICAL = ('measure', 'reset', 'bfunc', 'roerror')
+_CLIFFORD = ('id', 'x', 'y', 'z', 'h', 's', 'sdg', 'cx', 'cz', 'swap')
+
+
+def available_memory():
+    """Bytes of physical memory of this machine."""
+    gib = local_hardware_info().get('memory')
+    if gib:
+        return int(gib * (1 << 30))
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+
+def _gates(circuit):
+    """Quantum gates of ``circuit``, the error circuits of noise mixtures included."""
+    for name, qubits, params, _ in circuit.ops():
+        if name == 'mixture':
+            for error_circuit in params[1]:
+                yield from error_circuit
+        elif name not in _CLASSICAL:
+            yield name, qubits, params
+
+
+def circuit_features(circuit):
+    """
+    Static features of the cost model.
+    Returns:
+        dict: ``num_qubits``, ``gates``, ``entangling_gates``,
+        ``non_clifford_gates`` and ``bdd_exact`` (every gate and angle is
+        representable by the BDD engine).
+    """
+    gates = entangling = non_clifford = 0
+    exact = True
+    for name, qubits, params in _gates(circuit):
+        gates += 1
+        if len(qubits) > 1:
+            entangling += 1
+        if not hasattr(BDDSimulator, '_gate_' + name) or \
+                not all(_is_eighth(angle) for angle in params):
+            exact = False
+        # odd multiples of pi/4 and multi-controlled gates leave the Clifford group
+        if name not in _CLIFFORD and not (name in ('u1', 'cu1', 'u2', 'u3') and all(
+                round(angle / (np.pi / 2)) * (np.pi / 2) == angle for angle in params)):
+            non_clifford += 1
+    return {'num_qubits': circuit.num_qubits, 'gates': gates, 'entangling_gates': entangling,
+            'non_clifford_gates': non_clifford, 'bdd_exact': exact}
+
+
+def probe_bdd(circuit, max_gates=PROBE_GATES, max_nodes=PROBE_NODES):
+    """
+    Run the first ``max_gates`` gates on the BDD engine.
+    Returns:
+        int or None: peak node count, None once it passed ``max_nodes``.
+    """
+    sim = BDDSimulator(circuit.num_qubits,
+                       BDDManager(max_nodes=max_nodes, order=interaction_order(circuit)))
+    try:
+        for count, (name, qubits, params) in enumerate(_gates(circuit)):
+            if count >= max_gates:
+                break
+            sim.apply(name, qubits, params)
+    except ALComResourceError:
+        return None
+    return sim.mgr.stats()['peak_nodes']
+
+
+def choose_engine(circuit, precision='double', max_memory=None, probe_gates=PROBE_GATES,
+                  probe_nodes=PROBE_NODES):
+    """
+    Pick ``'bdd'`` or ``'dense'`` for ``circuit``.
+    Args:
+        circuit (CircuitIR): the circuit to run.
+        precision (str): precision of the dense engine.
+        max_memory (int): bytes a dense state may use, the physical memory
+                          by default.
+        probe_gates, probe_nodes: length and node cap of the BDD probe.
+    Returns:
+        tuple: the engine and the decision record (the features, the dense
+        state size, the probe peak and the reason).
+    Raises:
+        ALComError: if the BDD engine cannot represent the circuit and the
+                    dense state does not fit in memory.
+    """
+    if max_memory is None:
+        max_memory = available_memory()
+    record = circuit_features(circuit)
+    n = circuit.num_qubits
+    # the state and the scratch buffer of the same size
+    dense_bytes = 2 * _ITEMSIZE.get(precision, 16) << n
+    record.update(dense_bytes=dense_bytes, max_memory=max_memory)
+    fits = dense_bytes <= max_memory
+    if not record['bdd_exact']:
+        if not fits:
+            raise ALComError('the circuit has gates the BDD engine cannot represent and the '
+                             'dense state of {} bytes does not fit in {} bytes'.format(
+                                 dense_bytes, max_memory))
+        return 'dense', dict(record, reason='gates or angles outside Clifford+T')
+    if not fits:
+        return 'bdd', dict(record, reason='dense state does not fit in memory')
+    if n <= SMALL_QUBITS:
+        return 'dense', dict(record, reason='small circuit')
+    if not record['non_clifford_gates']:
+        return 'bdd', dict(record, reason='Clifford circuit')
+    # past this size a BDD gate costs more than a dense one
+    cap = min(probe_nodes, (1 << n) // NODE_COST)
+    peak = probe_bdd(circuit, probe_gates, cap)
+    record['probe_nodes'] = peak
+    if peak is None:
+        return 'dense', dict(record, reason='BDD probe passed {} nodes'.format(cap))
+    return 'bdd', dict(record, reason='BDD probe stayed at {} nodes'.format(peak))
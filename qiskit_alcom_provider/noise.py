@@ -0,0 +1,199 @@
+"""
+Noise models run as stochastic trajectories.
+An Aer ``NoiseModel`` (or its ``to_dict()``) is turned into operations put
+into the ``CircuitIR`` next to the instructions they act on:
+
+* ``mixture``: a channel of unitary error circuits (Pauli, depolarizing,
+  bit and phase flips) with fixed probabilities;
+* ``kraus``: a general channel such as amplitude damping, drawn with the
+  Born probability of each operator (dense engine only, the BDD engine has
+  no non-unitary matrices); a mixture whose error circuits hold ``kraus``
+  or ``reset`` instructions (thermal relaxation) is folded into one;
+* ``roerror``: a readout assignment matrix on a measured bit.
+
+The branch executor (``branching``) splits the shots sitting on a state
+over the outcomes of each channel with one multinomial draw, so the shots
+that draw the same error pattern are simulated once.
+"""
+
+import logging
+
+import numpy as np
+
+from .alcom_error import ALComError
+from .circuit_ir import CircuitIR
+from .dense_engine import single_qubit_matrix
+
+logger = logging.getLogger(__name__)
+
+_PAULI_GATES = ('id', 'x', 'y', 'z')
+
+# Kraus operators of a reset to zero: |0><0| and |0><1|
+_RESET_KRAUS = (np.array([[1, 0], [0, 0]], dtype=complex),
+                np.array([[0, 1], [0, 0]], dtype=complex))
+
+
+def _matrix(value):
+    """Complex matrix of a noise parameter, ``[real, imag]`` pairs included."""
+    mat = np.asarray(value)
+    if mat.dtype != complex and mat.ndim == 3 and mat.shape[-1] == 2:
+        mat = mat[..., 0] + 1j * mat[..., 1]
+    return np.asarray(mat, dtype=complex)
+
+
+def _error_circuit(instructions):
+    """Gates ``(name, qubits, params)`` of one error circuit, on error-local qubits."""
+    gates = []
+    for inst in instructions:
+        name = inst['name']
+        qubits = list(inst['qubits'])
+        if name == 'pauli':
+            # label rightmost character on the first qubit
+            for qubit, char in zip(qubits, reversed(inst['params'][0])):
+                if char.upper() != 'I':
+                    gates.append((char.lower(), [qubit], []))
+        elif name in _PAULI_GATES:
+            if name != 'id':
+                gates.append((name, qubits, []))
+        elif name == 'unitary':
+            gates.append(('unitary', qubits, [_matrix(inst['params'][0])]))
+        else:
+            raise ALComError('noise instruction "{}" is not supported, only Pauli, unitary, '
+                             'Kraus, reset and readout errors are'.format(name))
+    return tuple(gates)
+
+
+def _embed(mat, qubits, num_qubits):
+    """``mat`` on ``qubits`` (``qubits[0]`` least significant) as a matrix on ``num_qubits``."""
+    k = len(qubits)
+    # tensor axis of qubit q is num_qubits - 1 - q, the gate rows and columns list qubits[k - 1] first
+    axes = [num_qubits - 1 - q for q in reversed(qubits)]
+    identity = np.eye(1 << num_qubits, dtype=complex).reshape([2] * num_qubits + [-1])
+    full = np.tensordot(mat.reshape([2] * (2 * k)), identity, axes=(list(range(k, 2 * k)), axes))
+    return np.moveaxis(full, list(range(k)), axes).reshape(1 << num_qubits, 1 << num_qubits)
+
+
+def _instruction_kraus(inst):
+    """``(mats, qubits)`` of the Kraus operators of one error instruction."""
+    if inst['name'] == 'kraus':
+        yield [_matrix(m) for m in inst['params']], list(inst['qubits'])
+    elif inst['name'] == 'reset':
+        for qubit in inst['qubits']:
+            yield _RESET_KRAUS, [qubit]
+    else:
+        for name, qubits, params in _error_circuit([inst]):
+            yield [params[0] if name == 'unitary' else single_qubit_matrix(name)], qubits
+
+
+def _circuit_kraus(instructions, num_qubits):
+    """Kraus operators of an error circuit, every product of its instructions' operators."""
+    ops = [np.eye(1 << num_qubits, dtype=complex)]
+    for inst in instructions:
+        for mats, qubits in _instruction_kraus(inst):
+            mats = [_embed(np.asarray(mat, dtype=complex), qubits, num_qubits) for mat in mats]
+            ops = [mat @ op for op in ops for mat in mats]
+    return ops
+
+
+def _channel(error):
+    """``('kraus', qubits, mats)`` or ``('mixture', probabilities, circuits)`` of a qerror."""
+    circuits = error['instructions']
+    if len(circuits) == 1 and len(circuits[0]) == 1 and circuits[0][0]['name'] == 'kraus':
+        inst = circuits[0][0]
+        return 'kraus', list(inst['qubits']), [_matrix(m) for m in inst['params']]
+    probabilities = np.asarray(error['probabilities'], dtype=float)
+    probabilities = probabilities / probabilities.sum()
+    if any(inst['name'] in ('kraus', 'reset') for circuit in circuits for inst in circuit):
+        # e.g. thermal relaxation: identity, Z and reset branches, their
+        # operators scaled by the square root of the branch probability
+        num_qubits = 1 + max(q for circuit in circuits for inst in circuit for q in inst['qubits'])
+        mats = [np.sqrt(p) * op for p, circuit in zip(probabilities, circuits) if p > 0
+                for op in _circuit_kraus(circuit, num_qubits) if np.any(op)]
+        return 'kraus', list(range(num_qubits)), mats
+    return 'mixture', probabilities, [_error_circuit(c) for c in circuits]
+
+
+class TrajectoryNoise():
+    """
+    Quantum and readout errors of a noise model, keyed by instruction name
+    and qubits (``None`` for the errors on every qubit).
+    """
+
+    def __init__(self, errors=None, readout=None):
+        self._errors = errors or {}
+        self._readout = readout or {}
+
+    def __bool__(self):
+        return bool(self._errors or self._readout)
+
+    @classmethod
+    def from_noise_model(cls, noise_model):
+        """
+        Read an Aer ``NoiseModel`` or the dict of its ``to_dict()``.
+        Raises:
+            ALComError: for non-local errors and channels other than Pauli,
+                        unitary, Kraus, reset and single-qubit readout errors.
+        """
+        data = noise_model if isinstance(noise_model, dict) else noise_model.to_dict()
+        errors = {}
+        readout = {}
+        for error in data.get('errors', []):
+            if error.get('noise_qubits'):
+                raise ALComError('non-local noise errors are not supported')
+            gate_qubits = [tuple(qubits) for qubits in error.get('gate_qubits', [])] or [None]
+            if error['type'] == 'roerror':
+                assignment = np.asarray(error['probabilities'], dtype=float)
+                if assignment.shape != (2, 2):
+                    raise ALComError('only single-qubit readout errors are supported')
+                for qubits in gate_qubits:
+                    readout[qubits] = assignment
+                continue
+            if error['type'] != 'qerror':
+                raise ALComError('noise error type "{}" is not supported'.format(error['type']))
+            channel = _channel(error)
+            for name in error['operations']:
+                for qubits in gate_qubits:
+                    errors.setdefault((name, qubits), []).append(channel)
+        return cls(errors, readout)
+
+    @staticmethod
+    def _lookup(table, local, default):
+        # local errors replace the errors on every qubit, as in Aer
+        found = table.get(local)
+        return table.get(default) if found is None else found
+
+    def _channel_ops(self, name, qubits, condition):
+        ops = []
+        channels = self._lookup(self._errors, (name, tuple(qubits)), (name, None))
+        for kind, params, body in channels or ():
+            if kind == 'kraus':
+                ops.append(('kraus', [qubits[q] for q in params], body, -1, condition))
+                continue
+            circuits = tuple(tuple((gate, [qubits[q] for q in gate_qubits], gate_params)
+                                   for gate, gate_qubits, gate_params in circuit)
+                             for circuit in body)
+            ops.append(('mixture', list(qubits), (params, circuits), -1, condition))
+        return ops
+
+    def apply(self, circuit):
+        """
+        The circuit with the channels after every noisy gate (before a noisy
+        measurement) and a ``roerror`` after every measurement with readout error.
+        """
+        if not self:
+            return circuit
+        ops = []
+        for index, (name, qubits, params, clbit) in enumerate(circuit.ops()):
+            condition = circuit.conditions.get(index)
+            channels = self._channel_ops(name, qubits, condition)
+            if name == 'measure':
+                ops.extend(channels)
+                ops.append((name, qubits, params, clbit, condition))
+                assignment = self._lookup(self._readout, tuple(qubits), None)
+                if assignment is not None:
+                    ops.append(('roerror', qubits, (assignment, [clbit]), clbit, condition))
+                continue
+            ops.append((name, qubits, params, clbit, condition))
+            ops.extend(channels)
+        return CircuitIR.from_ops(circuit.num_qubits, circuit.creg_sizes, ops,
+                                  circuit.name, circuit.global_phase)
@@ -0,0 +1,156 @@
+"""
+Phase and gate timings of a job.
+A ``Profiler`` keeps Chrome trace events (``chrome://tracing``, Perfetto)
+in a ring buffer: complete events (``"ph": "X"``) for the job phases, the
+experiments and, optionally, every gate, and counter events (``"ph": "C"``)
+for the engine counters. Timestamps are wall-clock microseconds, so the
+events of worker processes line up with the ones of the job.
+Profiling is off unless ``backend_options["profile"]`` or the
+``ALCOM_PROFILE`` environment variable asks for it; the backend then uses
+``NULL_PROFILER``, whose spans are one shared no-op context manager.
+"""
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# environment variable read when the backend options do not say
+PROFILE_ENV = 'ALCOM_PROFILE'
+# events kept by default, older ones are dropped first
+MAX_EVENTS = 1 << 16
+
+
+class Profiler():
+    """
+    Ring buffer of trace events.
+    Args:
+        max_events (int): events kept, the oldest go first.
+        gates (bool): the engines also trace every gate.
+    """
+
+    enabled = True
+
+    def __init__(self, max_events=MAX_EVENTS, gates=False):
+        self.max_events = max_events
+        self.gates = gates
+        self._events = collections.deque(maxlen=max_events)
+        self._pid = os.getpid()
+        # wall-clock time of perf_counter() == 0, in microseconds
+        self._origin = (time.time() - time.perf_counter()) * 1e6
+
+    def __getstate__(self):
+        # a copy in a worker process records its own pid
+        state = self.__dict__.copy()
+        state['_pid'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self._events)
+
+    @property
+    def events(self):
+        """The events in the buffer, oldest first."""
+        return list(self._events)
+
+    @contextlib.contextmanager
+    def span(self, name, cat='phase', **args):
+        """Record the time spent in the ``with`` block as one complete event."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.perf_counter(), cat, **args)
+
+    def complete(self, name, start, end, cat='phase', **args):
+        """Record a complete event between two ``time.perf_counter()`` values."""
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': self._origin + start * 1e6,
+                 'dur': (end - start) * 1e6, 'pid': self._pid, 'tid': threading.get_ident()}
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def counter(self, name, **values):
+        """Record the current values of a group of counters."""
+        self._events.append({'name': name, 'ph': 'C',
+                             'ts': self._origin + time.perf_counter() * 1e6,
+                             'pid': self._pid, 'args': values})
+
+    def extend(self, events):
+        """Add the events of another profiler, e.g. of a worker process."""
+        self._events.extend(events)
+
+    def clear(self):
+        """Drop every event."""
+        self._events.clear()
+
+    def summary(self):
+        """
+        Totals of the complete events.
+        Returns:
+            dict: ``{name: {"count": int, "seconds": float}}``, the slowest first.
+        """
+        totals = {}
+        for event in self._events:
+            if event['ph'] == 'X':
+                total = totals.setdefault(event['name'], {'count': 0, 'seconds': 0.0})
+                total['count'] += 1
+                total['seconds'] += event['dur'] * 1e-6
+        return dict(sorted(totals.items(), key=lambda item: -item[1]['seconds']))
+
+    def to_dict(self):
+        """The events in the Chrome trace-event JSON object format."""
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path):
+        """Write the trace to ``path``, open it in ``chrome://tracing`` or Perfetto."""
+        with open(path, 'w') as handle:
+            json.dump(self.to_dict(), handle)
+
+
+class _NullProfiler():
+    """Stands in for a ``Profiler`` when profiling is off, records nothing."""
+
+    enabled = False
+    gates = False
+    _span = contextlib.nullcontext()
+
+    def span(self, name, cat='phase', **args):
+        return self._span
+
+    def complete(self, name, start, end, cat='phase', **args):
+        pass
+
+    def counter(self, name, **values):
+        pass
+
+    def extend(self, events):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def get_profiler(backend_options):
+    """
+    Profiler of a job from ``backend_options["profile"]``, else from the
+    ``ALCOM_PROFILE`` environment variable: ``True``/``"phases"`` (``1``)
+    traces the phases and experiments, ``"gates"`` also every gate.
+    ``"profile_max_events"`` sizes the ring buffer.
+    Returns:
+        Profiler: a new profiler, ``NULL_PROFILER`` when profiling is off.
+    """
+    mode = backend_options.get('profile')
+    if mode is None:
+        mode = os.environ.get(PROFILE_ENV, '')
+        if mode.lower() in ('', '0', 'false', 'off'):
+            return NULL_PROFILER
+    elif not mode:
+        return NULL_PROFILER
+    return Profiler(backend_options.get('profile_max_events', MAX_EVENTS), mode == 'gates')
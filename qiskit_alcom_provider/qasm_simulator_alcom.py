@@ -17,71 +17,42 @@ Should specify supported gates, device couple_map, etc.
 
 import logging
 from math import log2
-import json
+import threading
 
-from qiskit.util import local_hardware_info
 from qiskit.providers.models import QasmBackendConfiguration
 
+from .alcom_error import ALComError
 from .bdd_backend import BDDBackend
-# import proposed model here
-# from .qcsim_alcom import get_statevector, get_counts
+from .bdd_engine import bdd_controller, bdd_batch_controller
+from .dense_engine import dense_controller, dense_batch_controller
+from .engine_select import available_memory
 from .version import __version__
 
 logger = logging.getLogger(__name__)
 
-"""
-# for testing without qcsim_alcom
-def get_statevector(qasm_str):
-    # use a simulation result of 1024 shots on measurement of Bell states as an example for testing
-    return '[0.5,0,0, 0.5]'
-
-def get_counts(qasm_str):
-    # use a simulation result of 1024 shots on measurement of Bell states as an example for testing
-    return '{"00": 512, "01": 0, "10": 0, "11": 512}'
-
-bdd_controller = {
-    "state": get_statevector,
-    "count": get_counts,
-}
-"""
-
-bell_result = {
-    #'results': [],
-    'counts': {
-        '00': 512, 
-        '11': 512,
-    },
-    'statevector':[
-        [0.70710678118, 0, 0, 0.70710678118],
-        [0, 0, 0, 0],
-    ]
-}
-
-# api_result = str([bell_result["counts"], bell_result["statevector"]])
-# api_result = json.dumps(bell_result)
 
+class _MaxQubitMemory():
+    """Class attribute measuring the free memory on first access only."""
 
-def bdd_controller(qasm_str, use_statevector, shots):
-    # return a bell state expetiment results with 1024 shots for testing API
-    from numpy import random
-    noise = int(random.normal(loc=0, scale=10))
-    # print(shots, noise , shots//2)
-    bell_result["counts"]["00"] = shots//2 + noise
-    bell_result["counts"]["11"] = shots - bell_result["counts"]["00"] 
-    api_result = json.dumps(bell_result)
-    return api_result
+    def __get__(self, instance, owner):
+        value = int(log2(available_memory() / 32))
+        setattr(owner, 'MAX_QUBIT_MEMORY', value)
+        return value
 
 
 class QasmSimulator(BDDBackend):
     """ 
     Run option here?
     """
-    # MAX_QUBIT_MEMORY = int(log2(local_hardware_info()['memory'] * (1024**3) / 16))
-    MAX_QUBIT_MEMORY = 30
+    # widest dense state (and its scratch buffer) in memory, the engine itself
+    # is picked per circuit by the "automatic" engine
+    MAX_QUBIT_MEMORY = _MaxQubitMemory()
+    # the BDD engine is not bounded by dense memory
+    MAX_QUBIT_BDD = 128
     DEFAULT_CONFIGURATION = {
         'backend_name': 'qasm_simulator',
         'backend_version': __version__,
-        'n_qubits': MAX_QUBIT_MEMORY,
+        'n_qubits': MAX_QUBIT_BDD,
         'url': 'TODO',
         'simulator': True,
         'local': True,
@@ -301,31 +272,67 @@ class QasmSimulator(BDDBackend):
             'qasm_def': 'TODO'
         }]
     }
-    def __init__(self, configuration=None, provider=None):
+    # QasmBackendConfiguration of DEFAULT_CONFIGURATION, parsed once per process
+    _default_configuration = None
+    _configuration_lock = threading.Lock()
+
+    @classmethod
+    def default_configuration(cls):
+        """The configuration built from ``DEFAULT_CONFIGURATION``, shared by the instances."""
+        if cls._default_configuration is None:
+            with cls._configuration_lock:
+                if cls._default_configuration is None:
+                    cls._default_configuration = QasmBackendConfiguration.from_dict(
+                        cls.DEFAULT_CONFIGURATION)
+        return cls._default_configuration
+
+    def __init__(self, configuration=None, provider=None, executor=None, result_cache=None):
         super().__init__(
             controller=bdd_controller,
-            configuration=QasmBackendConfiguration.from_dict(self.DEFAULT_CONFIGURATION),
+            configuration=configuration or self.default_configuration(),
             provider=provider,
+            engines={'dense': dense_controller},
+            executor=executor,
+            result_cache=result_cache,
         )
         
-    def _validate(self, qobj, backend_options, noise_model):
+    # engine name -> controller of ``CompiledCircuit.run_batch``
+    BATCH_CONTROLLERS = {'bdd': bdd_batch_controller, 'dense': dense_batch_controller}
+
+    def compile(self, circuit, engine='dense'):
+        """
+        Compile a parameterized circuit once, to run many bindings with
+        ``CompiledCircuit.run_batch(param_matrix)``.
+        Gates outside the basis are unrolled first, parameters survive.
+        Args:
+            circuit (QuantumCircuit): circuit with unbound ``Parameter``s.
+            engine (str): ``'dense'`` (vectorized over bindings, any angle) or
+                          ``'bdd'`` (the prefix before the first parameterized
+                          gate is shared); the BDD engine is exact for
+                          Clifford+T only and raises on bound angles that
+                          are not multiples of pi/4.
+        Returns:
+            CompiledCircuit: the reusable program.
+        """
+        if engine not in self.BATCH_CONTROLLERS:
+            raise ALComError("the backend engine {} is not supported".format(engine))
+        basis = self.configuration().basis_gates
+        if any(inst.name not in basis and inst.name not in ('measure', 'reset', 'barrier')
+               for inst, _, _ in circuit.data):
+            from qiskit import transpile
+            circuit = transpile(circuit, basis_gates=basis + ['measure', 'reset'], optimization_level=0)
+        from .compiled_circuit import CompiledCircuit
+        return CompiledCircuit(self, circuit, engine, self.BATCH_CONTROLLERS[engine])
+
+    def _validate(self, qobj, circuits, scans, backend_options, noise_model):
         """Semantic validations of the qobj which cannot be done via schemas.
         Warn if no measurements in circuit with classical registers.
         """
-        for experiment in qobj.experiments:
+        for circuit, scan in zip(circuits, scans):
             # If circuit contains classical registers but not
             # measurements raise a warning
-            if experiment.config.memory_slots > 0:
-                # Check if measure opts missing
-                no_measure = True
-                for op in experiment.instructions:
-                    if not no_measure:
-                        break  # we don't need to check any more ops
-                    if no_measure and op.name == "measure":
-                        no_measure = False
-                # Print warning if clbits but no measure
-                if no_measure:
-                    logger.warning(
-                        'No measurements in circuit "%s": '
-                        'count data will return all zeros.',
-                        experiment.header.name)
+            if circuit.num_clbits > 0 and not scan['measured']:
+                logger.warning(
+                    'No measurements in circuit "%s": '
+                    'count data will return all zeros.',
+                    circuit.name)
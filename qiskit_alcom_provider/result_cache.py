@@ -0,0 +1,174 @@
+"""
+Result cache for resubmitted circuits.
+Entries are keyed by ``CircuitIR.fingerprint`` of the experiment and the run
+options, and hold the controller output together with the final engine
+state, so a hit either returns the stored output or only re-samples shots.
+The in-memory store is an LRU bounded by a byte budget; with a ``path`` the
+entries are also written to disk and read back as memory-mapped arrays.
+"""
+
+import collections
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def entry_nbytes(entry):
+    """Bytes held by a cache entry: its arrays and the engine state."""
+    total = 0
+    for value in entry["output"].values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+    state = entry.get("state")
+    if state is not None:
+        total += getattr(state, "nbytes", 0)
+    return total
+
+
+class ResultCache():
+    """
+    LRU cache of experiment results, shared by the jobs of a backend.
+    Args:
+        max_bytes (int): budget of the in-memory entries, the least recently
+                         used ones are dropped beyond it.
+        path (str or None): directory of the persistent store, arrays are
+                            kept as ``.npy`` files and mapped on load.
+                            Entries are pickled, only use trusted directories.
+    An entry is a dict with ``output`` (the controller output), ``state``
+    (the final engine state or None), ``shots`` and ``memory``.
+    """
+
+    def __init__(self, max_bytes=1 << 28, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries = collections.OrderedDict()
+        self._sizes = {}
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @property
+    def hits(self):
+        """Number of lookups that found an entry."""
+        return self._hits
+
+    @property
+    def misses(self):
+        """Number of lookups that found nothing."""
+        return self._misses
+
+    @property
+    def nbytes(self):
+        """Bytes held by the in-memory entries."""
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters of the cache as a dict."""
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses,
+                    "entries": len(self._entries), "nbytes": self._nbytes,
+                    "max_bytes": self.max_bytes}
+
+    def get(self, key):
+        """Entry stored under ``key``, or None. Counts a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+        entry = self._load(key) if self.path is not None else None
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """Store ``entry`` under ``key``, and on disk if there is a path."""
+        with self._lock:
+            self._insert(key, entry)
+        if self.path is not None:
+            self._dump(key, entry)
+
+    def clear(self, disk=False):
+        """Drop the in-memory entries (and the persistent store with ``disk``)."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+        if disk and self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+
+    def _insert(self, key, entry):
+        size = entry_nbytes(entry)
+        if key in self._entries:
+            self._nbytes -= self._sizes.pop(key)
+            del self._entries[key]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._sizes[key] = size
+        self._nbytes += size
+        while self._nbytes > self.max_bytes:
+            old_key, _ = self._entries.popitem(last=False)
+            self._nbytes -= self._sizes.pop(old_key)
+
+    # --- persistent store -------------------------------------------------
+
+    def _dump(self, key, entry):
+        """Write ``<path>/<key>/``: one ``.npy`` per array and the rest pickled."""
+        target = os.path.join(self.path, key)
+        if os.path.isdir(target):
+            return
+        staging = tempfile.mkdtemp(prefix=".alcom-", dir=self.path)
+        try:
+            output = {}
+            arrays = []
+            for field, value in entry["output"].items():
+                if isinstance(value, np.ndarray) and value.dtype != object:
+                    np.save(os.path.join(staging, field + ".npy"), value)
+                    arrays.append(field)
+                else:
+                    output[field] = value
+            meta = dict(entry, output=output, arrays=arrays)
+            with open(os.path.join(staging, "entry.pkl"), "wb") as handle:
+                pickle.dump(meta, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.rename(staging, target)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as err:
+            # another job stored the same key first, the disk is full or the
+            # engine state does not pickle; the entry stays in memory only
+            logger.warning("result cache: cannot store %s: %s", key, err)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _load(self, key):
+        target = os.path.join(self.path, key)
+        try:
+            with open(os.path.join(target, "entry.pkl"), "rb") as handle:
+                entry = pickle.load(handle)
+            for field in entry.pop("arrays"):
+                entry["output"][field] = np.load(os.path.join(target, field + ".npy"),
+                                                 mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError) as err:
+            logger.warning("result cache: cannot read %s: %s", key, err)
+            return None
+        return entry
@@ -0,0 +1,216 @@
+"""
+Shot sampling shared by the engines.
+All shots are drawn in one batch and kept as one integer per shot whose bit
+``c`` is memory slot ``c`` (a compact ``uint64`` array up to 64 slots);
+counts and per-shot bitstrings are derived from that array.
+"""
+
+import numpy as np
+
+from .alcom_error import ALComError
+
+
+def memory_dtype(num_clbits):
+    """``uint64`` when the memory slots fit, Python ints otherwise."""
+    return np.uint64 if num_clbits <= 64 else object
+
+
+def clbit_bit(clbit, dtype):
+    """The value of memory slot ``clbit`` set to one."""
+    return np.uint64(1) << np.uint64(clbit) if dtype is np.uint64 else 1 << clbit
+
+
+def clbit_map(measured):
+    """Invert ``{clbit: qubit}`` into ``{qubit: [clbits]}``."""
+    qubit_clbits = {}
+    for clbit, qubit in measured.items():
+        qubit_clbits.setdefault(qubit, []).append(clbit)
+    return qubit_clbits
+
+
+def sample_indices(probs, shots, rng):
+    """Draw ``shots`` basis-state indices from ``probs`` (cumsum + searchsorted)."""
+    cdf = np.cumsum(probs)
+    # sorted draws make searchsorted walk the cdf in order, the shuffle
+    # restores independent shot order for the memory
+    draws = np.sort(rng.random(shots))
+    draws *= cdf[-1]
+    indices = np.searchsorted(cdf, draws, side='right')
+    np.minimum(indices, len(cdf) - 1, out=indices)
+    rng.shuffle(indices)
+    return indices
+
+
+def memory_from_indices(indices, qubit_clbits, num_clbits):
+    """Gather the measured qubit bits of basis-state indices into memory slots."""
+    dtype = memory_dtype(num_clbits)
+    memory = np.zeros(len(indices), dtype=dtype)
+    indices = np.asarray(indices, dtype=np.int64)
+    for qubit, clbits in qubit_clbits.items():
+        bits = ((indices >> qubit) & 1).astype(dtype)
+        for clbit in clbits:
+            memory |= bits << (np.uint64(clbit) if dtype is np.uint64 else clbit)
+    return memory
+
+
+def _formatter(creg_sizes):
+    """Function turning a memory value into a qiskit style key."""
+    total = sum(size for _, size in creg_sizes)
+    template = '{{:0{}b}}'.format(total).format
+    if len(creg_sizes) <= 1:
+        return lambda value: template(value) if total else ''
+    # registers separated by spaces, the first register rightmost
+    cuts = []
+    end = total
+    for _, size in creg_sizes:
+        cuts.append((end - size, end))
+        end -= size
+    cuts.reverse()
+
+    def format_value(value):
+        bits = template(value)
+        return ' '.join(bits[start:stop] for start, stop in cuts)
+
+    return format_value
+
+
+def format_bitstring(value, creg_sizes):
+    """Qiskit style key: registers separated by spaces, slot 0 rightmost."""
+    return _formatter(creg_sizes)(int(value))
+
+
+def counts_from_memory(memory, creg_sizes):
+    """Histogram of the per-shot values as qiskit style counts."""
+    values, hits = np.unique(memory, return_counts=True)
+    format_value = _formatter(creg_sizes)
+    return {format_value(value): count
+            for value, count in zip(values.tolist(), hits.tolist())}
+
+
+def format_memory(memory, creg_sizes):
+    """Per-shot bitstrings, as ``Result.get_memory`` returns them."""
+    format_value = _formatter(creg_sizes)
+    values, inverse = np.unique(memory, return_inverse=True)
+    keys = [format_value(value) for value in values.tolist()]
+    return [keys[i] for i in inverse.tolist()]
+
+
+def pauli_masks(label):
+    """
+    Bit masks of a Pauli label such as ``'XIZY'`` (qubit 0 rightmost).
+    Returns:
+        tuple: ``(x_mask, z_mask, num_y)`` with ``P = i^num_y X^x_mask Z^z_mask``.
+    """
+    x_mask = z_mask = num_y = 0
+    for qubit, char in enumerate(reversed(label.upper())):
+        if char in 'XY':
+            x_mask |= 1 << qubit
+        if char in 'ZY':
+            z_mask |= 1 << qubit
+        if char == 'Y':
+            num_y += 1
+        elif char not in 'IXZ':
+            raise ALComError('"{}" is not a Pauli label'.format(label))
+    return x_mask, z_mask, num_y
+
+
+def observable_terms(observables):
+    """
+    Pauli labels and real coefficients of an observable given as a
+    ``{label: coeff}`` dict, ``(label, coeff)`` pairs, bare labels or
+    anything with a qiskit-style ``to_list()`` (``SparsePauliOp``).
+    Returns:
+        tuple: the list of labels and the float array of coefficients.
+    """
+    if hasattr(observables, 'to_list'):
+        observables = observables.to_list()
+    elif isinstance(observables, dict):
+        observables = list(observables.items())
+    elif isinstance(observables, str):
+        observables = [observables]
+    labels = []
+    coeffs = []
+    for term in observables:
+        label, coeff = (term, 1.0) if isinstance(term, str) else term
+        pauli_masks(label)
+        coeff = complex(coeff)
+        if abs(coeff.imag) > 1e-12:
+            raise ALComError('the coefficient of "{}" is not real'.format(label))
+        labels.append(label)
+        coeffs.append(coeff.real)
+    if not labels:
+        raise ALComError('the observable has no Pauli terms')
+    return labels, np.array(coeffs)
+
+
+def parity(values):
+    """Parity of the set bits of every entry of an integer array."""
+    values = np.array(values, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        values ^= values >> shift
+    return values & 1
+
+
+def read_out(sim, circuit, use_statevector, shots, rng, memory=False, sparse_threshold=None,
+             observables=None, copy=False):
+    """
+    Controller output of a simulated circuit, shared by the engines.
+    Args:
+        sim: engine state with ``sample_memory``, ``statevector`` and
+             ``sparse_statevector``.
+        circuit (CircuitIR): the simulated circuit.
+        use_statevector (bool): also return the final statevector.
+        shots (int): number of shots to sample.
+        rng (numpy.random.Generator): random source of the shots.
+        memory (bool): also return the per-shot memory values.
+        sparse_threshold (float): return the statevector as ``sparse_indices``
+                                  and ``sparse_amplitudes`` of the amplitudes
+                                  above this magnitude instead of a dense vector.
+        observables (list): Pauli labels; their exact expectation values on
+                            the final state are returned as ``expectation_values``
+                            instead of shots.
+        copy (bool): ``sim`` is read out again later, see ``statevector_output``.
+    Returns:
+        dict: ``counts`` and, when asked for, the statevector and memory arrays.
+    """
+    output = {'counts': {}}
+    if observables is not None:
+        output['expectation_values'] = expectation_values(sim, observables)
+        return output
+    measured = circuit.measured
+    if measured:
+        values = sim.sample_memory(shots, rng, clbit_map(measured), circuit.num_clbits)
+        output['counts'] = counts_from_memory(values, circuit.creg_sizes)
+        if memory:
+            output['memory'] = values
+    if use_statevector:
+        output.update(statevector_output(sim, circuit, sparse_threshold, copy))
+    return output
+
+
+def expectation_values(sim, observables):
+    """Exact ``<P>`` of every Pauli label on the state of ``sim``."""
+    masks = [pauli_masks(label) for label in observables]
+    values = sim.pauli_expectations([(x_mask, z_mask) for x_mask, z_mask, _ in masks])
+    phases = np.array([1j ** num_y for _, _, num_y in masks])
+    return (np.asarray(values) * phases).real
+
+
+def statevector_output(sim, circuit, sparse_threshold=None, copy=False):
+    """
+    The ``statevector`` (or ``sparse_*``) fields of the state of ``sim``.
+    The dense engine hands out its own buffer; with ``copy`` (a state kept
+    by ``keep_state`` or the result cache and read out again) the result
+    gets a copy instead.
+    """
+    phase = np.exp(1j * circuit.global_phase) if circuit.global_phase else None
+    if sparse_threshold is not None:
+        indices, amplitudes = sim.sparse_statevector(sparse_threshold)
+        return {'sparse_indices': indices,
+                'sparse_amplitudes': amplitudes if phase is None else amplitudes * phase}
+    vec = sim.statevector()
+    if phase is not None:
+        return {'statevector': (vec * phase).astype(vec.dtype)}
+    if copy and vec is getattr(sim, 'state', None):
+        vec = vec.copy()
+    return {'statevector': vec}
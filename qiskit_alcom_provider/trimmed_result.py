@@ -1,7 +1,8 @@
 from typing import Dict, List, Any, Union
-import copy
-from qiskit.result import Result
-from qiskit.quantum_info.states import Statevector
+import sys
+import numpy as np
+from .alcom_error import ALComError
+from .sampling import format_memory
 # cannot inherit Result here for missing params for super init
 
 JsonDict = Dict[str, Any]
@@ -11,23 +12,198 @@ class TrimResult():
     from YanTong Lin
     for eazy result in 2020 NTU-IBMQ Q-Camp
     supports get_statevector and get_counts as API
+    one entry of `results` per experiment, in qobj order
+    the raw engine buffers are kept as they are, derived views
+    (Statevector, probabilities, marginal and hex counts) are built
+    on first use and cached
     """
-    def __init__(self, counts=None, statevector=None, **kwargs):
+    __slots__ = ("_meta_data", "_cache")
+
+    def __init__(self, counts=None, statevector=None, results=None, **kwargs):
         # super(TrimResult, self).__init__()
+        if results is None:
+            results = [{"counts": counts, "statevector": statevector}]
         self._meta_data = {}
-        self._meta_data["counts"] = counts
-        self._meta_data["statevector"] = statevector
+        self._meta_data["results"] = results
         self._meta_data.update(kwargs)
-    
-    def get_statevector(self):
-        real = self._meta_data["statevector"][0]
-        image = self._meta_data["statevector"][1]
-        statevector = Statevector([complex(r,i) for r, i in zip(real, image)])
+        self._cache = {}
+
+    @property
+    def results(self):
+        return self._meta_data["results"]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the result buffers, the counts and the cached views."""
+        total = 0
+        for result in self._meta_data["results"]:
+            for value in result.values():
+                total += _nbytes(value)
+        for key, value in self._cache.items():
+            # a Statevector wraps the engine buffer, counted with the raw field
+            total += sys.getsizeof(value) if key[0] == "statevector" else _nbytes(value)
+        return total
+
+    def clear_cache(self):
+        """Drop the derived views, the raw buffers are kept."""
+        self._cache.clear()
+
+    def _get_index(self, experiment=None):
+        """Index of one experiment, `experiment` is an index, a name or a circuit."""
+        results = self._meta_data["results"]
+        if experiment is None:
+            if len(results) != 1:
+                raise ALComError("you have to select a circuit when there is more than one available")
+            return 0
+        if isinstance(experiment, int):
+            return experiment
+        name = getattr(experiment, "name", experiment)
+        for index, result in enumerate(results):
+            if result.get("name") == name:
+                return index
+        raise ALComError('no data for experiment "{}"'.format(name))
+
+    def _get_experiment(self, experiment=None):
+        """Per-experiment data, `experiment` is an index, a name or a circuit."""
+        return self._meta_data["results"][self._get_index(experiment)]
+
+    def _cached(self, key, build):
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = build()
+        return value
+
+    def _raw_statevector(self, index):
+        result = self._meta_data["results"][index]
+        if result.get("statevector") is None and "sparse_indices" in result:
+            return self._cached(("dense", index), lambda: _densify(result))
+        statevector = result["statevector"]
+        if isinstance(statevector, list):
+            # [real, imag] lists, as stored by older results
+            real, image = statevector
+            statevector = np.asarray(real, dtype=float) + 1j * np.asarray(image, dtype=float)
         return statevector
-    
-    def get_counts(self):
-        return self._meta_data["counts"]
-    
+
+    def _sparse_statevector(self, index):
+        result = self._meta_data["results"][index]
+        if "sparse_indices" in result:
+            return result["sparse_indices"], result["sparse_amplitudes"]
+
+        def build():
+            vec = self._raw_statevector(index)
+            indices = np.flatnonzero(vec)
+            return indices.astype(np.uint64), vec[indices]
+
+        return self._cached(("sparse", index), build)
+
+    def get_statevector(self, experiment=None, sparse=False):
+        """
+        Statevector of one experiment, wrapping the engine buffer without a copy.
+        With `sparse=True` return `(indices, amplitudes)` arrays of the nonzero
+        entries instead, as stored by the `sparse_statevector` method.
+        """
+        index = self._get_index(experiment)
+        if sparse:
+            return self._sparse_statevector(index)
+        from qiskit.quantum_info.states import Statevector
+        return self._cached(("statevector", index),
+                            lambda: Statevector(self._raw_statevector(index)))
+
+    def get_statevector_dict(self, experiment=None):
+        """Nonzero amplitudes of one experiment keyed by basis bitstrings (qubit 0 rightmost)."""
+        index = self._get_index(experiment)
+
+        def build():
+            indices, amplitudes = self._sparse_statevector(index)
+            width = self._meta_data["results"][index].get("num_qubits")
+            if width is None:
+                width = max(1, int(np.log2(len(self._raw_statevector(index)))))
+            template = "{{:0{}b}}".format(width).format
+            return {template(i): a for i, a in zip(indices.tolist(), amplitudes.tolist())}
+
+        return self._cached(("statevector_dict", index), build)
+
+    def get_probabilities(self, experiment=None):
+        """Probability of every basis state of one experiment, from its statevector."""
+        index = self._get_index(experiment)
+
+        def build():
+            vec = self._raw_statevector(index)
+            return vec.real ** 2 + vec.imag ** 2
+
+        return self._cached(("probabilities", index), build)
+
+    def get_memory(self, experiment=None):
+        """Per-shot bitstrings of one experiment, run with `memory=True`."""
+        index = self._get_index(experiment)
+        result = self._meta_data["results"][index]
+        if result.get("memory") is None:
+            raise ALComError("no memory for this experiment, run it with memory=True")
+        return self._cached(("memory", index), lambda: format_memory(
+            result["memory"], result.get("creg_sizes", [])))
+
+    def get_expectation_values(self, experiment=None):
+        """`<P>` of every Pauli term of one experiment, run with the `expectation` method."""
+        result = self._get_experiment(experiment)
+        if result.get("expectation_values") is None:
+            raise ALComError("no expectation values for this experiment, run it with method='expectation'")
+        return result["expectation_values"]
+
+    def get_expectation_value(self, experiment=None):
+        """Expectation value of the whole observable, the weighted sum of its terms."""
+        result = self._get_experiment(experiment)
+        values = self.get_expectation_values(experiment)
+        coefficients = result.get("expectation_coefficients")
+        if coefficients is None:
+            return float(np.sum(values))
+        return float(np.dot(coefficients, values))
+
+    def get_fidelity(self, experiment=None):
+        """Lower bound of the fidelity to the exact state, 1.0 unless run in the approximate mode."""
+        return self._get_experiment(experiment).get("fidelity", 1.0)
+
+    def get_profile(self):
+        """`Profiler` of the job, run with `profile`; `.dump(path)` writes a Chrome trace."""
+        if self._meta_data.get("profile") is None:
+            raise ALComError("no profile for this job, run it with backend_options['profile']")
+        return self._meta_data["profile"]
+
+    def get_counts(self, experiment=None):
+        """Counts of one experiment, or a list of all of them if there are several."""
+        if experiment is None and len(self._meta_data["results"]) > 1:
+            return [result["counts"] for result in self._meta_data["results"]]
+        return self._get_experiment(experiment)["counts"]
+
+    def get_marginal_counts(self, clbits, experiment=None):
+        """
+        Counts of one experiment over the memory slots `clbits` only,
+        keyed like qiskit's `marginal_counts` (highest slot leftmost).
+        """
+        index = self._get_index(experiment)
+        clbits = tuple(sorted(set(clbits), reverse=True))
+
+        def build():
+            marginal = {}
+            for key, hits in self._meta_data["results"][index]["counts"].items():
+                bits = key.replace(" ", "")
+                width = len(bits)
+                new_key = "".join(bits[width - 1 - c] for c in clbits)
+                marginal[new_key] = marginal.get(new_key, 0) + hits
+            return marginal
+
+        return self._cached(("marginal", index, clbits), build)
+
+    def get_hex_counts(self, experiment=None):
+        """Counts of one experiment keyed by hexadecimal memory values (`0x3`)."""
+        index = self._get_index(experiment)
+
+        def build():
+            counts = self._meta_data["results"][index]["counts"]
+            return {hex(int(key.replace(" ", "") or "0", 2)): hits
+                    for key, hits in counts.items()}
+
+        return self._cached(("hex", index), build)
+
     def to_dict(self):
         """Return a dictionary format representation of the Result
         Returns:
@@ -36,10 +212,11 @@ class TrimResult():
         out_dict = {}
         out_dict.update(self._meta_data)
         return out_dict
-    
+
     @classmethod
     def from_dict(cls, data: JsonDict):
         """Create a new `TrimResult` object from a dictionary.
+        The per-experiment entries and their buffers are shared, not copied.
         Args:
             data (dict): A dictionary representing the Result to create. It
                          will be in the same format as output by
@@ -47,5 +224,22 @@ class TrimResult():
         Returns:
             Result: The ``TrimResult`` object from the input dictionary.
         """
-        in_data = copy.copy(data)
-        return cls(**in_data)
\ No newline at end of file
+        return cls(**data)
+
+
+def _densify(result):
+    """Dense vector of a sparse statevector result."""
+    vec = np.zeros(1 << result["num_qubits"], dtype=complex)
+    vec[result["sparse_indices"].astype(np.int64)] = result["sparse_amplitudes"]
+    return vec
+
+
+def _nbytes(value):
+    """Size of a result field, buffers by their data, containers shallowly."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(key) for key in value)
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(_nbytes(item) for item in value)
+    return sys.getsizeof(value)
@@ -0,0 +1,172 @@
+"""
+Validation of the circuits of a job.
+Checks run on the packed ``CircuitIR`` arrays, once per circuit structure:
+``CircuitIR.structure_hash`` leaves out the float parameters, so the jobs of
+a parameter sweep and resubmitted circuits hit the cache. One vectorized
+pass over the opcode, qubit and clbit arrays finds the measurements, the
+qubits used, the instructions outside the basis and the width; the
+jsonschema check of the qobj runs once per qobj, keyed by its config
+values, the experiment headers and configs and the circuit structures.
+"""
+
+import collections
+import hashlib
+import threading
+
+import numpy as np
+
+from .alcom_error import ALComError
+from .circuit_ir import OPCODE_NAMES, OPCODES
+
+# instructions the qobj may hold besides the basis gates
+_NON_GATES = ('measure', 'reset', 'bfunc')
+
+
+def _as_dict(obj):
+    if obj is None or isinstance(obj, dict):
+        return obj or {}
+    return obj.to_dict() if hasattr(obj, 'to_dict') else vars(obj)
+
+
+def _value_key(value):
+    """Hashable stand-in for a qobj config value, arrays by their bytes."""
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.dtype.str, value.shape,
+                hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, dict):
+        return tuple(sorted(((str(key), _value_key(item)) for key, item in value.items()),
+                            key=lambda pair: pair[0]))
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_key(item) for item in value)
+    if hasattr(value, 'to_dict') or hasattr(value, '__dict__'):
+        return _value_key(_as_dict(value))
+    return (type(value).__name__, repr(value))
+
+
+def scan_circuit(circuit, basis=None):
+    """
+    Gather what the checks need in one pass over the arrays.
+    Args:
+        circuit (CircuitIR): the packed experiment.
+        basis (list or None): allowed gate names, None allows every opcode.
+    Returns:
+        dict: ``num_qubits``, ``used_qubits`` (sorted list), ``max_clbit``
+        (highest memory slot measured into), ``measured`` (has a
+        ``measure``) and ``unsupported`` (names outside ``basis``).
+    """
+    codes = np.unique(circuit.opcodes)
+    measure = circuit.opcodes == OPCODES['measure']
+    unsupported = []
+    if basis is not None:
+        allowed = [OPCODES[name] for name in list(basis) + list(_NON_GATES) if name in OPCODES]
+        unsupported = [OPCODE_NAMES[code] for code in np.setdiff1d(codes, allowed).tolist()]
+    return {'num_qubits': circuit.num_qubits,
+            'used_qubits': np.unique(circuit.qubits).tolist(),
+            'max_clbit': int(circuit.clbits[measure].max()) if measure.any() else -1,
+            'measured': bool(measure.any()),
+            'unsupported': unsupported}
+
+
+def check_circuit(circuit, scan, max_qubits=None):
+    """
+    Raise on the problems ``scan`` (see ``scan_circuit``) shows.
+    Raises:
+        ALComError: for instructions outside the basis, qubits outside the
+                    circuit, a circuit wider than ``max_qubits`` or memory
+                    slots outside the classical registers.
+    """
+    name = circuit.name
+    if scan['unsupported']:
+        raise ALComError('circuit "{}" has instructions outside the basis: {}'.format(
+            name, ', '.join(scan['unsupported'])))
+    if max_qubits is not None and scan['num_qubits'] > max_qubits:
+        raise ALComError('circuit "{}" has {} qubits, the backend simulates at most {}'.format(
+            name, scan['num_qubits'], max_qubits))
+    outside = [q for q in scan['used_qubits'] if not 0 <= q < scan['num_qubits']]
+    if outside:
+        raise ALComError('circuit "{}" acts on qubit {} of {}'.format(
+            name, outside[0], scan['num_qubits']))
+    if scan['max_clbit'] >= circuit.num_clbits:
+        raise ALComError('circuit "{}" writes memory slot {} of {}'.format(
+            name, scan['max_clbit'], circuit.num_clbits))
+
+
+class CircuitValidator():
+    """
+    Cache of the circuit checks of a backend, keyed by structure.
+    Args:
+        max_entries (int): structures kept, the least recently used go first.
+    """
+
+    def __init__(self, max_entries=1 << 12):
+        self.max_entries = max_entries
+        self._scans = collections.OrderedDict()
+        self._schemas = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # a copy sent to a worker process starts empty
+        return {'max_entries': self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_entries'])
+
+    def _lookup(self, store, key):
+        with self._lock:
+            value = store.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                store.move_to_end(key)
+            return value
+
+    def _store(self, store, key, value):
+        with self._lock:
+            store[key] = value
+            while len(store) > self.max_entries:
+                store.popitem(last=False)
+
+    def validate(self, circuits, basis=None, max_qubits=None):
+        """
+        Check every circuit, scanning each structure once.
+        Returns:
+            list: the scans (see ``scan_circuit``) in circuit order.
+        Raises:
+            ALComError: see ``check_circuit``.
+        """
+        scans = []
+        for circuit in circuits:
+            key = circuit.structure_hash()
+            scan = self._lookup(self._scans, key)
+            if scan is None:
+                scan = scan_circuit(circuit, basis)
+                check_circuit(circuit, scan, max_qubits)
+                self._store(self._scans, key, scan)
+            scans.append(scan)
+        return scans
+
+    def validate_schema(self, qobj, circuits, validator):
+        """
+        Run ``validator(qobj)`` (the jsonschema check) unless an equal qobj
+        passed it: the same config values, experiment headers and configs
+        and circuit structures. Only the gate parameters are left out, the
+        schema checks their types, which packing already did.
+        """
+        digest = hashlib.sha256(repr(_value_key(qobj.config)).encode())
+        for experiment, circuit in zip(qobj.experiments, circuits):
+            digest.update(repr((_value_key(getattr(experiment, 'header', None)),
+                                _value_key(getattr(experiment, 'config', None)))).encode())
+            digest.update(circuit.structure_hash().encode())
+        key = digest.hexdigest()
+        if self._lookup(self._schemas, key) is None:
+            validator(qobj)
+            self._store(self._schemas, key, True)
+
+    def stats(self):
+        """Hits, misses and cached structures."""
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses,
+                    'circuits': len(self._scans), 'qobjs': len(self._schemas)}
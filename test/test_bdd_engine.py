@@ -0,0 +1,202 @@
+"""
+The bit-sliced BDD engine against the dense engine on random Clifford+T circuits.
+"""
+
+import math
+import random
+import unittest
+
+import numpy as np
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider import ALComExecutor, ALComProvider
+from qiskit_alcom_provider.alcom_error import ALComError, ALComResourceError
+from qiskit_alcom_provider.bdd_engine import bdd_controller, interaction_order
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.dense_engine import dense_controller
+
+# gate -> (number of qubits, number of pi/4 angles)
+CLIFFORD_T = {
+    'id': (1, 0), 'x': (1, 0), 'y': (1, 0), 'z': (1, 0), 'h': (1, 0), 's': (1, 0),
+    'sdg': (1, 0), 't': (1, 0), 'tdg': (1, 0), 'u1': (1, 1), 'u2': (1, 2), 'u3': (1, 3),
+    'cx': (2, 0), 'cz': (2, 0), 'cu1': (2, 1), 'swap': (2, 0), 'ccx': (3, 0), 'cswap': (3, 0),
+}
+
+
+def random_circuit(num_qubits, num_gates, seed):
+    """Random Clifford+T circuit, every angle a multiple of pi/4."""
+    rnd = random.Random(seed)
+    names = [name for name, (arity, _) in CLIFFORD_T.items() if arity <= num_qubits]
+    ops = []
+    for _ in range(num_gates):
+        name = rnd.choice(names)
+        arity, num_angles = CLIFFORD_T[name]
+        qubits = rnd.sample(range(num_qubits), arity)
+        angles = [rnd.randrange(-8, 8) * math.pi / 4 for _ in range(num_angles)]
+        ops.append((name, qubits, angles, -1))
+    return CircuitIR.from_ops(num_qubits, [], ops, 'random_{}'.format(seed))
+
+
+def scrambler(num_qubits, num_gates, seed):
+    """Random H, T and CX gates, the diagrams grow towards 2^n nodes."""
+    rnd = random.Random(seed)
+    ops = []
+    for _ in range(num_gates):
+        qubit, other = rnd.sample(range(num_qubits), 2)
+        name = rnd.choice(('h', 't', 'cx'))
+        ops.append((name, [qubit, other] if name == 'cx' else [qubit], [], -1))
+    ops += [('measure', [q], [], q) for q in range(num_qubits)]
+    return CircuitIR.from_ops(num_qubits, [['c', num_qubits]], ops, 'scrambler')
+
+
+def statevector(controller, circuit, **options):
+    return controller(circuit, True, 0, **options)['statevector']
+
+
+class TestBDDEngine(unittest.TestCase):
+
+    def test_random_clifford_t(self):
+        for seed in range(20):
+            circuit = random_circuit(1 + seed % 5, 40, seed)
+            with self.subTest(seed=seed):
+                np.testing.assert_allclose(statevector(bdd_controller, circuit),
+                                           statevector(dense_controller, circuit), atol=1e-9)
+
+    def test_ghz(self):
+        def ghz(n):
+            ops = [('h', [0], [], -1)] + [('cx', [q, q + 1], [], -1) for q in range(n - 1)]
+            ops += [('measure', [q], [], q) for q in range(n)]
+            return CircuitIR.from_ops(n, [['c', n]], ops, 'ghz')
+
+        expected = np.zeros(1 << 10)
+        expected[[0, -1]] = 1 / math.sqrt(2)
+        np.testing.assert_allclose(bdd_controller(ghz(10), True, 0)['statevector'], expected,
+                                   atol=1e-12)
+        # far beyond a dense state
+        counts = bdd_controller(ghz(60), False, 1000, seed=1)['counts']
+        self.assertLessEqual(set(counts), {'0' * 60, '1' * 60})
+        self.assertEqual(sum(counts.values()), 1000)
+
+    def test_qasm_input(self):
+        qasm = ('OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\ncreg c[2];\n'
+                'h q[0];\ncx q[0],q[1];\nt q[1];\nmeasure q[0] -> c[0];\nmeasure q[1] -> c[1];\n')
+        output = bdd_controller(qasm, False, 200, seed=4)
+        self.assertLessEqual(set(output['counts']), {'00', '11'})
+        self.assertEqual(sum(output['counts'].values()), 200)
+
+    def test_inexact_angle(self):
+        circuit = CircuitIR.from_ops(1, [], [('u1', [0], [0.3], -1)], 'inexact')
+        with self.assertRaises(ALComError):
+            bdd_controller(circuit, True, 0)
+
+
+class TestBDDBudget(unittest.TestCase):
+
+    def test_node_budget(self):
+        circuit = scrambler(10, 150, seed=1)
+        with self.assertRaises(ALComResourceError):
+            bdd_controller(circuit, False, 10, max_nodes=500)
+        stats = bdd_controller(circuit, False, 10, max_nodes=1 << 20)['bdd_stats']
+        self.assertGreater(stats['peak_nodes'], 500)
+        self.assertGreaterEqual(stats['peak_bytes'], stats['bytes'])
+        self.assertTrue(0 <= stats['computed_hit_rate'] <= 1)
+
+    def test_memory_budget(self):
+        circuit = scrambler(10, 150, seed=1)
+        # a full computed table takes 30 MB, a few thousand nodes fit next to it
+        with self.assertRaises(ALComResourceError):
+            bdd_controller(circuit, False, 10, max_memory_mb=31)
+        stats = bdd_controller(circuit, False, 10, max_memory_mb=1024)['bdd_stats']
+        self.assertLess(stats['peak_bytes'], 1024 << 20)
+
+    def test_fallback_engine(self):
+        executor = ALComExecutor('inline')
+        self.addCleanup(executor.shutdown)
+        backend = ALComProvider(executor=executor).get_backend('qasm_simulator')
+        rnd = random.Random(2)
+        circuit = QuantumCircuit(10, 10)
+        for _ in range(150):
+            qubit, other = rnd.sample(range(10), 2)
+            name = rnd.choice(('h', 't', 'cx'))
+            getattr(circuit, name)(*([qubit, other] if name == 'cx' else [qubit]))
+        circuit.measure(list(range(10)), list(range(10)))
+        options = {'engine': 'bdd', 'max_nodes': 500}
+        with self.assertRaises(ALComResourceError):
+            backend.run(assemble(circuit, shots=100), backend_options=options).result()
+        result = backend.run(assemble(circuit, shots=100),
+                             backend_options=dict(options, fallback_engine='dense')).result()
+        self.assertEqual(result.results[0]['fallback']['engine'], 'dense')
+        self.assertEqual(sum(result.get_counts().values()), 100)
+
+
+def bell_pairs(num_pairs):
+    """Bell pairs on qubits ``q`` and ``q + num_pairs``, far apart in index order."""
+    ops = [('h', [q], [], -1) for q in range(num_pairs)]
+    ops += [('cx', [q, q + num_pairs], [], -1) for q in range(num_pairs)]
+    ops += [('t', [q], [], -1) for q in range(2 * num_pairs)]
+    return CircuitIR.from_ops(2 * num_pairs, [], ops, 'bell_pairs')
+
+
+class TestBDDOrder(unittest.TestCase):
+
+    def test_orders_keep_the_state(self):
+        circuit = random_circuit(5, 60, 99)
+        expected = statevector(dense_controller, circuit)
+        for options in ({'qubit_order': 'interaction'}, {'qubit_order': 'index'},
+                        {'qubit_order': [4, 2, 0, 1, 3]},
+                        {'qubit_order': 'index', 'sift_threshold': 8}):
+            with self.subTest(**options):
+                np.testing.assert_allclose(statevector(bdd_controller, circuit, **options),
+                                           expected, atol=1e-9)
+
+    def test_interaction_order(self):
+        self.assertEqual(interaction_order(bell_pairs(3)), [0, 3, 1, 4, 2, 5])
+
+    def test_sifting(self):
+        circuit = bell_pairs(6)
+        index = bdd_controller(circuit, True, 0, qubit_order='index')
+        sifted = bdd_controller(circuit, True, 0, qubit_order='index', sift_threshold=50)
+        self.assertGreater(sifted['bdd_stats']['sift_runs'], 0)
+        self.assertLess(sifted['bdd_stats']['nodes'], index['bdd_stats']['nodes'] / 4)
+        np.testing.assert_allclose(sifted['statevector'], index['statevector'], atol=1e-12)
+
+
+def skewed(num_qubits, num_gates, seed):
+    """H T H on every qubit, then T and CX: uneven weights over many branches."""
+    rnd = random.Random(seed)
+    ops = []
+    for qubit in range(num_qubits):
+        ops += [('h', [qubit], [], -1), ('t', [qubit], [], -1), ('h', [qubit], [], -1)]
+    for _ in range(num_gates):
+        qubit, other = rnd.sample(range(num_qubits), 2)
+        name = rnd.choice(('t', 'cx', 'cx'))
+        ops.append((name, [qubit, other] if name == 'cx' else [qubit], [], -1))
+    return CircuitIR.from_ops(num_qubits, [], ops, 'skewed')
+
+
+class TestBDDApproximation(unittest.TestCase):
+
+    def test_fidelity_bound(self):
+        circuit = skewed(8, 80, seed=1)
+        exact = bdd_controller(circuit, True, 0)
+        self.assertNotIn('fidelity', exact)
+        for bound in (0.5, 0.8, 0.95):
+            with self.subTest(bound=bound):
+                output = bdd_controller(circuit, True, 0, approximation_fidelity=bound,
+                                        approximation_threshold=200)
+                self.assertGreater(output['bdd_stats']['prunings'], 0)
+                self.assertLess(output['bdd_stats']['peak_nodes'],
+                                exact['bdd_stats']['peak_nodes'])
+                # the reported bound holds for the real overlap, and stays above the request
+                overlap = abs(np.vdot(exact['statevector'], output['statevector'])) ** 2
+                self.assertGreaterEqual(output['fidelity'], bound)
+                self.assertGreaterEqual(overlap, output['fidelity'] - 1e-9)
+                self.assertAlmostEqual(np.linalg.norm(output['statevector']), 1)
+
+    def test_invalid_fidelity(self):
+        with self.assertRaises(ALComError):
+            bdd_controller(skewed(3, 5, seed=1), False, 10, approximation_fidelity=1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Mid-circuit measurement, reset and conditioned gates, run branch by branch.
+"""
+
+import unittest
+
+import numpy as np
+
+from qiskit_alcom_provider.bdd_engine import bdd_controller
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.dense_engine import dense_controller
+
+CONTROLLERS = (bdd_controller, dense_controller)
+SHOTS = 4000
+# register a bfunc writes, after the two memory slots
+REGISTER = 2
+
+
+def feed_forward():
+    """Measure a |+> qubit and flip the second qubit when it read one."""
+    return CircuitIR.from_ops(2, [['c', 2]], [
+        ('h', [0], [], -1),
+        ('measure', [0], [], 0),
+        ('bfunc', [], (1, '==', 1), REGISTER),
+        ('x', [1], [], -1, REGISTER),
+        ('measure', [1], [], 1),
+    ], 'feed_forward')
+
+
+class TestBranching(unittest.TestCase):
+
+    def assert_uniform(self, counts, outcomes):
+        self.assertEqual(set(counts), set(outcomes))
+        expected = SHOTS / len(outcomes)
+        tolerance = 5 * np.sqrt(expected)
+        for outcome in outcomes:
+            self.assertAlmostEqual(counts[outcome], expected, delta=tolerance)
+
+    def test_conditioned_gate(self):
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                counts = controller(feed_forward(), False, SHOTS, seed=1)['counts']
+                self.assert_uniform(counts, ['00', '11'])
+
+    def test_measure_then_gate(self):
+        # the second H acts on a collapsed qubit, both reads are fair coins
+        circuit = CircuitIR.from_ops(1, [['c', 2]], [
+            ('h', [0], [], -1), ('measure', [0], [], 0),
+            ('h', [0], [], -1), ('measure', [0], [], 1)], 'twice')
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                counts = controller(circuit, False, SHOTS, seed=2)['counts']
+                self.assert_uniform(counts, ['00', '01', '10', '11'])
+
+    def test_reset(self):
+        circuit = CircuitIR.from_ops(2, [['c', 2]], [
+            ('h', [0], [], -1), ('cx', [0, 1], [], -1), ('reset', [0], [], -1),
+            ('measure', [0], [], 0), ('measure', [1], [], 1)], 'reset')
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                counts = controller(circuit, False, SHOTS, seed=3)['counts']
+                self.assert_uniform(counts, ['00', '10'])
+
+    def test_statevector_of_one_branch(self):
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                vec = controller(feed_forward(), True, 100, seed=4)['statevector']
+                probabilities = np.abs(vec) ** 2
+                self.assertTrue(np.allclose(probabilities, [1, 0, 0, 0])
+                                or np.allclose(probabilities, [0, 0, 0, 1]))
+
+    def test_memory_and_seed(self):
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                first = controller(feed_forward(), False, 200, seed=5, memory=True)
+                second = controller(feed_forward(), False, 200, seed=5, memory=True)
+                self.assertEqual(sorted(set(first['memory'].tolist())), [0, 3])
+                np.testing.assert_array_equal(first['memory'], second['memory'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+CircuitIR: packing qobj experiments, the QASM debug path and the hashes.
+"""
+
+import math
+import unittest
+
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider.alcom_error import ALComError
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+
+
+def sample_circuit():
+    circuit = QuantumCircuit(3, 2)
+    circuit.h(0)
+    circuit.u1(math.pi / 4, 1)
+    circuit.barrier(0, 1, 2)
+    circuit.cx(0, 2)
+    circuit.u3(0.1, 0.2, 0.3, 2)
+    circuit.measure([0, 2], [0, 1])
+    return circuit
+
+
+class TestCircuitIR(unittest.TestCase):
+
+    def test_from_experiment(self):
+        qobj = assemble(sample_circuit(), shots=10)
+        circuit = CircuitIR.from_experiment(qobj.experiments[0], qobj.config)
+        self.assertEqual(circuit.num_qubits, 3)
+        self.assertEqual(circuit.num_clbits, 2)
+        self.assertEqual(list(circuit.ops()), [
+            ('h', [0], [], -1),
+            ('u1', [1], [math.pi / 4], -1),
+            ('cx', [0, 2], [], -1),
+            ('u3', [2], [0.1, 0.2, 0.3], -1),
+            ('measure', [0], [], 0),
+            ('measure', [2], [], 1),
+        ])
+        self.assertEqual(circuit.measured, {0: 0, 1: 2})
+        self.assertFalse(circuit.is_dynamic)
+
+    def test_qasm_round_trip(self):
+        qobj = assemble(sample_circuit(), shots=10)
+        circuit = CircuitIR.from_experiment(qobj.experiments[0], qobj.config)
+        parsed = CircuitIR.from_qasm(circuit.to_qasm())
+        self.assertEqual(list(parsed.ops()), list(circuit.ops()))
+
+    def test_unsupported_instruction(self):
+        with self.assertRaises(ALComError):
+            CircuitIR.from_ops(1, [], [('sx', [0], [], -1)])
+
+    def test_dynamic(self):
+        ops = [('h', [0], [], -1), ('measure', [0], [], 0)]
+        self.assertFalse(CircuitIR.from_ops(1, [['c', 1]], ops).is_dynamic)
+        self.assertTrue(CircuitIR.from_ops(1, [['c', 1]], ops + [('x', [0], [], -1)]).is_dynamic)
+        self.assertTrue(CircuitIR.from_ops(1, [], [('reset', [0], [], -1)]).is_dynamic)
+
+    def test_with_params(self):
+        circuit = CircuitIR.from_ops(1, [], [('u1', [0], [0.5], -1), ('u3', [0], [1, 2, 3], -1)])
+        bound = circuit.with_params([0.25, 1, 2, 3])
+        self.assertIs(bound.opcodes, circuit.opcodes)
+        self.assertEqual(list(bound.ops())[0], ('u1', [0], [0.25], -1))
+        self.assertEqual(bound.structure_hash(), circuit.structure_hash())
+        self.assertNotEqual(bound.fingerprint(), circuit.fingerprint())
+
+
+if __name__ == '__main__':
+    unittest.main()
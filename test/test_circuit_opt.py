@@ -0,0 +1,86 @@
+"""
+Gate cancellation and fusion keep the unitary of the circuit.
+"""
+
+import math
+import unittest
+
+import numpy as np
+
+from qiskit_alcom_provider.bdd_engine import bdd_controller
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.circuit_opt import optimize_circuit
+from qiskit_alcom_provider.dense_engine import DenseSimulator
+
+GATES_1Q = ('h', 'x', 'y', 'z', 's', 'sdg', 't', 'tdg')
+GATES_2Q = ('cx', 'cz', 'swap')
+
+
+def unitary(circuit):
+    """Unitary of ``circuit``, its global phase included, column by column."""
+    columns = []
+    for basis in range(1 << circuit.num_qubits):
+        sim = DenseSimulator(circuit.num_qubits)
+        sim.state[:] = 0
+        sim.state[basis] = 1
+        for name, qubits, params, _ in circuit.ops():
+            sim.apply(name, qubits, params)
+        columns.append(sim.state * np.exp(1j * circuit.global_phase))
+    return np.array(columns).T
+
+
+def random_circuit(num_qubits, num_gates, rng, eighths=False):
+    ops = []
+    for _ in range(num_gates):
+        kind = rng.integers(4)
+        qubits = [int(q) for q in rng.permutation(num_qubits)[:2]]
+        if kind == 0:
+            ops.append((str(rng.choice(GATES_1Q)), qubits[:1], [], -1))
+        elif kind == 1:
+            angles = (rng.integers(-8, 8, 3) * math.pi / 4 if eighths
+                      else rng.uniform(-math.pi, math.pi, 3))
+            name = str(rng.choice(['u1', 'u3']))
+            ops.append((name, qubits[:1], list(angles[:1 if name == 'u1' else 3]), -1))
+        else:
+            ops.append((str(rng.choice(GATES_2Q)), qubits, [], -1))
+    return CircuitIR.from_ops(num_qubits, [], ops, 'random')
+
+
+class TestCircuitOpt(unittest.TestCase):
+
+    def test_unitary_kept(self):
+        rng = np.random.default_rng(5)
+        for trial in range(10):
+            circuit = random_circuit(3, 40, rng)
+            expected = unitary(circuit)
+            for max_qubits in (1, 2, 3):
+                with self.subTest(trial=trial, max_qubits=max_qubits):
+                    optimized, removed = optimize_circuit(circuit, max_qubits)
+                    self.assertEqual(removed, len(circuit) - len(optimized))
+                    np.testing.assert_allclose(unitary(optimized), expected, atol=1e-9)
+
+    def test_exact_for_bdd(self):
+        rng = np.random.default_rng(6)
+        for trial in range(10):
+            circuit = random_circuit(4, 40, rng, eighths=True)
+            optimized, _ = optimize_circuit(circuit, exact=True)
+            with self.subTest(trial=trial):
+                np.testing.assert_allclose(unitary(optimized), unitary(circuit), atol=1e-9)
+                # every fused angle is still a multiple of pi/4
+                np.testing.assert_allclose(bdd_controller(optimized, True, 0)['statevector'],
+                                           unitary(circuit)[:, 0], atol=1e-9)
+
+    def test_cancellation(self):
+        ops = [('h', [0], [], -1), ('h', [0], [], -1), ('cx', [0, 1], [], -1),
+               ('s', [1], [], -1), ('sdg', [1], [], -1), ('cx', [0, 1], [], -1)]
+        optimized, removed = optimize_circuit(CircuitIR.from_ops(2, [], ops))
+        self.assertEqual((len(optimized), removed), (0, 6))
+
+    def test_conditioned_left_alone(self):
+        ops = [('bfunc', [], (1, '==', 1), 0), ('h', [0], [], -1, 0), ('h', [0], [], -1, 0)]
+        circuit = CircuitIR.from_ops(1, [['c', 1]], ops)
+        self.assertIs(optimize_circuit(circuit)[0], circuit)
+
+
+if __name__ == '__main__':
+    unittest.main()
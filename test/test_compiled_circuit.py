@@ -0,0 +1,77 @@
+"""
+QasmSimulator.compile and CompiledCircuit.run_batch.
+"""
+
+import math
+import unittest
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+
+from qiskit_alcom_provider import ALComExecutor, ALComProvider
+from qiskit_alcom_provider.alcom_error import ALComError
+from qiskit_alcom_provider.dense_engine import dense_controller
+
+
+def ansatz():
+    """u3(theta, 0, 0) on qubit 0 copied to qubit 1, u1(phi) on qubit 1."""
+    theta, phi = Parameter('theta'), Parameter('phi')
+    circuit = QuantumCircuit(2, 2)
+    circuit.u3(theta, 0, 0, 0)
+    circuit.cx(0, 1)
+    circuit.u1(phi, 1)
+    circuit.measure([0, 1], [0, 1])
+    return circuit
+
+
+def expected_statevector(theta, phi):
+    vec = np.zeros(4, dtype=complex)
+    vec[0] = math.cos(theta / 2)
+    vec[3] = math.sin(theta / 2) * np.exp(1j * phi)
+    return vec
+
+
+class TestCompiledCircuit(unittest.TestCase):
+
+    def setUp(self):
+        executor = ALComExecutor('inline')
+        self.addCleanup(executor.shutdown)
+        self.backend = ALComProvider(executor=executor).get_backend('qasm_simulator')
+
+    def test_parameters(self):
+        compiled = self.backend.compile(ansatz())
+        self.assertEqual([param.name for param in compiled.parameters], ['phi', 'theta'])
+        with self.assertRaises(ALComError):
+            compiled.run_batch(np.zeros((2, 3)))
+
+    def test_arbitrary_angles(self):
+        # the default engine takes any angle
+        compiled = self.backend.compile(ansatz())
+        rows = np.random.default_rng(2).uniform(-math.pi, math.pi, (6, 2))
+        result = compiled.run_batch(rows, method='statevector')
+        for i, (phi, theta) in enumerate(rows):
+            np.testing.assert_allclose(result.get_statevector(i).data,
+                                       expected_statevector(theta, phi), atol=1e-10)
+
+    def test_counts_match_bound_runs(self):
+        compiled = self.backend.compile(ansatz())
+        rows = np.random.default_rng(3).uniform(-math.pi, math.pi, (4, 2))
+        result = compiled.run_batch(rows, shots=300, seed=11)
+        for i, row in enumerate(rows):
+            bound = dense_controller(compiled.bind(row), False, 300, seed=11 + i)
+            self.assertEqual(result.get_counts(i), bound['counts'])
+
+    def test_bdd_engine(self):
+        compiled = self.backend.compile(ansatz(), engine='bdd')
+        rows = np.array([[math.pi / 4, math.pi / 2], [-math.pi, 3 * math.pi / 4]])
+        result = compiled.run_batch(rows, method='statevector')
+        for i, (phi, theta) in enumerate(rows):
+            np.testing.assert_allclose(result.get_statevector(i).data,
+                                       expected_statevector(theta, phi), atol=1e-10)
+        with self.assertRaises(ALComError):
+            compiled.run_batch([[0.3, 0.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+The dense statevector engine against full unitaries built with ``np.kron``.
+"""
+
+import math
+import unittest
+
+import numpy as np
+
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.dense_engine import dense_controller
+
+I2 = np.eye(2)
+X = np.array([[0, 1], [1, 0]])
+H = np.array([[1, 1], [1, -1]]) / math.sqrt(2)
+P0 = np.diag([1, 0])
+P1 = np.diag([0, 1])
+
+
+def u3(theta, phi, lam):
+    return np.array([[math.cos(theta / 2), -np.exp(1j * lam) * math.sin(theta / 2)],
+                     [np.exp(1j * phi) * math.sin(theta / 2),
+                      np.exp(1j * (phi + lam)) * math.cos(theta / 2)]])
+
+
+def on_qubits(num_qubits, factors):
+    """Kronecker product of ``{qubit: matrix}``, qubit 0 rightmost."""
+    full = np.eye(1)
+    for qubit in reversed(range(num_qubits)):
+        full = np.kron(full, factors.get(qubit, I2))
+    return full
+
+
+def on_pair(num_qubits, mat, low, high):
+    """A 4x4 matrix on qubits ``low`` (low bit of its index) and ``high``."""
+    full = np.zeros((1 << num_qubits, 1 << num_qubits), dtype=complex)
+    mask = (1 << low) | (1 << high)
+    for row in range(1 << num_qubits):
+        for col in range(1 << num_qubits):
+            if row & ~mask == col & ~mask:
+                full[row, col] = mat[(row >> low & 1) | (row >> high & 1) << 1,
+                                     (col >> low & 1) | (col >> high & 1) << 1]
+    return full
+
+
+def controlled(num_qubits, control, target, mat):
+    return (on_qubits(num_qubits, {control: P0})
+            + on_qubits(num_qubits, {control: P1, target: mat}))
+
+
+def random_ops(num_qubits, num_gates, rng):
+    """Gates with arbitrary angles and the unitary of the whole circuit."""
+    ops = []
+    unitary = np.eye(1 << num_qubits)
+    for _ in range(num_gates):
+        kind = rng.integers(3) if num_qubits > 1 else rng.integers(2)
+        qubit, other = rng.permutation(num_qubits)[:2] if num_qubits > 1 else (0, 0)
+        qubit, other = int(qubit), int(other)
+        if kind == 0:
+            ops.append(('h', [qubit], [], -1))
+            gate = on_qubits(num_qubits, {qubit: H})
+        elif kind == 1:
+            angles = list(rng.uniform(-math.pi, math.pi, 3))
+            ops.append(('u3', [qubit], angles, -1))
+            gate = on_qubits(num_qubits, {qubit: u3(*angles)})
+        else:
+            ops.append(('cx', [qubit, other], [], -1))
+            gate = controlled(num_qubits, qubit, other, X)
+        unitary = gate @ unitary
+    return ops, unitary
+
+
+class TestDenseEngine(unittest.TestCase):
+
+    def test_random_circuits(self):
+        rng = np.random.default_rng(7)
+        for num_qubits in range(1, 6):
+            ops, unitary = random_ops(num_qubits, 30, rng)
+            circuit = CircuitIR.from_ops(num_qubits, [], ops, 'random')
+            with self.subTest(num_qubits=num_qubits):
+                np.testing.assert_allclose(dense_controller(circuit, True, 0)['statevector'],
+                                           unitary[:, 0], atol=1e-10)
+
+    def test_unitary_and_swap(self):
+        rng = np.random.default_rng(3)
+        mat, _ = np.linalg.qr(rng.normal(size=(4, 4)) + 1j * rng.normal(size=(4, 4)))
+        ops = [('h', [0], [], -1), ('h', [2], [], -1), ('unitary', [2, 0], [mat], -1),
+               ('swap', [0, 1], [], -1)]
+        circuit = CircuitIR.from_ops(3, [], ops, 'unitary')
+        swap = np.eye(4)[[0, 2, 1, 3]]
+        unitary = on_pair(3, swap, 0, 1) @ on_pair(3, mat, 2, 0) @ on_qubits(3, {0: H, 2: H})
+        np.testing.assert_allclose(dense_controller(circuit, True, 0)['statevector'],
+                                   unitary[:, 0], atol=1e-10)
+
+    def test_single_precision(self):
+        ops, unitary = random_ops(4, 30, np.random.default_rng(1))
+        circuit = CircuitIR.from_ops(4, [], ops, 'single')
+        vec = dense_controller(circuit, True, 0, precision='single')['statevector']
+        self.assertEqual(vec.dtype, np.complex64)
+        np.testing.assert_allclose(vec, unitary[:, 0], atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
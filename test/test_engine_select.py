@@ -0,0 +1,89 @@
+"""
+The "automatic" engine: the cost model of engine_select and its records in results.
+"""
+
+import unittest
+
+import numpy as np
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider import ALComExecutor, ALComProvider
+from qiskit_alcom_provider.alcom_error import ALComError
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.engine_select import choose_engine
+
+LARGE_MEMORY = 1 << 40
+
+
+def ghz(num_qubits, t_layer=False):
+    ops = [('h', [0], [], -1)] + [('cx', [q, q + 1], [], -1) for q in range(num_qubits - 1)]
+    if t_layer:
+        ops += [('t', [q], [], -1) for q in range(num_qubits)]
+    return CircuitIR.from_ops(num_qubits, [], ops, 'ghz')
+
+
+def scrambler(num_qubits, num_gates, seed):
+    """Random H, T and CX gates, the BDD grows towards 2^n nodes."""
+    rng = np.random.default_rng(seed)
+    ops = []
+    for _ in range(num_gates):
+        qubit, other = (int(q) for q in rng.permutation(num_qubits)[:2])
+        kind = ('h', 't', 'cx')[rng.integers(3)]
+        ops.append((kind, [qubit, other] if kind == 'cx' else [qubit], [], -1))
+    return CircuitIR.from_ops(num_qubits, [], ops, 'scrambler')
+
+
+class TestChooseEngine(unittest.TestCase):
+
+    def assert_engine(self, circuit, engine, max_memory=LARGE_MEMORY):
+        choice, record = choose_engine(circuit, max_memory=max_memory)
+        self.assertEqual(choice, engine, record['reason'])
+        return record
+
+    def test_small_circuit(self):
+        self.assert_engine(ghz(4), 'dense')
+
+    def test_clifford(self):
+        self.assert_engine(ghz(20), 'bdd')
+
+    def test_dense_state_too_large(self):
+        record = self.assert_engine(ghz(40), 'bdd', max_memory=1 << 30)
+        self.assertGreater(record['dense_bytes'], record['max_memory'])
+
+    def test_inexact_angles(self):
+        circuit = CircuitIR.from_ops(20, [], [('u1', [0], [0.3], -1)])
+        record = self.assert_engine(circuit, 'dense')
+        self.assertFalse(record['bdd_exact'])
+        with self.assertRaises(ALComError):
+            choose_engine(circuit, max_memory=1 << 20)
+
+    def test_probe(self):
+        record = self.assert_engine(ghz(20, t_layer=True), 'bdd')
+        self.assertIsNotNone(record['probe_nodes'])
+        record = self.assert_engine(scrambler(20, 300, seed=0), 'dense')
+        self.assertIsNone(record['probe_nodes'])
+
+
+class TestBackendSelection(unittest.TestCase):
+
+    def test_recorded_per_experiment(self):
+        executor = ALComExecutor('inline')
+        self.addCleanup(executor.shutdown)
+        backend = ALComProvider(executor=executor).get_backend('qasm_simulator')
+        small = QuantumCircuit(2, 2)
+        small.h(0)
+        small.measure([0, 1], [0, 1])
+        wide = QuantumCircuit(30, 30)
+        wide.h(0)
+        for qubit in range(29):
+            wide.cx(qubit, qubit + 1)
+        wide.measure(list(range(30)), list(range(30)))
+        result = backend.run(assemble([small, wide], shots=50),
+                             backend_options={'max_memory_mb': 64}).result()
+        self.assertEqual([entry['engine'] for entry in result.results], ['dense', 'bdd'])
+        self.assertIn('reason', result.results[1]['engine_selection'])
+        self.assertLessEqual(set(result.get_counts(1)), {'0' * 30, '1' * 30})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+ALComExecutor: the bounded queue, pending jobs and failed submits.
+"""
+
+import threading
+import unittest
+
+from qiskit.providers import JobError
+
+from qiskit_alcom_provider import ALComExecutor
+
+
+class TestExecutor(unittest.TestCase):
+
+    def executor(self, *args, **kwargs):
+        executor = ALComExecutor(*args, **kwargs)
+        self.addCleanup(executor.shutdown)
+        return executor
+
+    def test_inline(self):
+        executor = self.executor('inline')
+        self.assertEqual(executor.submit(pow, 2, 10).result(), 1024)
+        with self.assertRaises(ZeroDivisionError):
+            executor.submit(divmod, 1, 0).result()
+
+    def test_bounded_queue(self):
+        executor = self.executor('thread', max_workers=1, max_queue=1)
+        release = threading.Event()
+        running = executor.submit(release.wait, 60)
+        queued = executor.submit(pow, 2, 3)
+        self.assertEqual(executor.pending_jobs, 1)
+        with self.assertRaises(JobError):
+            executor.submit(pow, 2, 4, timeout=0.1)
+        release.set()
+        self.assertTrue(running.result(timeout=60))
+        self.assertEqual(queued.result(timeout=60), 8)
+        self.assertEqual(executor.submit(pow, 2, 4, timeout=60).result(timeout=60), 16)
+
+    def test_cancel_pending(self):
+        executor = self.executor('thread', max_workers=1)
+        release = threading.Event()
+        executor.submit(release.wait, 60)
+        queued = executor.submit(pow, 2, 3)
+        self.assertTrue(queued.cancel())
+        release.set()
+        self.assertTrue(queued.cancelled())
+
+    def test_failed_submit_gives_back_its_slot(self):
+        executor = self.executor('thread', max_workers=1, max_queue=0)
+        executor.shutdown()
+        # every submit gets its slot back, the next one fails the same way instead of blocking
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                executor.submit(pow, 2, 3, timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Exact Pauli expectation values against <psi|P|psi> of the statevector.
+"""
+
+import functools
+import math
+import unittest
+
+import numpy as np
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider import ALComExecutor, ALComProvider
+from qiskit_alcom_provider.alcom_error import ALComError
+from qiskit_alcom_provider.bdd_engine import bdd_controller
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.dense_engine import dense_controller
+from qiskit_alcom_provider.sampling import observable_terms
+
+PAULIS = {'I': np.eye(2), 'X': np.array([[0, 1], [1, 0]]),
+          'Y': np.array([[0, -1j], [1j, 0]]), 'Z': np.diag([1, -1])}
+
+
+def pauli_matrix(label):
+    # the leftmost character acts on the highest qubit, as np.kron orders them
+    return functools.reduce(np.kron, [PAULIS[char] for char in label])
+
+
+def random_circuit(num_qubits, rng, eighths):
+    ops = []
+    for _ in range(30):
+        qubit, other = (int(q) for q in rng.permutation(num_qubits)[:2])
+        if rng.integers(2):
+            ops.append(('cx', [qubit, other], [], -1))
+            continue
+        angles = (rng.integers(-8, 8, 3) * math.pi / 4 if eighths
+                  else rng.uniform(-math.pi, math.pi, 3))
+        ops.append(('u3', [qubit], list(angles), -1))
+    return CircuitIR.from_ops(num_qubits, [], ops, 'random')
+
+
+def random_labels(num_qubits, rng, count=12):
+    return [''.join(rng.choice(list('IXYZ'), num_qubits)) for _ in range(count)]
+
+
+class TestExpectation(unittest.TestCase):
+
+    def check(self, controller, circuit, labels):
+        vec = dense_controller(circuit, True, 0)['statevector']
+        values = controller(circuit, False, 0, observables=labels)['expectation_values']
+        expected = [np.vdot(vec, pauli_matrix(label) @ vec).real for label in labels]
+        np.testing.assert_allclose(values, expected, atol=1e-9)
+
+    def test_dense(self):
+        rng = np.random.default_rng(1)
+        for num_qubits in (2, 3, 5):
+            with self.subTest(num_qubits=num_qubits):
+                self.check(dense_controller, random_circuit(num_qubits, rng, False),
+                           random_labels(num_qubits, rng))
+
+    def test_bdd(self):
+        rng = np.random.default_rng(2)
+        for num_qubits in (2, 3, 5):
+            with self.subTest(num_qubits=num_qubits):
+                self.check(bdd_controller, random_circuit(num_qubits, rng, True),
+                           random_labels(num_qubits, rng))
+
+    def test_terms(self):
+        self.assertEqual(observable_terms({'ZZ': 1.0, 'XI': 0.5})[0], ['ZZ', 'XI'])
+        self.assertEqual(observable_terms('ZI')[0], ['ZI'])
+        with self.assertRaises(ALComError):
+            observable_terms({'ZA': 1.0})
+        with self.assertRaises(ALComError):
+            observable_terms({'ZZ': 1j})
+
+    def test_backend(self):
+        executor = ALComExecutor('inline')
+        self.addCleanup(executor.shutdown)
+        backend = ALComProvider(executor=executor).get_backend('qasm_simulator')
+        circuit = QuantumCircuit(2)
+        circuit.h(0)
+        circuit.cx(0, 1)
+        options = {'method': 'expectation', 'observables': {'ZZ': 1.0, 'XX': 0.5, 'ZI': 2.0}}
+        result = backend.run(assemble(circuit, shots=1), backend_options=options).result()
+        np.testing.assert_allclose(result.get_expectation_values(), [1.0, 1.0, 0.0], atol=1e-12)
+        self.assertAlmostEqual(result.get_expectation_value(), 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
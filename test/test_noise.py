@@ -0,0 +1,98 @@
+"""
+Noise models run as trajectories: the counts follow the channel probabilities.
+"""
+
+import unittest
+
+import numpy as np
+
+from qiskit_alcom_provider.alcom_error import ALComError
+from qiskit_alcom_provider.bdd_engine import bdd_controller
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.dense_engine import dense_controller
+from qiskit_alcom_provider.noise import TrajectoryNoise
+
+SHOTS = 4000
+
+
+def noisy_x(noise):
+    """X on one qubit and a measurement, with the errors of ``noise`` on the X."""
+    circuit = CircuitIR.from_ops(1, [['c', 1]], [('x', [0], [], -1), ('measure', [0], [], 0)],
+                                 'noisy_x')
+    return TrajectoryNoise.from_noise_model({'errors': noise}).apply(circuit)
+
+
+def qerror(probabilities, instructions, operations=('x',)):
+    return {'type': 'qerror', 'operations': list(operations),
+            'probabilities': list(probabilities), 'instructions': instructions}
+
+
+def bit_flip(p):
+    return qerror([1 - p, p], [[{'name': 'id', 'qubits': [0]}], [{'name': 'x', 'qubits': [0]}]])
+
+
+def amplitude_damping(gamma):
+    mats = [np.array([[1, 0], [0, np.sqrt(1 - gamma)]]),
+            np.array([[0, np.sqrt(gamma)], [0, 0]])]
+    return qerror([1.0], [[{'name': 'kraus', 'qubits': [0], 'params': mats}]])
+
+
+def relaxation(p_reset, p_z):
+    """Thermal relaxation as Aer writes it: identity, Z and reset branches."""
+    return qerror([1 - p_reset - p_z, p_z, p_reset],
+                  [[{'name': 'id', 'qubits': [0]}], [{'name': 'z', 'qubits': [0]}],
+                   [{'name': 'reset', 'qubits': [0]}]])
+
+
+class TestTrajectoryNoise(unittest.TestCase):
+
+    def assert_ones(self, controller, circuit, p_one):
+        counts = controller(circuit, False, SHOTS, seed=11)['counts']
+        self.assertEqual(sum(counts.values()), SHOTS)
+        # five standard deviations of the binomial
+        tolerance = 5 * np.sqrt(SHOTS * p_one * (1 - p_one)) + 1
+        self.assertAlmostEqual(counts.get('1', 0), SHOTS * p_one, delta=tolerance)
+
+    def test_bit_flip(self):
+        circuit = noisy_x([bit_flip(0.2)])
+        for controller in (bdd_controller, dense_controller):
+            with self.subTest(controller=controller.__name__):
+                self.assert_ones(controller, circuit, 0.8)
+
+    def test_readout_error(self):
+        circuit = noisy_x([{'type': 'roerror', 'operations': ['measure'],
+                            'probabilities': [[0.9, 0.1], [0.25, 0.75]]}])
+        for controller in (bdd_controller, dense_controller):
+            with self.subTest(controller=controller.__name__):
+                self.assert_ones(controller, circuit, 0.75)
+
+    def test_kraus(self):
+        circuit = noisy_x([amplitude_damping(0.3)])
+        self.assert_ones(dense_controller, circuit, 0.7)
+        with self.assertRaises(ALComError):
+            bdd_controller(circuit, False, SHOTS, seed=11)
+
+    def test_mixture_with_reset(self):
+        # the reset branch decays |1> to |0>, the Z branch leaves the counts alone
+        circuit = noisy_x([relaxation(0.25, 0.1)])
+        self.assert_ones(dense_controller, circuit, 0.75)
+
+    def test_mixture_with_kraus(self):
+        damping = amplitude_damping(0.5)['instructions'][0]
+        error = qerror([0.5, 0.5], [[{'name': 'id', 'qubits': [0]}], damping])
+        self.assert_ones(dense_controller, noisy_x([error]), 0.75)
+
+    def test_same_seed_same_counts(self):
+        circuit = noisy_x([bit_flip(0.3)])
+        self.assertEqual(dense_controller(circuit, False, 500, seed=3)['counts'],
+                         dense_controller(circuit, False, 500, seed=3)['counts'])
+
+    def test_unsupported_instruction(self):
+        error = qerror([0.5, 0.5], [[{'name': 'id', 'qubits': [0]}],
+                                    [{'name': 'measure', 'qubits': [0]}]])
+        with self.assertRaises(ALComError):
+            TrajectoryNoise.from_noise_model({'errors': [error]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Jobs through ``ALComProvider`` on every executor kind.
+Run with ``python -m unittest discover test``.
+"""
+
+import asyncio
+import tempfile
+import unittest
+
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider import ALComExecutor, ALComProvider, ResultCache
+
+SHOTS = 200
+
+
+def bell_qobj(shots=SHOTS):
+    circuit = QuantumCircuit(2, 2)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    circuit.measure([0, 1], [0, 1])
+    return assemble(circuit, shots=shots, seed_simulator=7)
+
+
+class TestProviderExecutors(unittest.TestCase):
+    """A job per executor kind, the backend built by the provider."""
+
+    def backend(self, kind, result_cache=None):
+        executor = ALComExecutor(kind)
+        self.addCleanup(executor.shutdown)
+        return ALComProvider(executor=executor,
+                             result_cache=result_cache).get_backend('qasm_simulator')
+
+    def assert_bell_counts(self, counts):
+        self.assertLessEqual(set(counts), {'00', '11'})
+        self.assertEqual(sum(counts.values()), SHOTS)
+
+    def test_thread(self):
+        self.assert_bell_counts(self.backend('thread').run(bell_qobj()).result().get_counts())
+
+    def test_inline(self):
+        self.assert_bell_counts(self.backend('inline').run(bell_qobj()).result().get_counts())
+
+    def test_process(self):
+        # the backend is pickled into the worker, without its provider and executor
+        counts = self.backend('process').run(bell_qobj()).result(timeout=60).get_counts()
+        self.assert_bell_counts(counts)
+        self.assertEqual(counts, self.backend('inline').run(bell_qobj()).result().get_counts())
+
+    def test_disk_cache(self):
+        # the kept BDD state is pickled without the job's cancel event and profiler
+        for kind in ('thread', 'inline'):
+            with self.subTest(kind=kind), tempfile.TemporaryDirectory() as path:
+                options = {'engine': 'bdd'}
+                backend = self.backend(kind, ResultCache(path=path))
+                counts = backend.run(bell_qobj(), backend_options=options).result().get_counts()
+                self.assert_bell_counts(counts)
+                cache = ResultCache(path=path)
+                job = self.backend(kind, cache).run(bell_qobj(), backend_options=options)
+                self.assertEqual(job.result().get_counts(), counts)
+                self.assertEqual(cache.hits, 1)
+
+    def test_backend_built_once(self):
+        provider = ALComProvider()
+        self.assertIs(provider.get_backend('qasm_simulator'),
+                      provider.get_backend('qasm_simulator'))
+        self.assertEqual(provider.backends(), [provider.get_backend('qasm_simulator')])
+
+    def test_run_async(self):
+        backend = self.backend('thread')
+
+        async def run():
+            job = await backend.run_async(bell_qobj())
+            return await job.result_async(timeout=60)
+
+        self.assert_bell_counts(asyncio.run(run()).get_counts())
+
+    def test_stream(self):
+        job = self.backend('thread').run(bell_qobj(), backend_options={'stream_shots': 50})
+        updates = list(job.stream(timeout=60))
+        self.assertTrue(updates[-1]['done'])
+        self.assertEqual(updates[-1]['shots'], SHOTS)
+        self.assertEqual([update['shots'] for update in updates],
+                         sorted(update['shots'] for update in updates))
+        self.assertEqual(updates[-1]['counts'], job.result().get_counts())
+
+
+if __name__ == '__main__':
+    unittest.main()
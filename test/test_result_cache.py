@@ -0,0 +1,117 @@
+"""
+The result cache: keys, hits that re-sample, eviction and the disk store.
+"""
+
+import logging
+import math
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider import ALComExecutor, ALComProvider, ResultCache
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.dense_engine import dense_controller
+
+
+def phase_qobj(angle, shots=400, seed=3):
+    """H u1(angle) H: reads one with probability sin^2(angle / 2)."""
+    circuit = QuantumCircuit(1, 1)
+    circuit.h(0)
+    circuit.u1(angle, 0)
+    circuit.h(0)
+    circuit.measure(0, 0)
+    return assemble(circuit, shots=shots, seed_simulator=seed)
+
+
+def entry(nbytes, state=None):
+    return {'output': {'counts': {}, 'statevector': np.zeros(nbytes // 16, dtype=complex)},
+            'state': state, 'shots': 1, 'memory': False}
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_lru_budget(self):
+        cache = ResultCache(max_bytes=3000)
+        for key in 'abc':
+            cache.put(key, entry(1024))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        cache.put('d', entry(1024))
+        # 'b' was used last, 'c' goes
+        self.assertIsNotNone(cache.get('b'))
+        self.assertIsNone(cache.get('c'))
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_disk_round_trip(self):
+        with tempfile.TemporaryDirectory() as path:
+            stored = entry(256)
+            stored['output']['statevector'][:] = np.arange(16)
+            ResultCache(path=path).put('key', stored)
+            loaded = ResultCache(path=path).get('key')
+            np.testing.assert_array_equal(loaded['output']['statevector'],
+                                          stored['output']['statevector'])
+
+    def test_unpicklable_entry(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = ResultCache(path=path)
+            with self.assertLogs('qiskit_alcom_provider.result_cache', logging.WARNING):
+                cache.put('key', entry(256, state=threading.Lock()))
+            # kept in memory, nothing left on disk
+            self.assertIsNotNone(cache.get('key'))
+            self.assertEqual(os.listdir(path), [])
+
+    def test_fingerprint(self):
+        def circuit(angle):
+            return CircuitIR.from_ops(1, [['c', 1]], [('h', [0], [], -1), ('u1', [0], [angle], -1),
+                                                      ('measure', [0], [], 0)], 'phase')
+
+        self.assertEqual(circuit(0.5).fingerprint(seed=1), circuit(0.5).fingerprint(seed=1))
+        self.assertNotEqual(circuit(0.5).fingerprint(seed=1), circuit(0.6).fingerprint(seed=1))
+        self.assertNotEqual(circuit(0.5).fingerprint(seed=1), circuit(0.5).fingerprint(seed=2))
+
+    def test_kept_state_owns_no_output(self):
+        circuit = CircuitIR.from_ops(2, [], [('h', [0], [], -1), ('cx', [0, 1], [], -1)], 'bell')
+        output = dense_controller(circuit, True, 0, keep_state=True)
+        self.assertFalse(np.shares_memory(output['statevector'], output['state'].state))
+
+
+class TestBackendCache(unittest.TestCase):
+
+    def setUp(self):
+        executor = ALComExecutor('inline')
+        self.addCleanup(executor.shutdown)
+        self.cache = ResultCache()
+        self.backend = ALComProvider(executor=executor,
+                                     result_cache=self.cache).get_backend('qasm_simulator')
+
+    def test_keyed_on_parameters(self):
+        first = self.backend.run(phase_qobj(math.pi / 2)).result().get_counts()
+        self.assertEqual(self.backend.run(phase_qobj(math.pi / 2)).result().get_counts(), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        # another angle is another circuit: a miss with its own distribution
+        counts = self.backend.run(phase_qobj(math.pi)).result().get_counts()
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.assertEqual(counts, {'1': 400})
+
+    def test_hit_resamples_shots(self):
+        self.backend.run(phase_qobj(math.pi / 2)).result()
+        counts = self.backend.run(phase_qobj(math.pi / 2, shots=1000)).result().get_counts()
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(sum(counts.values()), 1000)
+
+    def test_statevector_hit(self):
+        options = {'method': 'statevector', 'engine': 'dense'}
+        first = self.backend.run(phase_qobj(math.pi / 2), backend_options=options).result()
+        second = self.backend.run(phase_qobj(math.pi / 2), backend_options=options).result()
+        self.assertEqual(self.cache.hits, 1)
+        np.testing.assert_allclose(second.get_statevector().data, first.get_statevector().data)
+        np.testing.assert_allclose(np.abs(first.get_statevector().data) ** 2, [0.5, 0.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
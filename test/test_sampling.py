@@ -0,0 +1,63 @@
+"""
+Shots drawn in one batch: counts and memory of both engines.
+"""
+
+import collections
+import unittest
+
+import numpy as np
+
+from qiskit_alcom_provider.bdd_engine import bdd_controller
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.dense_engine import dense_controller
+
+CONTROLLERS = (bdd_controller, dense_controller)
+
+
+def biased_ghz(num_qubits):
+    """GHZ state rotated by H T H on qubit 0: reads all ones with probability sin^2(pi/8)."""
+    ops = [('h', [0], [], -1), ('t', [0], [], -1), ('h', [0], [], -1)]
+    ops += [('cx', [q, q + 1], [], -1) for q in range(num_qubits - 1)]
+    ops += [('measure', [q], [], q) for q in range(num_qubits)]
+    return CircuitIR.from_ops(num_qubits, [['c', num_qubits]], ops, 'biased_ghz')
+
+
+class TestSampling(unittest.TestCase):
+
+    def test_distribution(self):
+        shots = 8000
+        p_one = np.sin(np.pi / 8) ** 2
+        tolerance = 5 * np.sqrt(shots * p_one * (1 - p_one))
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                counts = controller(biased_ghz(5), False, shots, seed=5)['counts']
+                self.assertLessEqual(set(counts), {'00000', '11111'})
+                self.assertAlmostEqual(counts['11111'], shots * p_one, delta=tolerance)
+
+    def test_memory_matches_counts(self):
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                output = controller(biased_ghz(4), False, 300, seed=2, memory=True)
+                memory = output['memory']
+                self.assertEqual(len(memory), 300)
+                counts = collections.Counter(format(int(value), '04b') for value in memory)
+                self.assertEqual(dict(counts), output['counts'])
+
+    def test_seed(self):
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                first = controller(biased_ghz(3), False, 200, seed=9, memory=True)
+                second = controller(biased_ghz(3), False, 200, seed=9, memory=True)
+                self.assertEqual(first['counts'], second['counts'])
+                np.testing.assert_array_equal(first['memory'], second['memory'])
+
+    def test_zero_shots(self):
+        for controller in CONTROLLERS:
+            with self.subTest(controller=controller.__name__):
+                output = controller(biased_ghz(3), False, 0, seed=1, memory=True)
+                self.assertEqual(output['counts'], {})
+                self.assertEqual(len(output['memory']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+The circuit and schema checks of a job and their cache.
+"""
+
+import types
+import unittest
+
+from qiskit import QuantumCircuit, assemble
+
+from qiskit_alcom_provider import ALComExecutor, ALComProvider
+from qiskit_alcom_provider.alcom_error import ALComError
+from qiskit_alcom_provider.circuit_ir import CircuitIR
+from qiskit_alcom_provider.validation import CircuitValidator, scan_circuit
+
+
+def rotation(angle, measured=True):
+    ops = [('u1', [0], [angle], -1), ('cx', [0, 1], [], -1)]
+    if measured:
+        ops.append(('measure', [1], [], 0))
+    return CircuitIR.from_ops(2, [['c', 1]], ops, 'rotation')
+
+
+def qobj(shots, circuits):
+    experiments = [types.SimpleNamespace(header={'name': circuit.name}, config=None)
+                   for circuit in circuits]
+    return types.SimpleNamespace(config={'shots': shots}, experiments=experiments)
+
+
+class TestCircuitValidator(unittest.TestCase):
+
+    def test_scan(self):
+        scan = scan_circuit(rotation(0.5), basis=['cx'])
+        self.assertEqual(scan['used_qubits'], [0, 1])
+        self.assertEqual(scan['max_clbit'], 0)
+        self.assertTrue(scan['measured'])
+        self.assertEqual(scan['unsupported'], ['u1'])
+        self.assertFalse(scan_circuit(rotation(0.5, measured=False))['measured'])
+
+    def test_structure_cached(self):
+        validator = CircuitValidator()
+        validator.validate([rotation(0.1), rotation(0.2), rotation(0.1, measured=False)])
+        self.assertEqual(validator.stats(), {'hits': 1, 'misses': 2, 'circuits': 2, 'qobjs': 0})
+
+    def test_errors(self):
+        validator = CircuitValidator()
+        with self.assertRaises(ALComError):
+            validator.validate([rotation(0.1)], basis=['cx'])
+        with self.assertRaises(ALComError):
+            validator.validate([rotation(0.1)], max_qubits=1)
+        # a failed check is not cached
+        with self.assertRaises(ALComError):
+            validator.validate([rotation(0.1)], basis=['cx'])
+        self.assertEqual(validator.stats()['circuits'], 0)
+
+    def test_schema_keyed_on_config(self):
+        validator = CircuitValidator()
+        checked = []
+        circuits = [rotation(0.1)]
+        validator.validate_schema(qobj(100, circuits), circuits, checked.append)
+        validator.validate_schema(qobj(100, [rotation(0.7)]), [rotation(0.7)], checked.append)
+        self.assertEqual(len(checked), 1)
+        # other config values are checked again
+        validator.validate_schema(qobj(0, circuits), circuits, checked.append)
+        self.assertEqual(len(checked), 2)
+        failing = qobj(-1, circuits)
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                validator.validate_schema(failing, circuits, self.reject)
+
+    @staticmethod
+    def reject(qobj_):
+        raise ValueError('shots must be positive')
+
+
+class TestBackendValidation(unittest.TestCase):
+
+    def setUp(self):
+        executor = ALComExecutor('inline')
+        self.addCleanup(executor.shutdown)
+        self.backend = ALComProvider(executor=executor).get_backend('qasm_simulator')
+
+    def bell(self):
+        circuit = QuantumCircuit(2, 2)
+        circuit.h(0)
+        circuit.cx(0, 1)
+        circuit.measure([0, 1], [0, 1])
+        return circuit
+
+    def test_resubmitted_circuit_hits(self):
+        for validate in (True, "fast"):
+            self.backend.run(assemble(self.bell(), shots=20), validate=validate).result()
+        stats = self.backend.validator.stats()
+        self.assertEqual((stats['circuits'], stats['qobjs']), (1, 1))
+        self.assertGreaterEqual(stats['hits'], 1)
+
+    def test_too_wide(self):
+        width = self.backend.configuration().n_qubits + 1
+        circuit = QuantumCircuit(width, 1)
+        circuit.measure(0, 0)
+        with self.assertRaises(ALComError):
+            self.backend.run(assemble(circuit, shots=1)).result()
+
+
+if __name__ == '__main__':
+    unittest.main()